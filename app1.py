@@ -1,7 +1,8 @@
 # app.py
 import streamlit as st
-import json
-from ia_models import gerar_resposta_gemini, gerar_resposta_gpt, gerar_resposta_copilot
+from configuracao import avisos_config, carregar_config, salvar_config
+from provedores import obter_provedor
+from limites import ErroProvedor
 from utils import exportar_artefatos, baixar_excel, extrair_texto_ppt
 from fpdf import FPDF # pyright: ignore[reportMissingModuleSource]
 import io
@@ -14,11 +15,12 @@ st.set_page_config(page_title="Assistente Ágil IA", layout="wide", page_icon="
 
 CONFIG_FILE = "config.json"
 try:
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    config = carregar_config(CONFIG_FILE)
 except FileNotFoundError:
     st.error("Arquivo config.json não encontrado. Crie um antes de rodar o app.")
     st.stop()
+for aviso in avisos_config(CONFIG_FILE):
+    st.warning(aviso)
 
 # =====================
 # FUNÇÃO PARA EXPORTAR PDF
@@ -78,8 +80,7 @@ if menu_option == "⚙️ Configurações de IA":
         config["prompts"][p] = st.text_area(f"Prompt para {p.upper()}", value=config["prompts"][p], height=100)
 
     if st.button("💾 Salvar Configurações"):
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
+        salvar_config(config, CONFIG_FILE)
         st.success("✅ Configurações salvas com sucesso!")
 
 # =====================
@@ -123,12 +124,11 @@ elif menu_option == "🧠 Geração de Artefatos":
                     prompt_final += f"{config['prompts'][tipo]}\n\nContexto:\n{contexto}\nNotas:\n{notas}"
 
                     # Chamada IA
-                    if modelo_escolhido == "Gemini":
-                        resposta = gerar_resposta_gemini(prompt_final, config["api_keys"]["gemini"])
-                    elif modelo_escolhido == "ChatGPT":
-                        resposta = gerar_resposta_gpt(prompt_final, config["api_keys"]["chatgpt"])
-                    else:
-                        resposta = gerar_resposta_copilot(prompt_final, config["api_keys"]["copilot"])
+                    provedor = obter_provedor(modelo_escolhido)
+                    try:
+                        resposta = provedor.gerar(prompt_final, config["api_keys"][provedor.chave_config])
+                    except ErroProvedor as e:
+                        resposta = str(e)
 
                     resultados[tipo] = resposta
                     status_gerado[tipo] = True
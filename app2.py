@@ -1,7 +1,7 @@
 # app.py
 import streamlit as st
-import json
-from ia_models import gerar_resposta_gemini, gerar_resposta_gpt, gerar_resposta_copilot
+from configuracao import avisos_config, carregar_config, salvar_config
+from provedores import obter_provedor
 from utils import exportar_artefatos, baixar_excel, extrair_texto_ppt
 from fpdf import FPDF # type: ignore
 import io
@@ -14,11 +14,12 @@ st.set_page_config(page_title="Assistente Ágil IA", layout="wide", page_icon="
 
 CONFIG_FILE = "config.json"
 try:
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    config = carregar_config(CONFIG_FILE)
 except FileNotFoundError:
     st.error("Arquivo config.json não encontrado. Crie um antes de rodar o app.")
     st.stop()
+for aviso in avisos_config(CONFIG_FILE):
+    st.warning(aviso)
 
 # =====================
 # FUNÇÃO PARA EXPORTAR PDF
@@ -120,12 +121,8 @@ if menu_option == "🧠 Geração de Artefatos":
                     
                     try:
                         # Chamada IA
-                        if modelo_escolhido == "Gemini":
-                            resposta = gerar_resposta_gemini(prompt_final, config["api_keys"]["gemini"])
-                        elif modelo_escolhido == "ChatGPT":
-                            resposta = gerar_resposta_gpt(prompt_final, config["api_keys"]["chatgpt"])
-                        else:
-                            resposta = gerar_resposta_copilot(prompt_final, config["api_keys"]["copilot"])
+                        provedor = obter_provedor(modelo_escolhido)
+                        resposta = provedor.gerar(prompt_final, config["api_keys"][provedor.chave_config])
                             
                         resultados[tipo] = resposta
                         status.update(label=f"✅ **{tipo.upper()}** Gerado!", state="complete", expanded=False)
@@ -188,8 +185,7 @@ elif menu_option == "⚙️ Configurações de IA":
             config["prompts"][p] = st.text_area(f"Prompt para {p.upper()}", value=config["prompts"][p], height=100)
 
     if st.button("💾 Salvar Configurações", use_container_width=True):
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
+        salvar_config(config, CONFIG_FILE)
         st.success("✅ Configurações salvas com sucesso!")
 
 # =====================
@@ -1,9 +1,10 @@
 # app.py
 import streamlit as st
-import json
+from configuracao import avisos_config, carregar_config, salvar_config
 # Seus módulos originais (GARANTINDO FUNCIONALIDADE)
-from ia_models import gerar_resposta_gemini, gerar_resposta_gpt, gerar_resposta_copilot
+from provedores import obter_provedor
 from utils import exportar_artefatos, baixar_excel, extrair_texto_ppt
+from gerador import montar_prompt, gerar_artefatos_concorrente
 from fpdf import FPDF # type: ignore
 import io
 import pandas as pd
@@ -71,11 +72,12 @@ st.markdown("""
 
 CONFIG_FILE = "config.json"
 try:
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    config = carregar_config(CONFIG_FILE)
 except FileNotFoundError:
     st.error("Arquivo config.json não encontrado. Crie um antes de rodar o app.")
     st.stop()
+for aviso in avisos_config(CONFIG_FILE):
+    st.warning(aviso)
 
 # =====================
 # FUNÇÃO PARA EXPORTAR PDF
@@ -189,7 +191,9 @@ if menu_option == "🧠 Geração de Artefatos":
             resultados = {}
             st.subheader("3. ⏳ Geração em Andamento...")
             
-            # Loop de geração com feedback visual (st.status)
+            # Monta os prompts e o feedback visual (st.status) de todos os artefatos
+            prompts = {}
+            status_por_tipo = {}
             for i, tipo in enumerate(ARTEFATOS):
                 
                 # Atualiza o card de status para "Processando"
@@ -198,46 +202,46 @@ if menu_option == "🧠 Geração de Artefatos":
                          st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
                          st.caption("⚡ Processando...")
                 
-                with st.status(f"Gerando **{tipo.upper()}** com {modelo_escolhido}...", expanded=False, state="running") as status:
+                status = st.status(f"Gerando **{tipo.upper()}** com {modelo_escolhido}...", expanded=False, state="running")
+                status_por_tipo[tipo] = status
+                with status:
                     st.write(f"Construindo prompt complexo para {tipo.upper()}...")
-                    
-                    prompt_final = f"{config.get('ia_role','')}\n\n"
-                    if "playbook_text" in config:
-                        prompt_final += f"Playbook/Diretriz: {config['playbook_text']}\n\n"
-                    prompt_final += f"{config['prompts'][tipo]}\n\nContexto:\n{contexto}\nNotas:\n{notas}"
+                    prompts[tipo] = montar_prompt(config, tipo, contexto, notas)
                     st.write("Invocando Modelo de IA...")
+            
+            # Chamada IA (USANDO SUAS FUNÇÕES ORIGINAIS)
+            provedor = obter_provedor(modelo_escolhido)
+            api_key = config["api_keys"][provedor.chave_config]
+            funcao_geracao = lambda prompt: provedor.gerar(prompt, api_key)
+            
+            # Todos os artefatos são enviados em paralelo e atualizados na ordem de chegada
+            for tipo, resposta, erro in gerar_artefatos_concorrente(prompts, funcao_geracao):
+                i = ARTEFATOS.index(tipo)
+                status = status_por_tipo[tipo]
+                
+                if erro is None:
+                    resultados[tipo] = resposta
+                    status.update(label=f"✅ **{tipo.upper()}** - Geração Finalizada!", state="complete", expanded=False)
+                    
+                    # Atualiza o card de status para "Concluído"
+                    with cols_flow[i]:
+                         with cols_flow[i].container(border=True):
+                             st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
+                             st.caption("✅ Concluído com sucesso")
+                    
+                else:
+                    resultados[tipo] = f"Erro ao gerar {tipo.upper()}: {erro}"
+                    status.update(label=f"❌ Erro ao gerar {tipo.upper()}", state="error", expanded=True)
+                    with status:
+                        st.exception(erro)
+                    
+                    # Atualiza o card de status para "Erro"
+                    with cols_flow[i]:
+                         with cols_flow[i].container(border=True):
+                             st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
+                             st.caption("❌ Erro de Geração")
                     
-                    try:
-                        # Chamada IA (USANDO SUAS FUNÇÕES ORIGINAIS)
-                        if modelo_escolhido == "Gemini":
-                            resposta = gerar_resposta_gemini(prompt_final, config["api_keys"]["gemini"])
-                        elif modelo_escolhido == "ChatGPT":
-                            resposta = gerar_resposta_gpt(prompt_final, config["api_keys"]["chatgpt"])
-                        else:
-                            resposta = gerar_resposta_copilot(prompt_final, config["api_keys"]["copilot"])
-                            
-                        resultados[tipo] = resposta
-                        status.update(label=f"✅ **{tipo.upper()}** - Geração Finalizada!", state="complete", expanded=False)
-                        
-                        # Atualiza o card de status para "Concluído"
-                        with cols_flow[i]:
-                             with cols_flow[i].container(border=True):
-                                 st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
-                                 st.caption("✅ Concluído com sucesso")
-                        
-                    except Exception as e:
-                        resposta = f"Erro ao gerar {tipo.upper()}: {e}"
-                        resultados[tipo] = resposta
-                        status.update(label=f"❌ Erro ao gerar {tipo.upper()}", state="error", expanded=True)
-                        st.exception(e)
-                        
-                        # Atualiza o card de status para "Erro"
-                        with cols_flow[i]:
-                             with cols_flow[i].container(border=True):
-                                 st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
-                                 st.caption("❌ Erro de Geração")
-                        
-            st.session_state["resultados"] = resultados
+            st.session_state["resultados"] = {tipo: resultados[tipo] for tipo in ARTEFATOS if tipo in resultados}
             st.toast("🚀 Geração de Artefatos Completa!", icon='🎉')
             
     # --- 3. Exibição dos Detalhes (Correção de Funcionalidade Visual) ---
@@ -287,7 +291,7 @@ elif menu_option == "⚙️ Configurações de IA":
                 config["playbook_text"] = extrair_texto_ppt(arquivo_ppt)
             st.success("Playbook carregado e processado com sucesso! A IA usará este texto como diretriz.")
         elif "playbook_text" in config and config["playbook_text"]:
-             st.info("Playbook atual carregado. Faça um novo upload para substituir ou modifique o texto diretamente na config.json.")
+             st.info("Playbook atual carregado. Faça um novo upload para substituir.")
 
     with tab_prompts:
         st.subheader("💬 Prompts Padrão por Artefato")
@@ -296,8 +300,7 @@ elif menu_option == "⚙️ Configurações de IA":
             config["prompts"][p] = st.text_area(f"Prompt base para {p.upper()}", value=config["prompts"].get(p, ""), height=120, label_visibility="collapsed")
 
     if st.button("💾 Salvar Todas as Configurações", type="primary", use_container_width=True):
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
+        salvar_config(config, CONFIG_FILE)
         st.success("✅ Configurações salvas com sucesso! As alterações serão aplicadas na próxima geração.")
 
 # =====================
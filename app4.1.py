@@ -1,7 +1,7 @@
 # app.py
 import streamlit as st
-import json
-from ia_models import gerar_resposta_gemini, gerar_resposta_gpt, gerar_resposta_copilot
+from configuracao import avisos_config, carregar_config, salvar_config
+from provedores import obter_provedor
 from utils import exportar_artefatos, baixar_excel, extrair_texto_ppt
 from fpdf import FPDF # type: ignore
 import io
@@ -103,11 +103,12 @@ div.stButton > button.st-emotion-cache-nahz7x {{
 
 CONFIG_FILE = "config.json"
 try:
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    config = carregar_config(CONFIG_FILE)
 except FileNotFoundError:
     st.error("Arquivo config.json não encontrado. Crie um antes de rodar o app.")
     st.stop()
+for aviso in avisos_config(CONFIG_FILE):
+    st.warning(aviso)
 
 # =====================
 # FUNÇÃO PARA EXPORTAR PDF (CORRIGIDA - SEM EMOJIS)
@@ -247,12 +248,8 @@ if menu_option == "🧠 Geração de Artefatos":
                         
                         try:
                             # Chamada IA
-                            if modelo_escolhido == "Gemini":
-                                resposta = gerar_resposta_gemini(prompt_final, config["api_keys"]["gemini"])
-                            elif modelo_escolhido == "ChatGPT":
-                                resposta = gerar_resposta_gpt(prompt_final, config["api_keys"]["chatgpt"])
-                            else:
-                                resposta = gerar_resposta_copilot(prompt_final, config["api_keys"]["copilot"])
+                            provedor = obter_provedor(modelo_escolhido)
+                            resposta = provedor.gerar(prompt_final, config["api_keys"][provedor.chave_config])
                                 
                             resultados[tipo] = resposta
                             
@@ -337,7 +334,7 @@ elif menu_option == "⚙️ Configurações de IA":
                 config["playbook_text"] = extrair_texto_ppt(arquivo_ppt)
             st.success("Playbook carregado e processado com sucesso! A IA usará este texto como diretriz.")
         elif "playbook_text" in config and config["playbook_text"]:
-             st.info("Playbook atual carregado. Faça um novo upload para substituir ou modifique o texto diretamente na config.json.")
+             st.info("Playbook atual carregado. Faça um novo upload para substituir.")
 
     with tab_prompts:
         st.subheader("💬 Prompts Padrão por Artefato")
@@ -346,8 +343,7 @@ elif menu_option == "⚙️ Configurações de IA":
             config["prompts"][p] = st.text_area(f"Prompt base para {p.upper()}", value=config["prompts"].get(p, ""), height=120, label_visibility="collapsed")
 
     if st.button("💾 Salvar Todas as Configurações", type="primary", use_container_width=True):
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
+        salvar_config(config, CONFIG_FILE)
         st.success("✅ Configurações salvas com sucesso! As alterações serão aplicadas na próxima geração.")
 
 # =====================
@@ -1,11 +1,14 @@
 # app.py
 import streamlit as st
-import json
-from ia_models import gerar_resposta_gemini, gerar_resposta_gpt, gerar_resposta_copilot
-from utils import exportar_artefatos, baixar_excel, extrair_texto_ppt
-from fpdf import FPDF
-import io
-import pandas as pd
+from configuracao import avisos_config, carregar_config, salvar_config
+from playbook_indice import BUSCA_PADRAO, obter_indice, trechos_do_playbook
+from exportacao import exportar, hash_resultados
+from ingestao_playbook import ingerir_documentos, listar_documentos, mesclar_corpus, resolver_pasta
+from cache_respostas import estatisticas as estatisticas_cache
+from limites import configurar_limites, estado_limitadores, limites_atuais
+from provedor_reserva import HEDGE_PERCENTIL_PADRAO, estado_disjuntores
+from rastreamento import ETAPAS, Rastro, span
+from tarefas import gerar_artefatos_tarefa, iniciar_tarefa, obter_tarefa
 
 # =====================
 # CONFIGURAÇÃO DE ESTILO E CORES PREMIUM (COCA-COLA INSPIRED)
@@ -34,6 +37,26 @@ EMOJIS = {
     "task": "🛠️"
 }
 ARTEFATOS = ["epic", "feature", "user_story", "task"]
+# Legenda do card para cada estado do artefato na tarefa de geração ({} = caracteres recebidos)
+ROTULOS_CARD = {
+    "pendente": "⏳ Na fila",
+    "processando": "⚡ Processando...",
+    "recebendo": "✍️ Recebendo... ({} caracteres)",
+    "concluido": "✅ Concluído com sucesso",
+    "erro": "❌ Erro de Geração"
+}
+INTERVALO_PROGRESSO = 0.5  # segundos entre redesenhos do progresso enquanto a geração roda
+# Colunas do detalhamento de latência (etapas do rastro da geração)
+ROTULOS_ETAPA = {
+    "montar_prompt": "Prompt",
+    "primeiro_byte": "1º byte",
+    "requisicao_provedor": "Requisição",
+    "interpretar_resposta": "Interpretação",
+    "renderizacao_ui": "Envio à UI*"
+}
+
+def formatar_ms(ms):
+    return f"{ms / 1000:.1f} s" if ms >= 1000 else f"{ms:.0f} ms"
 
 st.set_page_config(page_title="Assistente Ágil IA Premium", layout="wide", page_icon="⚡")
 
@@ -103,48 +126,29 @@ div.stButton > button.st-emotion-cache-nahz7x {{
 
 CONFIG_FILE = "config.json"
 try:
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    config = carregar_config(CONFIG_FILE)
 except FileNotFoundError:
     st.error("Arquivo config.json não encontrado. Crie um antes de rodar o app.")
     st.stop()
+for aviso in avisos_config(CONFIG_FILE):
+    st.warning(aviso)
+configurar_limites(config.get("limites", {}))
 
 # =====================
-# FUNÇÃO PARA EXPORTAR PDF (CORRIGIDA - SEM EMOJIS)
+# GERAÇÃO EM SEGUNDO PLANO
 # =====================
-def exportar_pdf(resultados, filename="artefatos.pdf"):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 18)
-    pdf.set_text_color(230, 0, 0) 
-    
-    pdf.cell(0, 15, "ARTEFATOS ÁGEIS GERADOS POR IA", ln=True, align='C') 
-    pdf.ln(10)
-    
-    for tipo, conteudo in resultados.items():
-        pdf.set_fill_color(255, 240, 240) 
-        pdf.set_font("Arial", 'B', 14)
-        pdf.set_text_color(0, 0, 0)
-        
-        pdf.cell(0, 8, f"{tipo.upper()}", ln=True, fill=True)
-        
-        pdf.set_font("Arial", '', 11)
-        pdf.set_text_color(50, 50, 50)
-        
-        try:
-            conteudo_str = conteudo.encode('latin-1', 'replace').decode('latin-1')
-        except:
-            conteudo_str = conteudo 
-            
-        pdf.multi_cell(0, 6, conteudo_str)
-        pdf.ln(5)
-    
-    buffer = io.BytesIO()
-    pdf.output(buffer, dest='S')
-    buffer.seek(0)
-    return buffer
+# A sessão guarda só o id da tarefa; o resultado é aplicado aqui, em qualquer
+# página, no primeiro rerun depois que a tarefa termina.
+tarefa_geracao = obter_tarefa(st.session_state.get("tarefa_geracao"))
+if tarefa_geracao and not tarefa_geracao.em_andamento and st.session_state.get("tarefa_aplicada") != tarefa_geracao.id:
+    st.session_state["tarefa_aplicada"] = tarefa_geracao.id
+    if tarefa_geracao.situacao == "concluida":
+        st.session_state["resultados"] = tarefa_geracao.resultado["resultados"]
+        st.session_state["geracao_info"] = tarefa_geracao.resultado["geracao_info"]
+        st.session_state["rastro_geracao"] = tarefa_geracao.resultado["rastro"]
+        st.toast("🚀 Geração de Artefatos Completa!", icon='🎉')
+    else:
+        st.toast(f"❌ A geração falhou: {tarefa_geracao.erro}")
 
 # =====================
 # CONFIGURAÇÕES DE IA (Sidebar)
@@ -157,6 +161,8 @@ with st.sidebar:
         ["🧠 Geração de Artefatos", "⚙️ Configurações de IA", "📂 Exportação", "ℹ️ Sobre"]
     )
     st.markdown("---")
+    if tarefa_geracao and tarefa_geracao.em_andamento:
+        st.info("⏳ Geração em andamento... pode navegar, ela continua.")
     if "resultados" in st.session_state:
         st.success("✅ Artefatos prontos para exportação!")
 
@@ -184,127 +190,213 @@ if menu_option == "🧠 Geração de Artefatos":
             modelo_escolhido = st.selectbox("🧠 Modelo de IA para Geração", ["Gemini", "ChatGPT", "Copilot"], help="Selecione o LLM desejado.", key="select_model")
         with col_button:
             st.write("") 
-            gerar = st.button("🚀 INICIAR GERAÇÃO DE ARTEFATOS", type="primary", use_container_width=True)
+            gerar = st.button("🚀 INICIAR GERAÇÃO DE ARTEFATOS", type="primary", use_container_width=True,
+                              disabled=bool(tarefa_geracao and tarefa_geracao.em_andamento))
 
-    st.markdown("---")
-    
-    # --- 2. Visualização do Ciclo (COM EXPANDER) ---
-    with st.expander("2. 💡 **Visualização do Ciclo** (Clique para acompanhar)", expanded=True):
-        cols_flow = st.columns(len(ARTEFATOS))
-        
-        card_placeholders = []
-        
-        # Inicializa os cards fixos (sem repetição)
-        for i, tipo in enumerate(ARTEFATOS):
-            with cols_flow[i]:
-                card_ph = st.empty()
-                card_placeholders.append(card_ph)
-                
-                with card_ph.container(border=True):
-                    emoji = EMOJIS[tipo]
-                    cor = CORES[tipo]
-                    titulo = tipo.upper()
-                    
-                    is_done = "resultados" in st.session_state and tipo in st.session_state["resultados"]
-                    
-                    st.markdown(f"**<span style='color:{cor};'>{emoji} {titulo}</span>**", unsafe_allow_html=True)
-                    if is_done:
-                         st.caption("✅ Concluído")
-                    else:
-                        st.caption("⚪ Não iniciado")
-                        
-    st.markdown("---")
+        col_unico, col_cache, col_reserva = st.columns(3)
+        with col_unico:
+            modo_unico = st.checkbox("🎯 Modo único (uma chamada para os 4 artefatos)", value=False, help="Envia papel da IA e playbook uma só vez e recebe todos os artefatos em JSON. Se a resposta for inválida, gera artefato por artefato.", key="modo_unico")
+        with col_cache:
+            ignorar_cache = st.checkbox("♻️ Ignorar cache nesta geração", value=False, help="Chama o modelo mesmo que o mesmo prompt já tenha sido respondido antes.", key="ignorar_cache")
+        with col_reserva:
+            usar_reserva = st.checkbox("🛡️ Modelo reserva (failover)", value=False, help="Se o modelo escolhido falhar ou demorar mais que o percentil de latência observado, o mesmo prompt vai ao modelo reserva e vale a primeira resposta.", key="usar_reserva")
+        if usar_reserva:
+            col_modelo_reserva, col_percentil = st.columns(2)
+            with col_modelo_reserva:
+                modelo_reserva = st.selectbox("Modelo reserva", [m for m in ["Gemini", "ChatGPT", "Copilot"] if m != modelo_escolhido], key="modelo_reserva")
+            with col_percentil:
+                percentil_reserva = st.slider("Aciona a reserva após o percentil de latência", 50, 99, HEDGE_PERCENTIL_PADRAO, key="percentil_reserva")
+        stats_cache = estatisticas_cache()
+        st.caption(f"Cache de respostas: {stats_cache['acertos']} acertos, {stats_cache['falhas']} falhas, {stats_cache['itens']} itens salvos.")
+        for estado in estado_limitadores():
+            if estado["provedor"] == modelo_escolhido:
+                st.caption(
+                    f"Limite de taxa ({estado['provedor']}): {estado['rpm']} req/min e {estado['tpm']:,} tokens/min efetivos, "
+                    f"{estado['chamadas']:.0f} chamadas, {estado['limitadas']:.0f} respostas 429, {estado['espera_total']:.1f}s de espera."
+                )
+        abertos = [d["provedor"] for d in estado_disjuntores() if d["estado"] != "fechado"]
+        if abertos:
+            st.caption(f"⚠️ Fora da rota por falhas seguidas (disjuntor aberto): {', '.join(abertos)}.")
 
     if gerar:
         if not contexto:
             st.error("⚠️ O campo 'Contexto principal do projeto' é obrigatório. Por favor, preencha para iniciar a geração.")
         else:
-            resultados = {}
-            
-            # --- 3. Processo de Geração Inteligente (COM EXPANDER) ---
-            with st.expander("3. ⏳ **Processo de Geração Inteligente** (Detalhes)", expanded=True):
-                st.markdown(f"Analisando **contexto** e **playbook** ({modelo_escolhido})...")
-                
-                # Loop de geração
-                for i, tipo in enumerate(ARTEFATOS):
-                    
-                    # --- ATUALIZAÇÃO DO CARD: Estado 'Processando' ---
-                    with card_placeholders[i].container(border=True):
-                        st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
-                        st.caption("⚡ Processando...")
-                    
-                    # Usa st.status para feedback detalhado
-                    with st.status(f"{EMOJIS[tipo]} Gerando **{tipo.upper()}** com {modelo_escolhido}...", expanded=False, state="running") as status:
-                        
-                        st.write(f"**{EMOJIS[tipo]} PASSO 1/3: Construindo Prompt (contextualizando {tipo.upper()}).**")
-                        
-                        prompt_final = f"{config.get('ia_role','')}\n\n"
-                        if "playbook_text" in config:
-                            prompt_final += f"Playbook/Diretriz: {config['playbook_text']}\n\n"
-                        prompt_final += f"{config['prompts'][tipo]}\n\nContexto:\n{contexto}\nNotas:\n{notas}"
-                        
-                        st.write(f"**{EMOJIS[tipo]} PASSO 2/3: Invocando Modelo de IA ({modelo_escolhido}).**")
-                        
-                        try:
-                            # Chamada IA
-                            if modelo_escolhido == "Gemini":
-                                resposta = gerar_resposta_gemini(prompt_final, config["api_keys"]["gemini"])
-                            elif modelo_escolhido == "ChatGPT":
-                                resposta = gerar_resposta_gpt(prompt_final, config["api_keys"]["chatgpt"])
-                            else:
-                                resposta = gerar_resposta_copilot(prompt_final, config["api_keys"]["copilot"])
-                                
-                            resultados[tipo] = resposta
-                            
-                            st.write(f"**{EMOJIS[tipo]} PASSO 3/3: Artefato recebido e validado.**")
-                            status.update(label=f"✅ **{tipo.upper()}** - Geração Finalizada!", state="complete", expanded=False)
-                            
-                            # --- ATUALIZAÇÃO DO CARD: Estado 'Concluído' ---
-                            with card_placeholders[i].container(border=True):
-                                st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
-                                st.caption("✅ Concluído com sucesso")
-                            
-                        except Exception as e:
-                            resposta = f"Erro ao gerar {tipo.upper()}: {e}"
-                            resultados[tipo] = resposta
-                            
-                            st.write(f"**{EMOJIS[tipo]} ERRO FATAL: Falha na comunicação com a API.**")
-                            status.update(label=f"❌ Erro ao gerar {tipo.upper()}", state="error", expanded=True)
-                            st.exception(e)
-                            
-                            # --- ATUALIZAÇÃO DO CARD: Estado 'Erro' ---
-                            with card_placeholders[i].container(border=True):
-                                st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
-                                st.caption("❌ Erro de Geração")
+            # A geração roda no executor de tarefas: reruns e troca de página não a interrompem
+            st.session_state["tarefa_geracao"] = iniciar_tarefa(
+                gerar_artefatos_tarefa, dict(config), contexto, notas, modelo_escolhido,
+                modo_unico=modo_unico, ignorar_cache=ignorar_cache,
+                reserva=modelo_reserva if usar_reserva else None,
+                percentil=percentil_reserva if usar_reserva else HEDGE_PERCENTIL_PADRAO,
+                descricao=f"{modelo_escolhido} + {modelo_reserva}" if usar_reserva else modelo_escolhido
+            )
+            tarefa_geracao = obter_tarefa(st.session_state["tarefa_geracao"])
+
+    # Enquanto a tarefa roda, um único fragmento (run_every) redesenha as
+    # seções 2 e 3 sem reexecutar o script (CSS, config, sidebar, outras
+    # seções). A cada rodada só as partes cuja versão mudou desde o último
+    # desenho são lidas da tarefa; o resto vem da cópia guardada na sessão.
+    em_andamento = bool(tarefa_geracao and tarefa_geracao.em_andamento)
+    intervalo = INTERVALO_PROGRESSO if em_andamento else None
+
+    def progresso_lido():
+        """Partes e resumo da tarefa, relidos só no que mudou desde a última rodada."""
+        progresso = st.session_state.get("progresso_geracao")
+        if progresso is None or progresso["tarefa"] != tarefa_geracao.id:
+            progresso = {"tarefa": tarefa_geracao.id, "versao": -1, "partes": {}, "resumo": None}
+            st.session_state["progresso_geracao"] = progresso
+        versao, alteradas = tarefa_geracao.mudancas(progresso["versao"])
+        if versao != progresso["versao"]:
+            progresso["partes"].update(alteradas)
+            progresso["resumo"] = tarefa_geracao.resumo()
+            progresso["versao"] = versao
+        return progresso
+
+    def card_artefato(tipo, parte):
+        with st.container(border=True):
+            st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
+            if parte:
+                st.caption(ROTULOS_CARD.get(parte.get("estado"), "⏳ Na fila").format(len(parte.get("texto") or "")))
+            elif "resultados" in st.session_state and tipo in st.session_state["resultados"]:
+                st.caption("✅ Concluído")
+            else:
+                st.caption("⚪ Não iniciado")
+
+    def fase_geracao(resumo):
+        if resumo["fase"]:
+            st.markdown(resumo["fase"])
+        for aviso in resumo["avisos"]:
+            st.warning(aviso)
+        if resumo["situacao"] == "erro":
+            st.error(f"❌ A geração falhou: {resumo['erro']}")
+
+    def status_artefato(tipo, parte):
+        estado = parte.get("estado", "pendente")
+        modelo = tarefa_geracao.descricao
+        
+        if parte.get("unico"):
+            # --- Artefato já obtido no modo único ---
+            with st.status(f"✅ **{tipo.upper()}** - Geração Finalizada!", expanded=False, state="complete"):
+                st.write(f"**{EMOJIS[tipo]} Artefato recebido na resposta única e validado.**")
+        elif estado == "concluido":
+            tempos = parte.get("tempos") or {}
+            with st.status(f"✅ **{tipo.upper()}** - Geração Finalizada!", expanded=False, state="complete"):
+                st.write(f"**{EMOJIS[tipo]} PASSO 1/3: Construindo Prompt (contextualizando {tipo.upper()}).**"
+                         + (f" ⏱️ {formatar_ms(tempos['montar_prompt'])}" if "montar_prompt" in tempos else ""))
+                st.write(f"**{EMOJIS[tipo]} PASSO 2/3: Invocando Modelo de IA ({modelo}).**"
+                         + (f" ⏱️ 1º byte em {formatar_ms(tempos['primeiro_byte'])}" if "primeiro_byte" in tempos else "")
+                         + (f", total {formatar_ms(tempos['requisicao_provedor'])}" if "requisicao_provedor" in tempos else ""))
+                st.write(f"**{EMOJIS[tipo]} PASSO 3/3: Artefato recebido e validado.**")
+        elif estado == "erro":
+            with st.status(f"❌ Erro ao gerar {tipo.upper()}", expanded=True, state="error"):
+                st.write(f"**{EMOJIS[tipo]} ERRO FATAL: Falha na comunicação com a API.**")
+                st.error(parte.get("erro"))
+        else:
+            # Usa st.status para feedback detalhado (aberto enquanto o texto chega)
+            with st.status(f"{EMOJIS[tipo]} Gerando **{tipo.upper()}** ({modelo})...", expanded=True, state="running"):
+                st.write(f"**{EMOJIS[tipo]} PASSO 1/3: Construindo Prompt (contextualizando {tipo.upper()}).**")
+                if estado in ("processando", "recebendo"):
+                    st.write(f"**{EMOJIS[tipo]} PASSO 2/3: Invocando Modelo de IA ({modelo}).**")
+                if parte.get("texto"):
+                    st.markdown(f"<div class='generated-text-box' style='border-left: 5px solid {CORES[tipo]};'>{parte['texto']}</div>", unsafe_allow_html=True)
+
+    @st.fragment(run_every=intervalo)
+    def progresso_geracao():
+        progresso = progresso_lido() if tarefa_geracao else None
+        partes = progresso["partes"] if progresso else {}
+
+        # --- 2. Visualização do Ciclo (COM EXPANDER) ---
+        with st.expander("2. 💡 **Visualização do Ciclo** (Clique para acompanhar)", expanded=True):
+            cols_flow = st.columns(len(ARTEFATOS))
+            for i, tipo in enumerate(ARTEFATOS):
+                with cols_flow[i]:
+                    card_artefato(tipo, partes.get(tipo))
                             
-                st.session_state["resultados"] = resultados
-                st.toast("🚀 Geração de Artefatos Completa!", icon='🎉')
+        st.markdown("---")
+
+        # --- 3. Processo de Geração Inteligente (COM EXPANDER) ---
+        if progresso:
+            with st.expander("3. ⏳ **Processo de Geração Inteligente** (Detalhes)", expanded=em_andamento):
+                fase_geracao(progresso["resumo"])
+                for tipo in ARTEFATOS:
+                    status_artefato(tipo, partes.get(tipo) or {})
             
             st.markdown("---") # Separador após a conclusão da geração
 
+        if em_andamento and not tarefa_geracao.em_andamento:
+            st.rerun()  # a tarefa terminou: uma execução completa aplica o resultado
+
+    def aba_artefato(tipo, rastro_ui):
+        # Título compacto com fundo escuro
+        st.markdown(
+            f"<div class='result-tab-title' style='background-color: {CORES[tipo]};'>"
+            f"Conteúdo Detalhado: {tipo.upper()}"
+            f"</div>", 
+            unsafe_allow_html=True
+        )
+        
+        conteudo = st.session_state["resultados"].get(tipo, "Não gerado ou erro.")
+        
+        # Aplica o estilo de caixa de texto com a cor da borda do artefato
+        with span(rastro_ui, "renderizacao_ui", tipo=tipo):
+            st.markdown(f"<div class='generated-text-box' style='border-left: 5px solid {CORES[tipo]};'>{conteudo}</div>", unsafe_allow_html=True)
+
+    st.markdown("---")
+    
+    progresso_geracao()
+
     # --- 4. Exibição dos Detalhes (COM EXPANDER e VISUAL COMPACTO) ---
-    if "resultados" in st.session_state:
+    # Só com a geração terminada: durante ela o texto parcial já aparece no status de cada artefato
+    if not em_andamento and "resultados" in st.session_state:
         with st.expander("4. 📖 **Detalhes dos Artefatos** (Resultados Finais)", expanded=True):
             st.success("Visualize os resultados e vá para 'Exportação' para baixar a planilha!")
+            info = st.session_state.get("geracao_info", {})
+            if info.get("playbook_versao"):
+                st.caption(f"Gerado com {info['modelo']} usando o playbook `{info['playbook_versao'][:12]}`.")
             
-            tabs = st.tabs([f"{EMOJIS[tipo]} {tipo.upper()}" for tipo in ARTEFATOS])
+            # A primeira exibição de cada geração é medida num rastro próprio (a
+            # geração já terminou): tempo no servidor para montar e enfileirar os
+            # elementos das abas, não o desenho no navegador
+            rastro_geracao = st.session_state.get("rastro_geracao")
+            rastro_ui = None
+            rastro_renderizacao = st.session_state.get("rastro_renderizacao")
+            if rastro_geracao and (rastro_renderizacao is None or rastro_renderizacao.comuns["geracao"] != rastro_geracao.id):
+                rastro_ui = Rastro("renderizacao_resultados", geracao=rastro_geracao.id, provedor=rastro_geracao.comuns["provedor"])
             
+            tabs = st.tabs([f"{EMOJIS[tipo]} {tipo.upper()}" for tipo in ARTEFATOS])
             for i, tipo in enumerate(ARTEFATOS):
                 with tabs[i]:
-                    # Título compacto com fundo escuro
-                    st.markdown(
-                        f"<div class='result-tab-title' style='background-color: {CORES[tipo]};'>"
-                        f"Conteúdo Detalhado: {tipo.upper()}"
-                        f"</div>", 
-                        unsafe_allow_html=True
-                    )
-                    
-                    # 🌟 CORREÇÃO DE LÓGICA APLICADA AQUI
-                    # Acessa o resultado específico para a aba atual usando a variável 'tipo'
-                    conteudo = st.session_state["resultados"].get(tipo, "Não gerado ou erro.")
-                    
-                    # Aplica o estilo de caixa de texto com a cor da borda do artefato
-                    st.markdown(f"<div class='generated-text-box' style='border-left: 5px solid {CORES[tipo]};'>{conteudo}</div>", unsafe_allow_html=True)
+                    aba_artefato(tipo, rastro_ui)
+            if rastro_ui:
+                rastro_ui.terminar()
+                st.session_state["rastro_renderizacao"] = rastro_ui
+
+    # --- 5. Tempo por Etapa (depois das abas, para incluir o envio à UI) ---
+    rastro_geracao = st.session_state.get("rastro_geracao")
+    if not em_andamento and rastro_geracao and "resultados" in st.session_state:
+        with st.expander("5. ⏱️ **Tempo por Etapa** (última geração)", expanded=False):
+            st.caption(
+                f"Geração completa em {formatar_ms(rastro_geracao.duracao_ms)} ({rastro_geracao.comuns['provedor']}). "
+                f"Spans gravados em `{rastro_geracao.arquivo}` (rastro `{rastro_geracao.id[:12]}`)."
+            )
+            colunas = ["montar_prompt", "primeiro_byte"] + ETAPAS[1:]
+            rastro_renderizacao = st.session_state.get("rastro_renderizacao")
+            envio_ui = {}
+            if rastro_renderizacao and rastro_renderizacao.comuns["geracao"] == rastro_geracao.id:
+                envio_ui = {linha["tipo"]: linha.get("renderizacao_ui") for linha in rastro_renderizacao.detalhamento()}
+            st.dataframe(
+                [
+                    {"Artefato": linha["tipo"].upper(), **{ROTULOS_ETAPA[c]: linha.get(c) for c in colunas},
+                     ROTULOS_ETAPA["renderizacao_ui"]: envio_ui.get(linha["tipo"])}
+                    for linha in rastro_geracao.detalhamento()
+                ],
+                hide_index=True, use_container_width=True
+            )
+            st.caption(
+                "Valores em ms. No modo único, a linha UNICO cobre a chamada com os quatro artefatos. "
+                "*Envio à UI: tempo no servidor para montar e enfileirar o texto da aba na primeira exibição, "
+                "medido depois da geração num rastro à parte; não inclui o desenho no navegador."
+            )
 
 # =====================
 # CONFIGURAÇÕES
@@ -325,19 +417,115 @@ elif menu_option == "⚙️ Configurações de IA":
             with [col_api1, col_api2, col_api3][i % 3]:
                 config["api_keys"][key] = st.text_input(f"{key.upper()} API Key", value=config["api_keys"].get(key, ""), type="password")
 
+        if st.button("🔄 Atualizar modelos Gemini", help="Descobre novamente o modelo Gemini disponível na próxima geração."):
+            from ia_models import limpar_registro_gemini
+            limpar_registro_gemini()
+            st.success("Registro de modelos Gemini limpo.")
+
+        st.subheader("🔗 Azure DevOps")
+        azure = config.setdefault("azure_devops", {})
+        col_az1, col_az2, col_az3 = st.columns(3)
+        with col_az1:
+            azure["organizacao"] = st.text_input("URL da organização", value=azure.get("organizacao", ""), placeholder="https://dev.azure.com/minha-org")
+        with col_az2:
+            azure["projeto"] = st.text_input("Projeto", value=azure.get("projeto", ""))
+        with col_az3:
+            azure["pat"] = st.text_input("Personal Access Token (Work Items: leitura e escrita)", value=azure.get("pat", ""), type="password")
+
+        st.subheader("⏱️ Limites de Taxa")
+        st.caption("Cota de cada chave de API: requisições e tokens por minuto. Ao receber um 429 a vazão cai pela metade e volta aos poucos.")
+        limites = config.setdefault("limites", {})
+        for nome, valores in limites_atuais().items():
+            col_nome, col_rpm, col_tpm = st.columns([1, 2, 2])
+            with col_nome:
+                st.markdown(f"**{nome}**")
+            with col_rpm:
+                rpm = st.number_input("Requisições/min", min_value=1, value=int(valores["rpm"]), key=f"rpm_{nome}")
+            with col_tpm:
+                tpm = st.number_input("Tokens/min", min_value=1000, value=int(valores["tpm"]), step=1000, key=f"tpm_{nome}")
+            limites[nome] = {"rpm": rpm, "tpm": tpm}
+        configurar_limites(limites)
+        estados = estado_limitadores()
+        if estados:
+            st.dataframe(estados, hide_index=True, use_container_width=True)
+
         st.subheader("🤖 Papel da IA (System Role)")
         config["ia_role"] = st.text_area("Descreva como a IA deve atuar", value=config.get("ia_role",""), height=100, 
                                           help="Ex: 'Você é um Product Owner sênior, focado em clareza e detalhamento técnico...'")
 
     with tab_playbook:
         st.subheader("📄 Upload de Playbook ou Documentação")
-        arquivo_ppt = st.file_uploader("Upload de Playbook em PPTX (opcional)", type=["pptx"])
-        if arquivo_ppt:
-            with st.spinner("Processando e extraindo texto do Playbook..."):
-                config["playbook_text"] = extrair_texto_ppt(arquivo_ppt)
-            st.success("Playbook carregado e processado com sucesso! A IA usará este texto como diretriz.")
+        arquivos_playbook = st.file_uploader("Upload de Playbook em PPTX, DOCX ou PDF (um ou vários arquivos, opcional)", type=["pptx", "docx", "pdf"], accept_multiple_files=True)
+        # Pastas do servidor só dentro da raiz definida no config.json pelo
+        # administrador (playbook_pasta_raiz); sem ela a opção fica desativada
+        raiz_pastas = config.get("playbook_pasta_raiz")
+        col_pasta, col_botao_pasta = st.columns([3, 1])
+        with col_pasta:
+            pasta_playbook = st.text_input(
+                "📁 Ou uma pasta no servidor com os documentos",
+                placeholder="subpasta/dos/playbooks",
+                disabled=not raiz_pastas,
+                help=f"Relativa a {raiz_pastas}." if raiz_pastas else "Defina playbook_pasta_raiz no config.json para habilitar."
+            )
+        with col_botao_pasta:
+            st.write("")
+            processar_pasta = st.button("📥 Processar pasta", use_container_width=True, disabled=not raiz_pastas)
+
+        documentos = list(arquivos_playbook or [])
+        if processar_pasta and pasta_playbook:
+            try:
+                documentos += listar_documentos(resolver_pasta(pasta_playbook, raiz_pastas), raiz=raiz_pastas)
+            except ValueError as e:
+                st.warning(f"⚠️ {e}")
+
+        if documentos:
+            barra = st.progress(0.0, text="Processando e extraindo texto do Playbook...")
+            log_arquivos = st.container()
+
+            def ao_progredir(item, concluidos, total):
+                barra.progress(concluidos / total, text=f"{concluidos}/{total} arquivos processados")
+                with log_arquivos:
+                    if item["erro"]:
+                        st.error(f"❌ {item['nome']}: {item['erro']}")
+                    elif item["reaproveitado"]:
+                        st.caption(f"♻️ {item['nome']}: sem alterações ({len(item['trechos'])} trechos do cache)")
+                    else:
+                        st.caption(f"✅ {item['nome']}: {len(item['trechos'])} trechos extraídos")
+
+            # Arquivos já vistos (mesmo SHA-256) vêm do cache; os novos são extraídos em paralelo
+            itens = ingerir_documentos(documentos, ao_progredir=ao_progredir)
+            versao, slides = mesclar_corpus(itens)
+            # O config é relido a cada rerun: o playbook processado fica na sessão
+            # até ser salvo (o botão "Processar pasta" só vale para este rerun)
+            st.session_state["playbook_pendente"] = {
+                "playbook_versao": versao,
+                "playbook_slides": slides,
+                "playbook_text": "\n".join(slides),
+                "playbook_documentos": [{"nome": item["nome"], "versao": item["versao"]} for item in itens if not item["erro"]]
+            }
+            config.update(st.session_state["playbook_pendente"])
+            obter_indice(trechos_do_playbook(config), versao)
+            st.success("Playbook carregado e processado com sucesso! Salve as configurações para mantê-lo.")
+            st.caption(f"Versão do playbook: `{versao[:12]}` ({len(config['playbook_documentos'])} arquivos, {len(slides)} trechos)")
+        elif "playbook_pendente" in st.session_state:
+            config.update(st.session_state["playbook_pendente"])
+            st.warning("⚠️ Playbook processado e ainda não salvo. Clique em 'Salvar Todas as Configurações' para mantê-lo.")
+            st.caption(f"Versão do playbook: `{config['playbook_versao'][:12]}`")
         elif "playbook_text" in config and config["playbook_text"]:
-             st.info("Playbook atual carregado. Faça um novo upload para substituir ou modifique o texto diretamente na config.json.")
+             st.info("Playbook atual carregado. Faça um novo upload para substituir.")
+             if config.get("playbook_versao"):
+                 st.caption(f"Versão do playbook: `{config['playbook_versao'][:12]}`")
+
+        st.subheader("🔎 Trechos Relevantes do Playbook")
+        busca = {**BUSCA_PADRAO, **config.get("playbook_busca", {})}
+        col_ativo, col_top_k, col_orcamento = st.columns(3)
+        with col_ativo:
+            busca["ativo"] = st.checkbox("Enviar apenas os slides relevantes", value=busca["ativo"], help="Indexa o playbook localmente e envia em cada prompt só os trechos mais relacionados ao artefato e ao contexto.")
+        with col_top_k:
+            busca["top_k"] = int(st.number_input("Trechos por artefato", min_value=1, max_value=50, value=int(busca["top_k"])))
+        with col_orcamento:
+            busca["orcamento_tokens"] = int(st.number_input("Orçamento de tokens do playbook", min_value=100, max_value=32000, step=100, value=int(busca["orcamento_tokens"])))
+        config["playbook_busca"] = busca
 
     with tab_prompts:
         st.subheader("💬 Prompts Padrão por Artefato")
@@ -346,8 +534,8 @@ elif menu_option == "⚙️ Configurações de IA":
             config["prompts"][p] = st.text_area(f"Prompt base para {p.upper()}", value=config["prompts"].get(p, ""), height=120, label_visibility="collapsed")
 
     if st.button("💾 Salvar Todas as Configurações", type="primary", use_container_width=True):
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
+        salvar_config(config, CONFIG_FILE)
+        st.session_state.pop("playbook_pendente", None)
         st.success("✅ Configurações salvas com sucesso! As alterações serão aplicadas na próxima geração.")
 
 # =====================
@@ -390,33 +578,61 @@ elif menu_option == "📂 Exportação":
     if "resultados" not in st.session_state:
         st.warning("⚠️ Gere os artefatos no menu 'Geração de Artefatos' antes de exportar.")
     else:
-        df = exportar_artefatos(st.session_state["resultados"])
+        # Cópia dos resultados: os arquivos são montados numa thread separada, só no clique
+        resultados = dict(st.session_state["resultados"])
+        df = exportar("tabela", resultados)
         
         st.subheader("Tabela de Artefatos Gerados")
         st.dataframe(df, use_container_width=True)
 
         st.markdown("---")
         
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns(3)
         with col1:
             st.download_button(
                 label="📥 Baixar Excel (.xlsx) para Azure DevOps",
-                data=baixar_excel(df),
+                data=lambda: exportar("xlsx", resultados),
                 file_name="artefatos_agile_premium.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 use_container_width=True
             )
         with col2:
-            try:
-                pdf_buffer = exportar_pdf(st.session_state["resultados"])
-                st.download_button(
-                    label="📥 Baixar PDF para Documentação",
-                    data=pdf_buffer,
-                    file_name="artefatos_agile_premium.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
-            except Exception as e:
-                st.error(f"Erro ao gerar PDF: {e}. Se o erro persistir, verifique a instalação do fpdf.")
+            # Se o PDF falhar, o erro aparece no clique (a montagem não roda mais ao abrir a página)
+            st.download_button(
+                label="📥 Baixar PDF para Documentação",
+                data=lambda: exportar("pdf", resultados),
+                file_name="artefatos_agile_premium.pdf",
+                mime="application/pdf",
+                use_container_width=True
+            )
+        with col3:
+            st.download_button(
+                label="📥 Baixar CSV (importação Azure Boards)",
+                data=lambda: exportar("csv_azure", resultados),
+                file_name="artefatos_azure_boards.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+
+        st.markdown("---")
+        from azure_devops import azure_configurado, enviar_work_items
+        config_azure = config.get("azure_devops", {})
+        if not azure_configurado(config_azure):
+            st.caption("Configure a organização, o projeto e o PAT do Azure DevOps em Configurações para enviar os work items direto ao board.")
+        elif st.button("🚀 Enviar work items ao Azure DevOps", use_container_width=True):
+            barra = st.progress(0.0, text="Enviando work items...")
+
+            def ao_progredir(concluidos, total):
+                barra.progress(concluidos / total, text=f"{concluidos}/{total} work items")
+
+            # A execução é o hash dos resultados: repetir o envio (novo clique depois
+            # de uma falha parcial, clique duplo) retoma e não duplica os work items
+            itens = enviar_work_items(config_azure, [resultados], execucao=hash_resultados(resultados), ao_progredir=ao_progredir)
+            barra.empty()
+            for item in itens:
+                if item["erro"]:
+                    st.error(f"{item['tipo']} '{item['titulo']}': {item['erro']}")
+                else:
+                    st.success(f"{item['tipo']} #{item['id']} criado: {item['titulo']}")
 
 
@@ -1,10 +1,13 @@
 import streamlit as st
 import json
+from configuracao import avisos_config, carregar_config, salvar_config
 import os
 import io
 import pandas as pd
-import time
 from fpdf import FPDF # type: ignore
+from gerador import montar_prompt, gerar_artefatos_concorrente
+from provedores import obter_provedor
+from provedores_mock import registrar_mocks
 # Importação mock da biblioteca pptx, que seria usada para extração
 # import { Presentation } from 'pptx'; // Mock
 
@@ -14,26 +17,8 @@ from fpdf import FPDF # type: ignore
 # Para um ambiente real, você as implementaria em arquivos separados.
 # ==============================================================================
 
-def gerar_resposta_gemini(prompt, api_key):
-    """MOCK: Simula a geração de resposta do Gemini."""
-    if not api_key:
-        raise ValueError("Chave Gemini não configurada.")
-    time.sleep(0.5) 
-    return f"**[GEMINI - EPIC]** Proposta de Épico Baseada em IA:\n\n*Tema:* {prompt[prompt.find('Contexto:')+10:prompt.find('Notas:')].strip()}\n\nO objetivo é focar em uma experiência de compra 'Premium' para o usuário."
-
-def gerar_resposta_gpt(prompt, api_key):
-    """MOCK: Simula a geração de resposta do ChatGPT."""
-    if not api_key:
-        raise ValueError("Chave ChatGPT não configurada.")
-    time.sleep(0.5)
-    return f"**[CHATGPT - FEATURE]** Proposta de Feature Baseada em IA:\n\n*Título:* Implementação de Pagamento Rápido via Pix.\n\nEsta feature reduzirá o atrito na etapa final do checkout."
-
-def gerar_resposta_copilot(prompt, api_key):
-    """MOCK: Simula a geração de resposta do Copilot."""
-    if not api_key:
-        raise ValueError("Chave Copilot não configurada.")
-    time.sleep(0.5)
-    return f"**[COPILOT - USER STORY]** Proposta de User Story Baseada em IA:\n\nComo um **usuário VIP**, eu quero **salvar meu endereço de entrega automaticamente**, para que **eu finalize compras com apenas um clique.**"
+# Os mocks de IA ficam em provedores_mock (também usados pela geração em lote offline)
+registrar_mocks()
 
 def extrair_texto_ppt(uploaded_file):
     """MOCK: Simula a extração de texto de um arquivo PPTX."""
@@ -173,17 +158,17 @@ INITIAL_CONFIG = {
 
 
 try:
-    with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-        config = json.load(f)
+    config = carregar_config(CONFIG_FILE)
 except FileNotFoundError:
     # Se não encontrar, cria o arquivo com a configuração inicial
     st.warning("Arquivo config.json não encontrado. Criando um arquivo padrão.")
     config = INITIAL_CONFIG
-    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
+    salvar_config(config, CONFIG_FILE)
 except json.JSONDecodeError:
     st.error("Erro ao ler config.json. O arquivo pode estar corrompido. Usando configurações padrão.")
     config = INITIAL_CONFIG
+for aviso in avisos_config(CONFIG_FILE):
+    st.warning(aviso)
 
 
 # =====================
@@ -201,8 +186,7 @@ def restaurar_chaves_api():
     config_to_save["api_keys"]["copilot"] = ""
     
     try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config_to_save, f, indent=4, ensure_ascii=False)
+        salvar_config(config_to_save, CONFIG_FILE)
         
         st.toast("✅ Chaves de API restauradas! Recarregando o aplicativo...", icon='🔒')
         # Método para forçar o recarregamento no Streamlit
@@ -335,7 +319,9 @@ if menu_option == "🧠 Geração de Artefatos":
             with st.expander("3. ⏳ **Processo de Geração Inteligente** (Detalhes)", expanded=True):
                 st.markdown(f"Analisando **contexto** e **playbook** ({modelo_escolhido})...")
                 
-                # Loop de geração
+                # Monta todos os prompts antes de enviar (nenhum depende da resposta anterior)
+                prompts = {}
+                status_por_tipo = {}
                 for i, tipo in enumerate(ARTEFATOS):
                     
                     # --- ATUALIZAÇÃO DO CARD: Estado 'Processando' ---
@@ -344,58 +330,59 @@ if menu_option == "🧠 Geração de Artefatos":
                         st.caption("⚡ Processando...")
                     
                     # Usa st.status para feedback detalhado
-                    with st.status(f"{EMOJIS[tipo]} Gerando **{tipo.upper()}** com {modelo_escolhido}...", expanded=False, state="running") as status:
-                        
+                    status = st.status(f"{EMOJIS[tipo]} Gerando **{tipo.upper()}** com {modelo_escolhido}...", expanded=False, state="running")
+                    status_por_tipo[tipo] = status
+                    with status:
                         st.write(f"**{EMOJIS[tipo]} PASSO 1/3: Construindo Prompt (contextualizando {tipo.upper()}).**")
                         
-                        prompt_final = f"{config.get('ia_role','')}\n\n"
-                        if "playbook_text" in config:
-                            prompt_final += f"Playbook/Diretriz: {config['playbook_text']}\n\n"
-                        
                         # Garante que o prompt seja específico para o tipo de artefato
-                        prompt_final += f"{config['prompts'].get(tipo, 'Gere um artefato.')}\n\nContexto:\n{contexto}\nNotas:\n{notas}"
+                        prompts[tipo] = montar_prompt(config, tipo, contexto, notas)
                         
                         st.write(f"**{EMOJIS[tipo]} PASSO 2/3: Invocando Modelo de IA ({modelo_escolhido}).**")
+                
+                # Chamada IA
+                provedor = obter_provedor(modelo_escolhido)
+                api_key = config["api_keys"][provedor.chave_config]
+                funcao_geracao = lambda prompt: provedor.gerar(prompt, api_key)
+                
+                # Os artefatos são gerados em paralelo; cada card é atualizado quando sua resposta chega
+                for tipo, resposta, erro in gerar_artefatos_concorrente(prompts, funcao_geracao):
+                    i = ARTEFATOS.index(tipo)
+                    status = status_por_tipo[tipo]
+                    
+                    if erro is None:
+                        resultados[tipo] = resposta
                         
-                        try:
-                            # Chamada IA
-                            if modelo_escolhido == "Gemini":
-                                resposta = gerar_resposta_gemini(prompt_final, config["api_keys"]["gemini"])
-                            elif modelo_escolhido == "ChatGPT":
-                                resposta = gerar_resposta_gpt(prompt_final, config["api_keys"]["chatgpt"])
-                            else:
-                                resposta = gerar_resposta_copilot(prompt_final, config["api_keys"]["copilot"])
-                                
-                            resultados[tipo] = resposta
-                            
+                        with status:
                             st.write(f"**{EMOJIS[tipo]} PASSO 3/3: Artefato recebido e validado.**")
-                            status.update(label=f"✅ **{tipo.upper()}** - Geração Finalizada!", state="complete", expanded=False)
-                            
-                            # --- ATUALIZAÇÃO DO CARD: Estado 'Concluído' ---
-                            with card_placeholders[i].container(border=True):
-                                st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
-                                st.caption("✅ Concluído com sucesso")
-                            
-                        except ValueError as ve:
-                             # Captura a exceção de chave não configurada
-                            resposta = f"Erro de Configuração: {ve}. Por favor, configure sua chave de API na seção 'Configurações de IA'."
-                            resultados[tipo] = resposta
+                        status.update(label=f"✅ **{tipo.upper()}** - Geração Finalizada!", state="complete", expanded=False)
+                        
+                        # --- ATUALIZAÇÃO DO CARD: Estado 'Concluído' ---
+                        with card_placeholders[i].container(border=True):
+                            st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
+                            st.caption("✅ Concluído com sucesso")
+                        
+                    elif isinstance(erro, ValueError):
+                        # Captura a exceção de chave não configurada
+                        resultados[tipo] = f"Erro de Configuração: {erro}. Por favor, configure sua chave de API na seção 'Configurações de IA'."
+                        with status:
                             st.write(f"**{EMOJIS[tipo]} ERRO FATAL: Chave de API ausente.**")
-                            status.update(label=f"❌ Erro ao gerar {tipo.upper()} (Chave ausente)", state="error", expanded=True)
-                        except Exception as e:
-                            resposta = f"Erro ao gerar {tipo.upper()}: {e}"
-                            resultados[tipo] = resposta
-                            
+                        status.update(label=f"❌ Erro ao gerar {tipo.upper()} (Chave ausente)", state="error", expanded=True)
+                    else:
+                        resultados[tipo] = f"Erro ao gerar {tipo.upper()}: {erro}"
+                        
+                        with status:
                             st.write(f"**{EMOJIS[tipo]} ERRO FATAL: Falha na comunicação com a API.**")
-                            status.update(label=f"❌ Erro ao gerar {tipo.upper()}", state="error", expanded=True)
-                            st.exception(e)
-                            
-                            # --- ATUALIZAÇÃO DO CARD: Estado 'Erro' ---
-                            with card_placeholders[i].container(border=True):
-                                st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
-                                st.caption("❌ Erro de Geração")
+                            st.exception(erro)
+                        status.update(label=f"❌ Erro ao gerar {tipo.upper()}", state="error", expanded=True)
+                        
+                        # --- ATUALIZAÇÃO DO CARD: Estado 'Erro' ---
+                        with card_placeholders[i].container(border=True):
+                            st.markdown(f"**<span style='color:{CORES[tipo]};'>{EMOJIS[tipo]} {tipo.upper()}</span>**", unsafe_allow_html=True)
+                            st.caption("❌ Erro de Geração")
                             
-                st.session_state["resultados"] = resultados
+                # Mantém a ordem do ciclo (epic → task) independente da ordem de chegada
+                st.session_state["resultados"] = {tipo: resultados[tipo] for tipo in ARTEFATOS if tipo in resultados}
                 st.toast("🚀 Geração de Artefatos Completa!", icon='🎉')
             
             st.markdown("---") # Separador após a conclusão da geração
@@ -476,8 +463,7 @@ elif menu_option == "⚙️ Configurações de IA":
         with col_save:
             # Lógica de salvamento completa
             if st.button("💾 Salvar Todas as Configurações", type="primary", use_container_width=True):
-                with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-                    json.dump(config, f, indent=4, ensure_ascii=False)
+                salvar_config(config, CONFIG_FILE)
                 st.success("✅ Configurações salvas com sucesso! As alterações serão aplicadas na próxima geração.")
 
     with tab_playbook:
@@ -488,7 +474,7 @@ elif menu_option == "⚙️ Configurações de IA":
                 config["playbook_text"] = extrair_texto_ppt(arquivo_ppt)
             st.success("Playbook carregado e processado com sucesso! A IA usará este texto como diretriz.")
         elif "playbook_text" in config and config["playbook_text"]:
-            st.info("Playbook atual carregado. Faça um novo upload para substituir ou modifique o texto diretamente na config.json.")
+            st.info("Playbook atual carregado. Faça um novo upload para substituir.")
 
     with tab_prompts:
         st.subheader("💬 Prompts Padrão por Artefato")
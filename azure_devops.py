@@ -0,0 +1,263 @@
+import hashlib
+import html
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import RE_CRITERIOS, linhas_hierarquicas
+
+# =====================
+# ENVIO DE WORK ITEMS AO AZURE DEVOPS ($batch)
+# =====================
+# Os work items são criados pela API $batch, em lotes de AZURE_TAMANHO_LOTE
+# com até AZURE_MAX_CONCORRENCIA lotes ao mesmo tempo, nível a nível
+# (Epics, depois Features...), para que o pai já tenha ID quando o filho é
+# criado. Cada item leva uma tag com a chave da execução: os itens já criados
+# são encontrados por WIQL antes de reenviar um lote que falhou sem resposta
+# clara e, quando quem chama passa a execucao, já antes da primeira
+# tentativa. Assim nem a nova tentativa nem um novo envio duplicam nada.
+AZURE_API_VERSION = "7.1"
+AZURE_TAMANHO_LOTE = 50        # a API aceita até 200 operações por $batch
+AZURE_MAX_CONCORRENCIA = 4
+AZURE_TENTATIVAS = 4
+AZURE_ESPERA_BASE = 1.0        # segundos, dobra a cada tentativa
+AZURE_TIMEOUT = (5, 60)
+AZURE_PREFIXO_TAG = "gerador-"
+
+# Respostas que indicam que o lote não foi processado (ou pode não ter sido)
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+
+
+class ErroAzureDevOps(Exception):
+    pass
+
+
+_sessoes = {}  # PAT -> requests.Session
+_sessoes_lock = threading.Lock()
+
+def obter_sessao_azure(pat):
+    """Sessão com pool de conexões, uma por PAT, reaproveitada entre envios."""
+    with _sessoes_lock:
+        sessao = _sessoes.get(pat)
+        if sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=AZURE_MAX_CONCORRENCIA)
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            sessao.auth = ("", pat)
+            _sessoes[pat] = sessao
+        return sessao
+
+def azure_configurado(config_azure):
+    return bool(config_azure and config_azure.get("organizacao") and config_azure.get("projeto") and config_azure.get("pat"))
+
+# =====================
+# MONTAGEM DAS OPERAÇÕES
+# =====================
+def _html(texto):
+    return html.escape(texto.strip(), quote=False).replace("\n", "<br>")
+
+def campos_work_item(tipo, titulo, texto):
+    """Campos do work item; os critérios de aceitação saem da descrição quando há o título da seção."""
+    campos = {"System.Title": titulo or tipo}
+    partes = re.match(RE_CRITERIOS, texto) if tipo != "Task" else None
+    if partes:
+        campos["System.Description"] = _html(partes.group(1))
+        campos["Microsoft.VSTS.Common.AcceptanceCriteria"] = _html(partes.group(2))
+    else:
+        campos["System.Description"] = _html(texto)
+    return campos
+
+def chave_item(execucao, id_local):
+    return AZURE_PREFIXO_TAG + hashlib.sha256(f"{execucao}:{id_local}".encode("utf-8")).hexdigest()[:16]
+
+def _url_work_item(organizacao, id_azure):
+    return f"{organizacao}/_apis/wit/workItems/{id_azure}"
+
+def _operacao(config_azure, item, id_pai):
+    corpo = [
+        {"op": "add", "path": f"/fields/{campo}", "value": valor}
+        for campo, valor in item["campos"].items()
+    ]
+    corpo.append({"op": "add", "path": "/fields/System.Tags", "value": item["chave"]})
+    if id_pai is not None:
+        corpo.append({
+            "op": "add",
+            "path": "/relations/-",
+            "value": {
+                "rel": "System.LinkTypes.Hierarchy-Reverse",
+                "url": _url_work_item(config_azure["organizacao"], id_pai)
+            }
+        })
+    return {
+        "method": "PATCH",
+        "uri": f"/{config_azure['projeto']}/_apis/wit/workitems/${item['tipo']}?api-version={AZURE_API_VERSION}",
+        "headers": {"Content-Type": "application/json-patch+json"},
+        "body": corpo
+    }
+
+# =====================
+# CHAMADAS HTTP
+# =====================
+def _espera(tentativa, resposta=None):
+    if resposta is not None:
+        try:
+            return float(resposta.headers["Retry-After"])
+        except (KeyError, ValueError):
+            pass
+    return AZURE_ESPERA_BASE * (2 ** tentativa) * random.uniform(0.5, 1.5)
+
+def _enviar_batch(sessao, config_azure, operacoes):
+    """Retorna a lista de respostas do $batch, ou levanta requests.RequestException / ErroAzureDevOps."""
+    resposta = sessao.post(
+        f"{config_azure['organizacao']}/_apis/wit/$batch?api-version={AZURE_API_VERSION}",
+        json=operacoes,
+        timeout=AZURE_TIMEOUT
+    )
+    if resposta.status_code in STATUS_REPETIVEIS:
+        raise requests.HTTPError(f"HTTP {resposta.status_code}", response=resposta)
+    if resposta.status_code != 200:
+        raise ErroAzureDevOps(f"HTTP {resposta.status_code}: {resposta.text[:300]}")
+    return resposta.json()["value"]
+
+def buscar_por_chaves(sessao, config_azure, chaves):
+    """{chave: id} dos work items do projeto que já têm alguma das tags."""
+    if not chaves:
+        return {}
+    condicoes = " OR ".join(f"[System.Tags] CONTAINS '{chave}'" for chave in chaves)
+    resposta = sessao.post(
+        f"{config_azure['organizacao']}/{config_azure['projeto']}/_apis/wit/wiql?api-version={AZURE_API_VERSION}",
+        json={"query": f"SELECT [System.Id] FROM WorkItems WHERE [System.TeamProject] = @project AND ({condicoes})"},
+        timeout=AZURE_TIMEOUT
+    )
+    resposta.raise_for_status()
+    ids = [item["id"] for item in resposta.json().get("workItems", [])]
+    if not ids:
+        return {}
+    resposta = sessao.get(
+        f"{config_azure['organizacao']}/_apis/wit/workitems",
+        params={"ids": ",".join(map(str, ids)), "fields": "System.Id,System.Tags", "api-version": AZURE_API_VERSION},
+        timeout=AZURE_TIMEOUT
+    )
+    resposta.raise_for_status()
+    encontrados = {}
+    for item in resposta.json().get("value", []):
+        for tag in (item["fields"].get("System.Tags") or "").split(";"):
+            if tag.strip() in chaves:
+                encontrados[tag.strip()] = item["id"]
+    return encontrados
+
+def _criar_lote(sessao, config_azure, lote, ids, conferir=False):
+    """
+    Cria os itens do lote e devolve {id_local: (id_azure, erro)}. Repete o
+    lote em falhas de rede/limite de taxa, conferindo antes o que já existe
+    (com conferir=True, também antes da primeira tentativa).
+    """
+    resultado = {}
+    pendentes = list(lote)
+    for tentativa in range(AZURE_TENTATIVAS):
+        try:
+            if tentativa or conferir:
+                existentes = buscar_por_chaves(sessao, config_azure, {item["chave"] for item in pendentes})
+                for item in pendentes:
+                    if item["chave"] in existentes:
+                        resultado[item["id_local"]] = (existentes[item["chave"]], None)
+                pendentes = [item for item in pendentes if item["chave"] not in existentes]
+                if not pendentes:
+                    break
+
+            respostas = _enviar_batch(
+                sessao, config_azure,
+                [_operacao(config_azure, item, ids.get(item["pai"])) for item in pendentes]
+            )
+            for item, resposta in zip(pendentes, respostas):
+                if resposta.get("code") == 200:
+                    resultado[item["id_local"]] = (json.loads(resposta["body"])["id"], None)
+                else:
+                    resultado[item["id_local"]] = (None, f"HTTP {resposta.get('code')}: {str(resposta.get('body'))[:300]}")
+            pendentes = []
+            break
+        except requests.RequestException as e:
+            if tentativa == AZURE_TENTATIVAS - 1:
+                for item in pendentes:
+                    resultado[item["id_local"]] = (None, f"Falha após {AZURE_TENTATIVAS} tentativas: {e}")
+                break
+            time.sleep(_espera(tentativa, getattr(e, "response", None)))
+        except ErroAzureDevOps as e:
+            for item in pendentes:
+                resultado[item["id_local"]] = (None, str(e))
+            break
+    return resultado
+
+# =====================
+# ENVIO
+# =====================
+def enviar_work_items(config_azure, lista_resultados, execucao=None, ao_progredir=None):
+    """
+    config_azure = {"organizacao": "https://dev.azure.com/minha-org", "projeto": "...", "pat": "..."}
+    lista_resultados = iterável de dicts no formato de exportar_artefatos.
+    Cria Epic > Feature > User Story > Task ligando cada item ao pai.
+    execucao identifica o envio; repetir com a mesma execucao retoma sem
+    duplicar: os itens que já existem com a chave da execução são pulados.
+    Retorna uma lista de {"id_local", "tipo", "titulo", "id", "erro"}.
+    """
+    # Uma execução nova (sem id de quem chama) não tem o que conferir antes de enviar
+    conferir = execucao is not None
+    execucao = execucao or uuid.uuid4().hex
+    itens, niveis = [], {}
+    for id_local, tipo, titulo, pai, texto in linhas_hierarquicas(lista_resultados):
+        niveis[id_local] = niveis[pai] + 1 if pai is not None else 0
+        itens.append({
+            "id_local": id_local,
+            "tipo": tipo,
+            "titulo": titulo,
+            "pai": pai,
+            "nivel": niveis[id_local],
+            "chave": chave_item(execucao, id_local),
+            "campos": campos_work_item(tipo, titulo, texto)
+        })
+
+    sessao = obter_sessao_azure(config_azure["pat"])
+    ids, erros = {}, {}
+    concluidos = 0
+    with ThreadPoolExecutor(max_workers=AZURE_MAX_CONCORRENCIA) as executor:
+        for nivel in sorted(set(niveis.values())):
+            prontos = []
+            for item in itens:
+                if item["nivel"] != nivel:
+                    continue
+                if item["pai"] is not None and item["pai"] not in ids:
+                    erros[item["id_local"]] = "Item pai não foi criado."
+                    concluidos += 1
+                else:
+                    prontos.append(item)
+
+            lotes = [prontos[i:i + AZURE_TAMANHO_LOTE] for i in range(0, len(prontos), AZURE_TAMANHO_LOTE)]
+            futuros = [executor.submit(_criar_lote, sessao, config_azure, lote, dict(ids), conferir) for lote in lotes]
+            for futuro in as_completed(futuros):
+                for id_local, (id_azure, erro) in futuro.result().items():
+                    if erro:
+                        erros[id_local] = erro
+                    else:
+                        ids[id_local] = id_azure
+                    concluidos += 1
+                if ao_progredir:
+                    ao_progredir(concluidos, len(itens))
+
+    return [
+        {
+            "id_local": item["id_local"],
+            "tipo": item["tipo"],
+            "titulo": item["titulo"],
+            "id": ids.get(item["id_local"]),
+            "erro": erros.get(item["id_local"])
+        }
+        for item in itens
+    ]
@@ -0,0 +1,177 @@
+"""
+Benchmark: envio de work items ao Azure DevOps contra um servidor local que
+imita a API ($batch, WIQL e leitura de work items), com latência por
+requisição e falhas injetadas para exercitar as novas tentativas. No fim,
+repete o mesmo envio (mesma execucao) e confere que nenhum work item foi
+duplicado; o código de saída é 1 se foi.
+
+Uso:
+    python benchmarks/bench_envio_azure.py --grupos 100 --latencia 0.05 --falhas 0.1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import azure_devops  # noqa: E402
+
+
+class ServidorAzureFalso(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latencia, falhas):
+        super().__init__(("127.0.0.1", 0), ManipuladorAzure)
+        self.latencia = latencia
+        self.falhas = falhas
+        self.itens = {}  # id -> campos
+        self.lock = threading.Lock()
+        self.requisicoes = 0
+
+
+class ManipuladorAzure(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _ler_json(self):
+        return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+    def do_POST(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.requisicoes += 1
+        time.sleep(servidor.latencia)
+        caminho = urlparse(self.path).path
+        corpo = self._ler_json()
+
+        if caminho.endswith("/_apis/wit/$batch"):
+            sorteio = random.random()
+            if sorteio < servidor.falhas / 2:
+                return self._responder(429, {"message": "limite de taxa"}, {"Retry-After": "0.1"})
+            respostas = []
+            for operacao in corpo:
+                campos = {
+                    op["path"].split("/fields/")[1]: op["value"]
+                    for op in operacao["body"] if op["path"].startswith("/fields/")
+                }
+                with servidor.lock:
+                    id_novo = len(servidor.itens) + 1
+                    servidor.itens[id_novo] = campos
+                respostas.append({"code": 200, "body": json.dumps({"id": id_novo, "fields": campos})})
+            if sorteio < servidor.falhas:
+                # Processou, mas a resposta "se perdeu": a nova tentativa precisa reconciliar
+                return self._responder(502, {"message": "gateway"})
+            return self._responder(200, {"count": len(respostas), "value": respostas})
+
+        if caminho.endswith("/_apis/wit/wiql"):
+            consulta = corpo["query"]
+            with servidor.lock:
+                ids = [
+                    id_item for id_item, campos in servidor.itens.items()
+                    if f"'{campos.get('System.Tags', '')}'" in consulta
+                ]
+            return self._responder(200, {"workItems": [{"id": i} for i in ids]})
+
+        self._responder(404, {"message": caminho})
+
+    def do_GET(self):
+        consulta = parse_qs(urlparse(self.path).query)
+        ids = [int(i) for i in consulta.get("ids", [""])[0].split(",") if i]
+        with self.server.lock:
+            valor = [{"id": i, "fields": self.server.itens[i]} for i in ids if i in self.server.itens]
+        self._responder(200, {"count": len(valor), "value": valor})
+
+
+def gerar_resultados(grupos):
+    return [
+        {
+            "epic": f"Épico {i}\nVisão do épico {i}.\n\nCritérios de aceitação\n- valor entregue",
+            "feature": f"Feature {i}\nDescrição da feature.",
+            "user_story": f"Como usuário {i}, quero algo para obter valor.",
+            "task": f"Task {i}\nImplementar."
+        }
+        for i in range(grupos)
+    ]
+
+
+def config_falsa(servidor):
+    return {
+        "organizacao": f"http://127.0.0.1:{servidor.server_address[1]}/org",
+        "projeto": "Projeto",
+        "pat": "pat-falso"
+    }
+
+
+def medir(servidor, resultados, tamanho_lote, concorrencia):
+    azure_devops.AZURE_TAMANHO_LOTE = tamanho_lote
+    azure_devops.AZURE_MAX_CONCORRENCIA = concorrencia
+    azure_devops.AZURE_ESPERA_BASE = 0.05
+    azure_devops._sessoes.clear()
+    servidor.itens.clear()
+    servidor.requisicoes = 0
+    config_azure = config_falsa(servidor)
+    inicio = time.perf_counter()
+    itens = azure_devops.enviar_work_items(config_azure, resultados)
+    duracao = time.perf_counter() - inicio
+    erros = sum(1 for item in itens if item["erro"])
+    return duracao, len(itens), len(servidor.itens), servidor.requisicoes, erros
+
+
+def conferir_reenvio(servidor, resultados):
+    """Envia duas vezes com a mesma execucao: a segunda não pode criar work items."""
+    servidor.itens.clear()
+    config_azure = config_falsa(servidor)
+    primeiro = azure_devops.enviar_work_items(config_azure, resultados, execucao="reenvio")
+    criados = len(servidor.itens)
+    segundo = azure_devops.enviar_work_items(config_azure, resultados, execucao="reenvio")
+    mesmos_ids = [item["id"] for item in primeiro] == [item["id"] for item in segundo]
+    return criados, len(servidor.itens), mesmos_ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--grupos", type=int, default=100, help="dicts de resultados (4 work items cada)")
+    parser.add_argument("--latencia", type=float, default=0.05, help="latência por requisição (s)")
+    parser.add_argument("--falhas", type=float, default=0.0, help="fração de $batch com erro (429/502)")
+    args = parser.parse_args()
+
+    servidor = ServidorAzureFalso(args.latencia, args.falhas)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    resultados = gerar_resultados(args.grupos)
+
+    cenarios = [
+        ("um item por requisição, em série", 1, 1),
+        (f"$batch de {azure_devops.AZURE_TAMANHO_LOTE}, {azure_devops.AZURE_MAX_CONCORRENCIA} em paralelo",
+         azure_devops.AZURE_TAMANHO_LOTE, azure_devops.AZURE_MAX_CONCORRENCIA),
+    ]
+    for nome, tamanho_lote, concorrencia in cenarios:
+        duracao, enviados, criados, requisicoes, erros = medir(servidor, resultados, tamanho_lote, concorrencia)
+        print(f"{nome:40s} {duracao:7.2f}s  itens={enviados} criados={criados} "
+              f"requisições={requisicoes} erros={erros}")
+
+    antes, depois, mesmos_ids = conferir_reenvio(servidor, resultados)
+    print(f"{'reenvio com a mesma execucao':40s} criados={antes} depois do reenvio={depois} mesmos ids={mesmos_ids}")
+    servidor.shutdown()
+    if depois != antes or not mesmos_ids:
+        print("O reenvio duplicou work items.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
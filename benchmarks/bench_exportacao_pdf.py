@@ -0,0 +1,96 @@
+"""
+Benchmark: exportação PDF (páginas por segundo).
+
+Compara a montagem antiga (FPDF novo a cada documento, registrando a fonte
+de novo, texto com multi_cell) com a cópia do documento modelo, o PDF único
+em lote e o ZIP montado no pool de processos.
+
+Uso:
+    python benchmarks/bench_exportacao_pdf.py --documentos 200 --processos 4
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from fpdf import FPDF
+from pypdf import PdfReader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import exportacao_pdf  # noqa: E402
+
+
+def gerar_resultados(documentos, paragrafos):
+    texto = (
+        "Como analista de negócios, quero revisar a visão do épico “Portal do Cliente” — "
+        "com critérios de aceitação claros, para que a equipe priorize a migração. "
+    )
+    return [
+        {tipo: f"{tipo.title()} {i}\n" + "\n".join([texto] * paragrafos) for tipo in ("epic", "feature", "user_story", "task")}
+        for i in range(documentos)
+    ]
+
+
+def exportar_pdf_sem_modelo(resultados):
+    """Como era antes: cada documento registra a fonte do zero e usa multi_cell."""
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    regular = exportacao_pdf._primeira_existente("PDF_FONTE", exportacao_pdf.FONTES_REGULAR)
+    negrito = exportacao_pdf._primeira_existente("PDF_FONTE_NEGRITO", exportacao_pdf.FONTES_NEGRITO) or regular
+    pdf.add_font("artefatos", "", regular)
+    pdf.add_font("artefatos", "B", negrito)
+    pdf.add_page()
+    pdf.set_font("artefatos", "B", 18)
+    pdf.cell(0, 15, exportacao_pdf.TITULO_PDF, new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(10)
+    for tipo, conteudo in resultados.items():
+        pdf.set_font("artefatos", "B", 14)
+        pdf.cell(0, 8, tipo.upper(), new_x="LMARGIN", new_y="NEXT", fill=True)
+        pdf.set_font("artefatos", "", 11)
+        pdf.multi_cell(0, 6, conteudo)
+        pdf.ln(5)
+    return bytes(pdf.output())
+
+
+def paginas(dados):
+    return len(PdfReader(io.BytesIO(dados)).pages)
+
+
+def paginas_zip(buffer):
+    import zipfile
+    with zipfile.ZipFile(buffer) as zf:
+        return sum(paginas(zf.read(nome)) for nome in zf.namelist())
+
+
+def medir(nome, funcao, contar):
+    inicio = time.perf_counter()
+    saida = funcao()
+    duracao = time.perf_counter() - inicio
+    total = contar(saida)
+    print(f"{nome:38s} {duracao:7.2f}s  {total:5d} páginas  {total / duracao:8.1f} páginas/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documentos", type=int, default=200)
+    parser.add_argument("--paragrafos", type=int, default=6, help="parágrafos por artefato")
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if exportacao_pdf._primeira_existente("PDF_FONTE", exportacao_pdf.FONTES_REGULAR) is None:
+        sys.exit("Nenhuma fonte TTF encontrada (defina PDF_FONTE).")
+    lista = gerar_resultados(args.documentos, args.paragrafos)
+    exportacao_pdf.novo_documento()  # registra a fonte fora da medição
+
+    medir("um FPDF por documento (antes)", lambda: [exportar_pdf_sem_modelo(r) for r in lista],
+          lambda saidas: sum(paginas(s) for s in saidas))
+    medir("cópia do modelo por documento", lambda: [exportacao_pdf.exportar_pdf(r).getvalue() for r in lista],
+          lambda saidas: sum(paginas(s) for s in saidas))
+    medir("PDF único (exportar_pdf_lote)", lambda: exportacao_pdf.exportar_pdf_lote(lista), paginas)
+    medir(f"ZIP, pool de {args.processos} processos",
+          lambda: exportacao_pdf.exportar_pdfs_zip(lista, max_workers=args.processos), paginas_zip)
+
+
+if __name__ == "__main__":
+    main()
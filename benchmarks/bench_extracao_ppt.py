@@ -0,0 +1,90 @@
+"""
+Benchmark: extração de texto do playbook (python-pptx x leitura direta do XML).
+
+Uso:
+    python benchmarks/bench_extracao_ppt.py --slides 300 --repeticoes 3
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+from pptx import Presentation
+from pptx.util import Inches
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import extrair_texto_ppt  # noqa: E402
+
+
+def extrair_texto_ppt_pptx(file):
+    """Implementação anterior (modelo de objetos do python-pptx)."""
+    prs = Presentation(file)
+    texto = ""
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                texto += shape.text + "\n"
+    return texto
+
+
+def gerar_imagem(semente, lado=256):
+    # PNG com ruído (não comprime), como as fotos/prints de um playbook real
+    from PIL import Image
+    imagem = Image.frombytes("RGB", (lado, lado), random.Random(semente).randbytes(lado * lado * 3))
+    buffer = io.BytesIO()
+    imagem.save(buffer, format="PNG")
+    buffer.seek(0)
+    return buffer
+
+
+def gerar_playbook(qtd_slides, paragrafos_por_slide, com_imagens=True):
+    prs = Presentation()
+    for i in range(qtd_slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Diretriz {i}: boas práticas de refinamento"
+        corpo = slide.placeholders[1].text_frame
+        corpo.text = "Critérios de aceitação claros e testáveis."
+        for j in range(paragrafos_por_slide):
+            corpo.add_paragraph().text = f"Item {j}: histórias seguem INVEST e têm definição de pronto."
+        tabela = slide.shapes.add_table(3, 3, Inches(1), Inches(5), Inches(6), Inches(1)).table
+        for celula in tabela.iter_cells():
+            celula.text = "Papel / Responsabilidade"
+        slide.notes_slide.notes_text_frame.text = f"Anotação do apresentador do slide {i}."
+        if com_imagens:
+            slide.shapes.add_picture(gerar_imagem(i), Inches(7), Inches(1), Inches(2))
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def medir(funcao, dados, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(io.BytesIO(dados))
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--slides", type=int, default=300)
+    parser.add_argument("--paragrafos", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-imagens", action="store_true")
+    args = parser.parse_args()
+
+    dados = gerar_playbook(args.slides, args.paragrafos, com_imagens=not args.sem_imagens)
+    print(f"Playbook: {args.slides} slides, {len(dados) / 1024:.0f} KB")
+
+    antigo = medir(extrair_texto_ppt_pptx, dados, args.repeticoes)
+    novo = medir(extrair_texto_ppt, dados, args.repeticoes)
+    print(f"python-pptx:      {antigo * 1000:8.1f} ms")
+    print(f"XML (iterparse):  {novo * 1000:8.1f} ms")
+    print(f"Ganho:            {antigo / novo:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: tempo de importação de cada ponto de entrada (python -X importtime).
+
+Roda, num processo novo por medição, só os imports de nível de módulo de
+cada app (sem executar a página) e soma o tempo cumulativo dos módulos de
+topo. O que o próprio interpretador carrega ao iniciar (site, encodings)
+fica de fora, e o Streamlit aparece à parte, já que todo app paga por ele.
+
+Uso:
+    python benchmarks/bench_importacao.py
+    python benchmarks/bench_importacao.py --gravar-base base_importacao.json
+    python benchmarks/bench_importacao.py --base base_importacao.json --tolerancia 0.25
+    python benchmarks/bench_importacao.py --orcamento-ms 400
+
+Com --base ou --orcamento-ms o código de saída é 1 se algum ponto de
+entrada ficar acima do limite (para acompanhar regressões).
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PONTOS_DE_ENTRADA = ["app.py", "app1.py", "app2.py", "app3.py", "app4.py", "app4.1.py", "app_novo.py", "lote.py"]
+FRAMEWORK = "streamlit"
+
+
+def imports_de_topo(caminho):
+    """Os comandos import do nível de módulo do arquivo, como código executável."""
+    with open(caminho, "r", encoding="utf-8") as f:
+        arvore = ast.parse(f.read(), filename=caminho)
+    return "\n".join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def medir_imports(codigo):
+    """{módulo de topo: microssegundos cumulativos} de uma execução de python -X importtime."""
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.strip().splitlines()[-1])
+    tempos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        # Módulos de topo não têm recuo; os importados por eles vêm indentados
+        nome = nome[1:].rstrip()
+        if not nome.startswith(" "):
+            tempos[nome] = int(cumulativo)
+    return tempos
+
+
+def medir_ponto(arquivo, repeticoes, inicializacao):
+    codigo = imports_de_topo(os.path.join(RAIZ, arquivo))
+    melhor = None
+    for _ in range(repeticoes):
+        tempos = {nome: us for nome, us in medir_imports(codigo).items() if nome not in inicializacao}
+        total = sum(tempos.values())
+        if melhor is None or total < sum(melhor.values()):
+            melhor = tempos
+    framework = melhor.get(FRAMEWORK, 0)
+    return {
+        "total_ms": sum(melhor.values()) / 1000,
+        "framework_ms": framework / 1000,
+        "app_ms": (sum(melhor.values()) - framework) / 1000,
+        "mais_pesados": sorted(
+            ((nome, us / 1000) for nome, us in melhor.items() if nome != FRAMEWORK),
+            key=lambda item: -item[1]
+        )[:5]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pontos", nargs="*", default=PONTOS_DE_ENTRADA, help="arquivos a medir (padrão: todos os apps e o lote)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="medições por arquivo (vale a menor)")
+    parser.add_argument("--base", help="JSON de uma medição anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="aumento aceito sobre a base (fração)")
+    parser.add_argument("--orcamento-ms", type=float, help="limite de tempo de importação sem o Streamlit (ms)")
+    parser.add_argument("--gravar-base", help="grava a medição atual neste JSON")
+    args = parser.parse_args()
+
+    base = {}
+    if args.base:
+        with open(args.base, "r", encoding="utf-8") as f:
+            base = json.load(f)
+
+    inicializacao = set(medir_imports("pass"))
+    resultados, estourados = {}, []
+    for arquivo in args.pontos:
+        medicao = medir_ponto(arquivo, args.repeticoes, inicializacao)
+        resultados[arquivo] = medicao
+        pesados = ", ".join(f"{nome} {ms:.0f}" for nome, ms in medicao["mais_pesados"])
+        print(f"{arquivo:12s} app {medicao['app_ms']:8.1f} ms  (+ {FRAMEWORK} {medicao['framework_ms']:6.1f} ms)  {pesados}")
+
+        limites = []
+        if arquivo in base:
+            limites.append(base[arquivo]["app_ms"] * (1 + args.tolerancia))
+        if args.orcamento_ms is not None:
+            limites.append(args.orcamento_ms)
+        if limites and medicao["app_ms"] > min(limites):
+            estourados.append(f"{arquivo}: {medicao['app_ms']:.1f} ms > {min(limites):.1f} ms")
+
+    if args.gravar_base:
+        with open(args.gravar_base, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+    if estourados:
+        print("Acima do limite:\n  " + "\n  ".join(estourados), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+
+# =====================
+# CACHE DO PLAYBOOK EXTRAÍDO (ENDEREÇADO POR CONTEÚDO)
+# =====================
+# O texto por slide (e o índice de busca) fica em disco sob o SHA-256 dos
+# bytes do arquivo enviado. O mesmo deck enviado de novo, ou um rerun do
+# Streamlit com o arquivo ainda anexado, não é processado outra vez. A
+# extração fica em ingestao_playbook, que consulta este cache antes de abrir
+# cada documento.
+PLAYBOOK_CACHE_DIR = os.path.join(".cache", "playbooks")
+PLAYBOOK_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+def hash_conteudo(dados):
+    return hashlib.sha256(dados).hexdigest()
+
+def _caminho(versao, extensao):
+    return os.path.join(PLAYBOOK_CACHE_DIR, f"{versao}.{extensao}")
+
+def carregar_slides(versao):
+    caminho = _caminho(versao, "json")
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            slides = json.load(f)["slides"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+    os.utime(caminho)  # marca o acesso para a limpeza LRU
+    return slides
+
+def salvar_slides(versao, slides, nome=""):
+    os.makedirs(PLAYBOOK_CACHE_DIR, exist_ok=True)
+    # Temporário com nome único: o pool de ingestão e um upload simultâneo do
+    # mesmo arquivo podem gravar a mesma versão ao mesmo tempo
+    descritor, temporario = tempfile.mkstemp(dir=PLAYBOOK_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "w", encoding="utf-8") as f:
+            json.dump({"nome": nome, "criado_em": time.time(), "slides": slides}, f, ensure_ascii=False)
+        os.replace(temporario, _caminho(versao, "json"))
+    except BaseException:
+        _remover(temporario)
+        raise
+    limpar_excedente()
+
+def carregar_indice(versao):
+    caminho = _caminho(versao, "indice.pkl")
+    try:
+        with open(caminho, "rb") as f:
+            indice = pickle.load(f)
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    os.utime(caminho)
+    return indice
+
+def salvar_indice(versao, indice):
+    os.makedirs(PLAYBOOK_CACHE_DIR, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=PLAYBOOK_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "wb") as f:
+            pickle.dump(indice, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, _caminho(versao, "indice.pkl"))
+    except BaseException:
+        _remover(temporario)
+        raise
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+def limpar_excedente():
+    """Remove os arquivos menos acessados até caber em PLAYBOOK_CACHE_MAX_BYTES."""
+    try:
+        entradas = [e for e in os.scandir(PLAYBOOK_CACHE_DIR) if e.is_file() and not e.name.endswith(".tmp")]
+    except FileNotFoundError:
+        return
+    entradas.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    total = 0
+    for entrada in entradas:
+        total += entrada.stat().st_size
+        if total > PLAYBOOK_CACHE_MAX_BYTES:
+            try:
+                os.remove(entrada.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# =====================
+# CACHE PERSISTENTE DE RESPOSTAS
+# =====================
+# Respostas ficam em SQLite, indexadas pelo hash de provedor, modelo, prompt
+# final e parâmetros de geração. A limpeza remove o que passou da idade
+# máxima e, se ainda exceder o tamanho, os itens menos acessados (LRU).
+CACHE_DB = os.path.join(".cache", "respostas.sqlite3")
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+CACHE_MAX_IDADE_SEGUNDOS = 7 * 24 * 3600
+
+_contadores = {"acertos": 0, "falhas": 0}
+_lock = threading.Lock()
+_tabela_criada = False
+
+def _conectar():
+    global _tabela_criada
+    os.makedirs(os.path.dirname(CACHE_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(CACHE_DB, timeout=10)
+    if not _tabela_criada:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                provedor TEXT,
+                modelo TEXT,
+                resposta TEXT,
+                tamanho INTEGER,
+                criado_em REAL,
+                acessado_em REAL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado_em)")
+        conn.commit()
+        _tabela_criada = True
+    return conn
+
+def gerar_chave(provedor, modelo, prompt, parametros=None):
+    conteudo = json.dumps(
+        [provedor, modelo, prompt, parametros or {}],
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+def buscar(chave):
+    agora = time.time()
+    conn = _conectar()
+    try:
+        linha = conn.execute(
+            "SELECT resposta FROM respostas WHERE chave = ? AND criado_em >= ?",
+            (chave, agora - CACHE_MAX_IDADE_SEGUNDOS)
+        ).fetchone()
+        if linha is not None:
+            conn.execute("UPDATE respostas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+            conn.commit()
+    finally:
+        conn.close()
+
+    with _lock:
+        _contadores["acertos" if linha is not None else "falhas"] += 1
+    return linha[0] if linha is not None else None
+
+def salvar(chave, provedor, modelo, resposta):
+    agora = time.time()
+    conn = _conectar()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (chave, provedor, modelo, resposta, len(resposta.encode("utf-8")), agora, agora)
+        )
+        _limpar(conn, agora)
+        conn.commit()
+    finally:
+        conn.close()
+
+def _limpar(conn, agora):
+    conn.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - CACHE_MAX_IDADE_SEGUNDOS,))
+    # Mantém os mais acessados até o limite de tamanho e descarta o restante
+    conn.execute(
+        """DELETE FROM respostas WHERE chave IN (
+            SELECT chave FROM (
+                SELECT chave, SUM(tamanho) OVER (ORDER BY acessado_em DESC) AS acumulado
+                FROM respostas
+            ) WHERE acumulado > ?
+        )""",
+        (CACHE_MAX_BYTES,)
+    )
+
+def estatisticas():
+    conn = _conectar()
+    try:
+        itens, tamanho = conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()
+    finally:
+        conn.close()
+    with _lock:
+        return {**_contadores, "itens": itens, "bytes": tamanho}
+
+def limpar_cache():
+    conn = _conectar()
+    try:
+        conn.execute("DELETE FROM respostas")
+        conn.commit()
+    finally:
+        conn.close()
+
+# =====================
+# CHAMADAS COM CACHE
+# =====================
+def resposta_valida(texto):
+    # As funções de ia_models devolvem erros como texto "[Provedor] ERRO: ..."
+    return bool(texto) and not texto.startswith(("[Gemini]", "[ChatGPT]", "[Copilot]"))
+
+def gerar_com_cache(provedor, modelo, prompt, funcao_geracao, parametros=None, ignorar_cache=False, funcao_validacao=None):
+    """
+    Consulta o cache antes de chamar funcao_geracao(prompt). Com
+    ignorar_cache=True a leitura é pulada, mas a resposta nova é gravada.
+    Se funcao_validacao for informada, só respostas aprovadas são gravadas.
+    """
+    chave = gerar_chave(provedor, modelo, prompt, parametros)
+    if not ignorar_cache:
+        resposta = buscar(chave)
+        if resposta is not None:
+            return resposta
+
+    resposta = funcao_geracao(prompt)
+    if resposta_valida(resposta) and (funcao_validacao is None or funcao_validacao(resposta)):
+        salvar(chave, provedor, modelo, resposta)
+    return resposta
+
+def stream_com_cache(provedor, modelo, prompt, funcao_stream, parametros=None, ignorar_cache=False):
+    """Versão de gerar_com_cache para as funções *_stream de ia_models."""
+    chave = gerar_chave(provedor, modelo, prompt, parametros)
+    if not ignorar_cache:
+        resposta = buscar(chave)
+        if resposta is not None:
+            yield resposta
+            return
+
+    # Só grava o stream que chegou ao fim: uma exceção (ou o consumidor
+    # parando antes) sai do laço sem gravar, e as funções com contrato de texto
+    # anunciam a falha no meio do stream com um pedaço "[Provedor] ERRO: ..."
+    partes = []
+    falhou = False
+    for fragmento in funcao_stream(prompt):
+        partes.append(fragmento)
+        falhou = falhou or (bool(fragmento.strip()) and not resposta_valida(fragmento.strip()))
+        yield fragmento
+    resposta = "".join(partes).strip()
+    if not falhou and resposta_valida(resposta):
+        salvar(chave, provedor, modelo, resposta)
@@ -0,0 +1,192 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# =====================
+# CONFIGURAÇÃO EM CACHE (POR MTIME) COM GRAVAÇÃO ATÔMICA
+# =====================
+# O config.json é lido e interpretado uma vez e reaproveitado enquanto o
+# arquivo não mudar (mtime, tamanho e inode). Cada chamada de
+# carregar_config() devolve uma cópia própria: uma sessão pode alterar a
+# sua (ex.: os widgets da página de configurações) sem afetar o cache nem as
+# outras sessões.
+# A gravação é feita num arquivo temporário e trocada com os.replace, sob uma
+# trava de arquivo (config.json.lock). Assim um leitor nunca vê o arquivo pela
+# metade e duas sessões salvando juntas não intercalam o conteúdo.
+CONFIG_ARQUIVO_PADRAO = "config.json"
+
+# Campos grandes ficam fora do config.json, em config_blobs/<sha256>.json, e
+# no lugar deles fica {"$blob": "<sha256>"}. O config "quente" relido a cada
+# mudança continua pequeno, e um blob, por ser endereçado pelo conteúdo,
+# nunca muda: é lido uma vez e compartilhado por todas as cópias.
+# config_blobs/ fica fora do git, como os dados da UI: um config.json que
+# aponta para um blob ausente (ex.: clone novo) carrega o campo como vazio e
+# avisos_config() explica o que houve, em vez de o app falhar.
+CAMPOS_GRANDES = ("playbook_text", "playbook_slides")
+CONFIG_BLOBS_DIR = "config_blobs"
+CONFIG_BLOBS_RETENCAO_SEGUNDOS = 3600  # blobs sem referência são removidos depois de 1h
+
+_cache = {}  # caminho absoluto -> (assinatura do arquivo, config quente, {sha256: valor})
+_cache_lock = threading.Lock()
+
+
+def _assinatura(caminho):
+    estado = os.stat(caminho)
+    return (estado.st_mtime_ns, estado.st_size, estado.st_ino)
+
+def _dir_blobs(caminho):
+    return os.path.join(os.path.dirname(os.path.abspath(caminho)), CONFIG_BLOBS_DIR)
+
+def _referencia(valor):
+    return valor.get("$blob") if isinstance(valor, dict) and len(valor) == 1 else None
+
+def _imutavel(valor):
+    # Listas de blobs viram tuplas: o mesmo objeto é entregue a todas as sessões
+    return tuple(valor) if isinstance(valor, list) else valor
+
+def _ler_blob(caminho, sha):
+    with open(os.path.join(_dir_blobs(caminho), f"{sha}.json"), "r", encoding="utf-8") as f:
+        return _imutavel(json.load(f))
+
+def _ler(caminho, anterior):
+    """
+    Lê o config quente e os blobs que ele referencia (reaproveitando os já
+    lidos). Um blob ausente fica fora de `blobs` (ver _ausentes).
+    """
+    blobs_anteriores = anterior[2] if anterior else {}
+    for tentativa in range(2):
+        assinatura = _assinatura(caminho)
+        with open(caminho, "r", encoding="utf-8") as f:
+            quente = json.load(f)
+        blobs, faltou = {}, False
+        for campo in CAMPOS_GRANDES:
+            sha = _referencia(quente.get(campo))
+            if not sha:
+                continue
+            try:
+                blobs[sha] = blobs_anteriores[sha] if sha in blobs_anteriores else _ler_blob(caminho, sha)
+            except FileNotFoundError:
+                faltou = True
+        # Se o config mudou no meio da leitura, o blob foi trocado por outra gravação: relê uma vez
+        if not faltou or tentativa == 1 or _assinatura(caminho) == assinatura:
+            return assinatura, quente, blobs
+
+def _ausentes(entrada):
+    _, quente, blobs = entrada
+    return [campo for campo in CAMPOS_GRANDES
+            if _referencia(quente.get(campo)) and _referencia(quente.get(campo)) not in blobs]
+
+def _copia(entrada):
+    _, quente, blobs = entrada
+    config = copy.deepcopy(quente)
+    for campo in CAMPOS_GRANDES:
+        sha = _referencia(config.get(campo))
+        if sha in blobs:
+            config[campo] = blobs[sha]
+        elif sha:
+            del config[campo]  # blob ausente: o campo fica vazio
+    return config
+
+def carregar_config(caminho=CONFIG_ARQUIVO_PADRAO):
+    """
+    Cópia do config do arquivo, com os campos grandes resolvidos. Só relê o
+    disco se o arquivo mudou desde a última leitura (ou se faltava um blob).
+    Propaga FileNotFoundError (só do config.json) e json.JSONDecodeError como
+    o json.load direto.
+    """
+    chave = os.path.abspath(caminho)
+    with _cache_lock:
+        entrada = _cache.get(chave)
+        if entrada is None or entrada[0] != _assinatura(caminho) or _ausentes(entrada):
+            entrada = _ler(caminho, entrada)
+            _cache[chave] = entrada
+        return _copia(entrada)
+
+def avisos_config(caminho=CONFIG_ARQUIVO_PADRAO):
+    """Mensagens sobre campos grandes carregados vazios por falta do blob na última leitura."""
+    with _cache_lock:
+        entrada = _cache.get(os.path.abspath(caminho))
+    return [
+        f"⚠️ `{campo}` aponta para um arquivo que não existe em `{CONFIG_BLOBS_DIR}/` e foi carregado vazio. "
+        "Carregue o playbook de novo e salve as configurações."
+        for campo in (_ausentes(entrada) if entrada else [])
+    ]
+
+# =====================
+# GRAVAÇÃO
+# =====================
+@contextmanager
+def _trava(caminho):
+    """Trava exclusiva entre processos (e threads) em <caminho>.lock."""
+    with open(caminho + ".lock", "a+b") as arquivo:
+        if fcntl:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX)
+        else:
+            arquivo.seek(0)
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                arquivo.seek(0)
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _gravar_atomico(destino, texto):
+    temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(texto)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, destino)
+
+def _salvar_blob(caminho, valor):
+    """Grava o valor em config_blobs/<sha256>.json (se ainda não existir) e devolve o sha256."""
+    texto = json.dumps(list(valor) if isinstance(valor, tuple) else valor, ensure_ascii=False)
+    sha = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+    destino = os.path.join(_dir_blobs(caminho), f"{sha}.json")
+    if not os.path.exists(destino):
+        os.makedirs(_dir_blobs(caminho), exist_ok=True)
+        _gravar_atomico(destino, texto)
+    return sha
+
+def _limpar_blobs(caminho, referenciados):
+    limite = time.time() - CONFIG_BLOBS_RETENCAO_SEGUNDOS
+    try:
+        entradas = list(os.scandir(_dir_blobs(caminho)))
+    except FileNotFoundError:
+        return
+    for entrada in entradas:
+        sha, extensao = os.path.splitext(entrada.name)
+        if extensao == ".json" and sha not in referenciados and entrada.stat().st_mtime < limite:
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
+
+def salvar_config(config, caminho=CONFIG_ARQUIVO_PADRAO):
+    """Grava o config inteiro (campos grandes em blobs) de forma atômica, sob trava."""
+    quente = dict(config)
+    with _trava(caminho):
+        blobs = {}
+        for campo in CAMPOS_GRANDES:
+            valor = quente.get(campo)
+            if valor is not None and not _referencia(valor):
+                sha = _salvar_blob(caminho, valor)
+                quente[campo] = {"$blob": sha}
+                blobs[sha] = _imutavel(valor)
+        _gravar_atomico(caminho, json.dumps(quente, indent=4, ensure_ascii=False))
+        with _cache_lock:
+            _cache[os.path.abspath(caminho)] = (_assinatura(caminho), copy.deepcopy(quente), blobs)
+        _limpar_blobs(caminho, blobs)
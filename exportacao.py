@@ -0,0 +1,84 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# =====================
+# EXPORTAÇÕES SOB DEMANDA (MEMORIZADAS)
+# =====================
+# Planilha, PDF etc. só são montados quando alguém pede o arquivo e ficam
+# guardados pelo hash do conteúdo dos resultados. O LRU é do processo, então
+# sessões diferentes com os mesmos artefatos reaproveitam os mesmos bytes.
+EXPORTACOES_MAX = 32
+
+_exportacoes = OrderedDict()  # (formato, hash dos resultados) -> bytes/objeto
+_exportacoes_lock = threading.Lock()
+
+def hash_resultados(resultados):
+    conteudo = json.dumps(resultados, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+def exportacao_memorizada(formato, resultados, construtor):
+    """
+    Retorna construtor(resultados), montado só na primeira vez para o mesmo
+    formato e conteúdo. Buffers (BytesIO) e arquivos temporários são
+    guardados como bytes.
+    """
+    chave = (formato, hash_resultados(resultados))
+    with _exportacoes_lock:
+        if chave in _exportacoes:
+            _exportacoes.move_to_end(chave)
+            return _exportacoes[chave]
+
+    dados = construtor(resultados)
+    if hasattr(dados, "getvalue"):
+        dados = dados.getvalue()
+    elif hasattr(dados, "read"):
+        with dados:
+            dados.seek(0)
+            dados = dados.read()
+
+    with _exportacoes_lock:
+        _exportacoes[chave] = dados
+        while len(_exportacoes) > EXPORTACOES_MAX:
+            _exportacoes.popitem(last=False)
+    return dados
+
+# =====================
+# REGISTRO DE EXPORTADORES
+# =====================
+# Cada formato aponta para um construtor que importa o módulo dele (e as
+# dependências pesadas: pandas, xlsxwriter, fpdf) só na primeira exportação.
+def _tabela(resultados):
+    from utils import exportar_artefatos
+    return exportar_artefatos(resultados)
+
+def _xlsx(resultados):
+    from utils import exportar_excel_streaming
+    return exportar_excel_streaming([resultados], hierarquico=True)
+
+def _pdf(resultados):
+    from exportacao_pdf import exportar_pdf
+    return exportar_pdf(resultados)
+
+def _csv_azure(resultados):
+    from utils import baixar_csv_azure, exportar_azure_devops
+    return baixar_csv_azure(exportar_azure_devops([resultados]))
+
+EXPORTADORES = {
+    "tabela": _tabela,
+    "xlsx": _xlsx,
+    "pdf": _pdf,
+    "csv_azure": _csv_azure
+}
+
+def registrar_exportador(formato, construtor):
+    EXPORTADORES[formato] = construtor
+
+def exportar(formato, resultados):
+    """Exportação memorizada de resultados no formato registrado."""
+    try:
+        construtor = EXPORTADORES[formato]
+    except KeyError:
+        raise KeyError(f"Formato de exportação desconhecido: {formato}") from None
+    return exportacao_memorizada(formato, resultados, construtor)
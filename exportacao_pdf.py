@@ -0,0 +1,207 @@
+import copy
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from fontTools import ttLib
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+# =====================
+# EXPORTAÇÃO PDF (UNICODE, FONTE REGISTRADA UMA VEZ POR PROCESSO)
+# =====================
+# A fonte TTF (embutida no PDF só com os glifos usados) é registrada uma
+# única vez num documento modelo; cada PDF novo é uma cópia desse modelo,
+# sem reler e reprocessar o arquivo da fonte. Acentos, aspas tipográficas,
+# travessões etc. saem como foram gerados; caracteres que nenhuma fonte
+# instalada cobre (alguns emojis) são removidos do texto.
+TITULO_PDF = "ARTEFATOS ÁGEIS GERADOS POR IA"
+
+# Primeiro caminho existente de cada lista; PDF_FONTE / PDF_FONTE_NEGRITO têm prioridade
+FONTES_REGULAR = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "DejaVuSans.ttf"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "/Library/Fonts/Arial Unicode.ttf"
+]
+FONTES_NEGRITO = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "DejaVuSans-Bold.ttf"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+    "C:/Windows/Fonts/arialbd.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Bold.ttf"
+]
+# Fontes de símbolos usadas quando a principal não tem o glifo
+FONTES_SIMBOLOS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "NotoEmoji-Regular.ttf"),
+    "/usr/share/fonts/truetype/noto/NotoEmoji-Regular.ttf",
+    "/usr/share/fonts/truetype/ancient-scripts/Symbola_hint.ttf",
+    "C:/Windows/Fonts/seguisym.ttf"
+]
+
+_modelo = None
+_modelo_lock = threading.Lock()
+_bytes_fontes = {}     # fontkey -> conteúdo do .ttf
+_suportados = None     # códigos Unicode cobertos pelas fontes registradas
+_familia = "Helvetica"
+
+def _primeira_existente(variavel, candidatos):
+    caminhos = [os.environ.get(variavel)] + candidatos if variavel else candidatos
+    return next((c for c in caminhos if c and os.path.isfile(c)), None)
+
+def _obter_modelo():
+    """Documento sem páginas com as fontes já registradas (um por processo)."""
+    global _modelo, _suportados, _familia
+    with _modelo_lock:
+        if _modelo is not None:
+            return _modelo
+        modelo = FPDF()
+        modelo.set_auto_page_break(auto=True, margin=15)
+        regular = _primeira_existente("PDF_FONTE", FONTES_REGULAR)
+        if regular:
+            negrito = _primeira_existente("PDF_FONTE_NEGRITO", FONTES_NEGRITO) or regular
+            modelo.add_font("artefatos", "", regular)
+            modelo.add_font("artefatos", "B", negrito)
+            simbolos = _primeira_existente(None, FONTES_SIMBOLOS)
+            if simbolos:
+                modelo.add_font("simbolos", "", simbolos)
+                modelo.set_fallback_fonts(["simbolos"])
+            _suportados = set()
+            for chave, fonte in modelo.fonts.items():
+                with open(fonte.ttffile, "rb") as f:
+                    _bytes_fontes[chave] = f.read()
+                _suportados.update(fonte.cmap)
+            _familia = "artefatos"
+        else:
+            logging.warning("Nenhuma fonte TTF encontrada para o PDF; usando Helvetica (sem acentos fora do latin-1).")
+        _modelo = modelo
+        return _modelo
+
+def novo_documento():
+    pdf = copy.deepcopy(_obter_modelo())
+    for chave, fonte in pdf.fonts.items():
+        if chave in _bytes_fontes:
+            # O deepcopy do fpdf2 compartilha o TTFont (fontTools) com o modelo,
+            # mas a saída faz o subset nele: cada documento abre o seu (leitura lazy).
+            fonte.ttfont = ttLib.TTFont(io.BytesIO(_bytes_fontes[chave]), recalcTimestamp=False, lazy=True)
+    return pdf
+
+def _texto(texto):
+    texto = str(texto)
+    if _suportados is None:
+        return texto.encode("latin-1", "replace").decode("latin-1")
+    faltando = {c for c in set(texto) if ord(c) not in _suportados and c not in "\n\t"}
+    if faltando:
+        texto = "".join(c for c in texto if c not in faltando)
+    return texto
+
+# =====================
+# MONTAGEM DO DOCUMENTO
+# =====================
+# A quebra de linha do multi_cell remede a linha inteira a cada caractere
+# (custo quadrático no tamanho da linha). Aqui cada palavra é medida uma vez
+# e as linhas prontas saem com cell(), o que deixa a montagem várias vezes
+# mais rápida em textos longos.
+def _quebrar_linhas(pdf, texto, largura):
+    espaco = pdf.get_string_width(" ")
+    for paragrafo in texto.split("\n"):
+        linha, largura_linha = [], 0
+        for palavra in paragrafo.split(" "):
+            largura_palavra = pdf.get_string_width(palavra)
+            while largura_palavra > largura:
+                # Palavra maior que a linha (URLs etc.): corta por caractere
+                if linha:
+                    yield " ".join(linha)
+                    linha, largura_linha = [], 0
+                corte, acumulado = 0, 0
+                for corte, caractere in enumerate(palavra):
+                    acumulado += pdf.get_string_width(caractere)
+                    if acumulado > largura:
+                        break
+                corte = max(corte, 1)
+                yield palavra[:corte]
+                palavra = palavra[corte:]
+                largura_palavra = pdf.get_string_width(palavra)
+            if linha and largura_linha + espaco + largura_palavra > largura:
+                yield " ".join(linha)
+                linha, largura_linha = [], 0
+            largura_linha += (espaco if linha else 0) + largura_palavra
+            linha.append(palavra)
+        yield " ".join(linha)
+
+def _escrever_texto(pdf, texto, altura):
+    largura = pdf.w - pdf.l_margin - pdf.r_margin
+    for linha in _quebrar_linhas(pdf, texto, largura):
+        pdf.cell(largura, altura, linha, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+def escrever_resultados(pdf, resultados, titulo=TITULO_PDF):
+    """Acrescenta ao pdf uma nova página com os artefatos de um dict de resultados."""
+    pdf.add_page()
+    pdf.set_font(_familia, "B", 18)
+    pdf.set_text_color(230, 0, 0)
+    pdf.cell(0, 15, _texto(titulo), new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+    pdf.ln(10)
+
+    for tipo, conteudo in resultados.items():
+        pdf.set_fill_color(255, 240, 240)
+        pdf.set_font(_familia, "B", 14)
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(0, 8, _texto(tipo.upper()), new_x=XPos.LMARGIN, new_y=YPos.NEXT, fill=True)
+
+        pdf.set_font(_familia, "", 11)
+        pdf.set_text_color(50, 50, 50)
+        _escrever_texto(pdf, _texto(conteudo or ""), 6)
+        pdf.ln(5)
+
+def exportar_pdf(resultados, filename="artefatos.pdf"):
+    pdf = novo_documento()
+    escrever_resultados(pdf, resultados)
+    return io.BytesIO(pdf.output())
+
+def exportar_pdf_lote(lista_resultados, titulos=None):
+    """Um único PDF com todos os dicts de resultados, cada um a partir de uma nova página."""
+    pdf = novo_documento()
+    titulos = list(titulos) if titulos is not None else None
+    for i, resultados in enumerate(lista_resultados):
+        escrever_resultados(pdf, resultados, titulos[i] if titulos else TITULO_PDF)
+    return bytes(pdf.output())
+
+def _renderizar(resultados):
+    # Executado nos processos do pool: cada processo registra a fonte uma vez
+    return exportar_pdf(resultados).getvalue()
+
+def exportar_pdfs_zip(lista_resultados, nomes=None, destino=None, max_workers=None):
+    """
+    Um PDF por dict de resultados, dentro de um ZIP gravado em destino
+    (caminho ou arquivo binário) ou devolvido como BytesIO. Com mais de um
+    documento (e mais de uma CPU) a montagem roda num pool de processos.
+    """
+    lista_resultados = list(lista_resultados)
+    nomes = list(nomes) if nomes is not None else [f"artefatos_{i + 1:04d}.pdf" for i in range(len(lista_resultados))]
+    saida = destino if destino is not None else io.BytesIO()
+
+    # Os PDFs já vêm comprimidos: ZIP_STORED evita recomprimir à toa
+    trabalhadores = min(max_workers or os.cpu_count() or 1, len(lista_resultados))
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_STORED) as zf:
+        if trabalhadores <= 1:
+            for nome, resultados in zip(nomes, lista_resultados):
+                zf.writestr(nome, _renderizar(resultados))
+        else:
+            # "spawn" evita herdar por fork as threads do servidor do Streamlit
+            contexto = multiprocessing.get_context("spawn")
+            lote = max(1, len(lista_resultados) // (trabalhadores * 4))
+            with ProcessPoolExecutor(max_workers=trabalhadores, mp_context=contexto) as executor:
+                for nome, dados in zip(nomes, executor.map(_renderizar, lista_resultados, chunksize=lote)):
+                    zf.writestr(nome, dados)
+
+    if destino is None:
+        saida.seek(0)
+    return saida
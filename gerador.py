@@ -0,0 +1,174 @@
+import json
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from playbook_indice import selecionar_playbook
+from rastreamento import medir_stream, span
+
+ARTEFATOS = ["epic", "feature", "user_story", "task"]
+
+# =====================
+# CONSTRUÇÃO DO PROMPT
+# =====================
+def montar_prompt(config, tipo, contexto, notas):
+    prompt_final = f"{config.get('ia_role','')}\n\n"
+    if "playbook_text" in config:
+        prompt_final += f"Playbook/Diretriz: {selecionar_playbook(config, [tipo], contexto, notas)}\n\n"
+    prompt_final += f"{config['prompts'].get(tipo, 'Gere um artefato.')}\n\nContexto:\n{contexto}\nNotas:\n{notas}"
+    return prompt_final
+
+# =====================
+# MODO ÚNICO (UMA CHAMADA PARA TODOS OS ARTEFATOS)
+# =====================
+# O papel da IA e o playbook vão uma única vez e a resposta volta como JSON
+# com uma chave por artefato, no mesmo formato do dict "resultados".
+def montar_prompt_unico(config, contexto, notas):
+    prompt_final = f"{config.get('ia_role','')}\n\n"
+    if "playbook_text" in config:
+        prompt_final += f"Playbook/Diretriz: {selecionar_playbook(config, ARTEFATOS, contexto, notas)}\n\n"
+    prompt_final += "Gere os artefatos abaixo, seguindo a instrução de cada um:\n"
+    for tipo in ARTEFATOS:
+        prompt_final += f"- {tipo}: {config['prompts'].get(tipo, 'Gere um artefato.')}\n"
+    esquema = json.dumps({tipo: "texto do artefato" for tipo in ARTEFATOS}, ensure_ascii=False)
+    prompt_final += (
+        "\nResponda SOMENTE com um objeto JSON válido, sem texto antes ou depois, "
+        f"exatamente com as chaves: {esquema}\n\n"
+    )
+    prompt_final += f"Contexto:\n{contexto}\nNotas:\n{notas}"
+    return prompt_final
+
+def interpretar_resposta_unica(texto):
+    """
+    Lê a resposta JSON do modo único e devolve só os artefatos válidos
+    (presentes e não vazios); quem chamou gera os que faltarem. Levanta
+    ValueError se não houver JSON ou nenhum artefato aproveitável.
+    """
+    inicio, fim = texto.find("{"), texto.rfind("}")
+    if inicio == -1 or fim <= inicio:
+        raise ValueError("A resposta não contém um objeto JSON.")
+    try:
+        dados = json.loads(texto[inicio:fim + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido: {e}") from e
+    if not isinstance(dados, dict):
+        raise ValueError("O JSON deve ser um objeto com uma chave por artefato.")
+
+    resultados = {}
+    for tipo in ARTEFATOS:
+        conteudo = dados.get(tipo)
+        if isinstance(conteudo, list):
+            conteudo = "\n".join(str(item) for item in conteudo)
+        if isinstance(conteudo, str) and conteudo.strip():
+            resultados[tipo] = conteudo.strip()
+    if not resultados:
+        raise ValueError("Nenhum artefato presente na resposta.")
+    return resultados
+
+def parametros_modo_unico(parametros):
+    # A resposta traz os quatro artefatos, então o limite de tokens cresce na mesma proporção
+    return {k: v * len(ARTEFATOS) if k == "max_tokens" else v for k, v in parametros.items()}
+
+def resposta_unica_valida(texto):
+    # Só a resposta completa vai para o cache: com uma parcial, a próxima
+    # geração com o mesmo prompt tenta de novo em vez de repetir a falta
+    try:
+        return len(interpretar_resposta_unica(texto)) == len(ARTEFATOS)
+    except ValueError:
+        return False
+
+def gerar_artefatos_unico(config, contexto, notas, funcao_geracao, rastro=None):
+    """
+    Faz uma única chamada funcao_geracao(prompt) para os quatro artefatos.
+    Retorna (resultados, erro): resultados traz só os artefatos válidos da
+    resposta (None se nenhum puder ser aproveitado) e quem chamou gera os
+    que faltarem pelo caminho por artefato.
+    Com um rastro, registra os spans das etapas com tipo="unico".
+    """
+    try:
+        with span(rastro, "montar_prompt", tipo="unico"):
+            prompt = montar_prompt_unico(config, contexto, notas)
+        with span(rastro, "requisicao_provedor", tipo="unico"):
+            resposta = funcao_geracao(prompt)
+        with span(rastro, "interpretar_resposta", tipo="unico"):
+            return interpretar_resposta_unica(resposta), None
+    except Exception as e:
+        return None, e
+
+# =====================
+# GERAÇÃO CONCORRENTE
+# =====================
+def gerar_artefatos_concorrente(prompts, funcao_geracao, max_workers=None):
+    """
+    prompts = {
+        "epic": "prompt do epic",
+        "feature": "prompt da feature",
+        ...
+    }
+    Envia todos os prompts ao mesmo tempo e devolve (tipo, resposta, erro)
+    na ordem em que cada resultado chega. As chamadas ao Streamlit devem
+    continuar na thread principal, quem consome o gerador atualiza a tela.
+    """
+    if not prompts:
+        return
+    with ThreadPoolExecutor(max_workers=max_workers or len(prompts)) as executor:
+        futuros = {executor.submit(funcao_geracao, prompt): tipo for tipo, prompt in prompts.items()}
+        for futuro in as_completed(futuros):
+            tipo = futuros[futuro]
+            try:
+                yield tipo, futuro.result(), None
+            except Exception as e:
+                yield tipo, None, e
+
+# =====================
+# GERAÇÃO CONCORRENTE COM STREAMING
+# =====================
+def gerar_artefatos_streaming(prompts, funcao_stream, max_workers=None, rastro=None):
+    """
+    funcao_stream(prompt) devolve um iterável de pedaços de texto.
+    Gera (tipo, texto_acumulado, concluido, erro) sempre que um artefato
+    recebe novos tokens. Os pedaços que chegam entre duas leituras são
+    agrupados, então a tela só é redesenhada uma vez por artefato.
+    Com um rastro, cada stream vira um span requisicao_provedor do seu tipo.
+    """
+    if not prompts:
+        return
+    fila = queue.Queue()
+
+    def consumir(tipo, prompt):
+        try:
+            for fragmento in medir_stream(rastro, funcao_stream(prompt), tipo=tipo):
+                if fragmento:
+                    fila.put((tipo, fragmento, False, None))
+            fila.put((tipo, "", True, None))
+        except Exception as e:
+            fila.put((tipo, "", True, e))
+
+    textos = {tipo: "" for tipo in prompts}
+    pendentes = len(prompts)
+    with ThreadPoolExecutor(max_workers=max_workers or len(prompts)) as executor:
+        for tipo, prompt in prompts.items():
+            executor.submit(consumir, tipo, prompt)
+
+        while pendentes:
+            eventos = [fila.get()]
+            try:
+                while True:
+                    eventos.append(fila.get_nowait())
+            except queue.Empty:
+                pass
+
+            alterados = []
+            finalizados = {}
+            for tipo, fragmento, concluido, erro in eventos:
+                textos[tipo] += fragmento
+                if concluido:
+                    finalizados[tipo] = erro
+                    pendentes -= 1
+                elif tipo not in alterados:
+                    alterados.append(tipo)
+
+            for tipo in alterados:
+                if tipo not in finalizados:
+                    yield tipo, textos[tipo], False, None
+            for tipo, erro in finalizados.items():
+                yield tipo, textos[tipo], True, erro
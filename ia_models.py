@@ -1,58 +1,433 @@
-import google.generativeai as genai
-import openai
+import json
+import socket
+import sys
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from limites import ErroPermanente, ErroProvedor, ErroTemporario, ao_cancelar, erro_de_status
+from provedores import ProvedorFuncoes, registrar_provedor
 
 # =====================
-# GEMINI
+# SESSÃO HTTP COMPARTILHADA
 # =====================
-def gerar_resposta_gemini(prompt, api_key):
+# Uma única requests.Session com pool limitado por host, reaproveitada por
+# todos os provedores HTTP (keep-alive: sem novo handshake TCP/TLS a cada
+# artefato). Os timeouts evitam que uma chamada prenda o worker do Streamlit.
+HTTP_TIMEOUT_CONEXAO = 5
+HTTP_TIMEOUT_LEITURA = 120
+HTTP_POOL_POR_HOST = 10
+
+_sessao_http = None
+_sessao_lock = threading.Lock()
+
+def obter_sessao_http():
+    global _sessao_http
+    with _sessao_lock:
+        if _sessao_http is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(
+                pool_connections=HTTP_POOL_POR_HOST,
+                pool_maxsize=HTTP_POOL_POR_HOST,
+                pool_block=True
+            )
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            sessao.headers.update({"Accept-Encoding": "gzip, deflate"})
+            _sessao_http = sessao
+        return _sessao_http
+
+def configurar_http(timeout_conexao=None, timeout_leitura=None, pool_por_host=None):
+    """Altera timeouts/tamanho do pool; a sessão é recriada na próxima chamada."""
+    global _sessao_http, HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA, HTTP_POOL_POR_HOST
+    with _sessao_lock:
+        if timeout_conexao is not None:
+            HTTP_TIMEOUT_CONEXAO = timeout_conexao
+        if timeout_leitura is not None:
+            HTTP_TIMEOUT_LEITURA = timeout_leitura
+        if pool_por_host is not None:
+            HTTP_POOL_POR_HOST = pool_por_host
+        if _sessao_http is not None:
+            _sessao_http.close()
+            _sessao_http = None
+
+def _timeout_http():
+    return (HTTP_TIMEOUT_CONEXAO, HTTP_TIMEOUT_LEITURA)
+
+# =====================
+# INTERRUPÇÃO DE STREAMS CANCELADOS
+# =====================
+# Um stream que perdeu a corrida (limites.Cancelamento) é fechado por outra
+# thread. close() sozinho não acorda um recv bloqueado; shutdown() no socket
+# acorda, e a leitura termina com erro de conexão na hora.
+def _desligar_socket(sock):
+    if sock is None:
+        return
     try:
-        genai.configure(api_key=api_key)
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+def _interromper_requests(response):
+    conexao = getattr(response.raw, "connection", None)
+    _desligar_socket(getattr(conexao, "sock", None))
+    response.close()
+
+def _interromper_openai(stream):
+    rede = stream.response.extensions.get("network_stream")
+    _desligar_socket(rede.get_extra_info("socket") if rede is not None else None)
+    stream.close()
+
+def _interromper_gemini(resposta):
+    # O stream do SDK é uma chamada gRPC guardada num atributo interno; sem
+    # ele (ex.: outra versão do SDK) o pedaço seguinte ainda é descartado
+    cancelar = getattr(getattr(resposta, "_iterator", None), "cancel", None)
+    if cancelar:
+        cancelar()
+
+# =====================
+# REGISTRO DE MODELOS GEMINI
+# =====================
+# Descobrir o modelo exige um list_models() (ida e volta na rede), então o
+# resultado fica guardado por chave de API e só é refeito após o TTL.
+GEMINI_TTL_SEGUNDOS = 3600
+
+_gemini_modelos = {}  # api_key -> (GenerativeModel, expira_em)
+_gemini_chave_configurada = None
+_gemini_lock = threading.Lock()
+
+# Os SDKs (google.generativeai, openai) são importados no primeiro uso de
+# cada provedor: escolher um modelo não carrega o SDK dos outros, e abrir o
+# app sem gerar nada não carrega nenhum.
+def _genai():
+    import google.generativeai as genai
+    return genai
+
+def _openai():
+    import openai
+    return openai
+
+def _configurar_gemini(api_key):
+    global _gemini_chave_configurada
+    if _gemini_chave_configurada != api_key:
+        _genai().configure(api_key=api_key)
+        _gemini_chave_configurada = api_key
+
+def obter_modelo_gemini(api_key, forcar_atualizacao=False):
+    """
+    Retorna o GenerativeModel para a chave (ou None se não houver modelo
+    compatível com generateContent), reaproveitando a instância enquanto o
+    TTL não expirar.
+    """
+    with _gemini_lock:
+        agora = time.monotonic()
+        registro = _gemini_modelos.get(api_key)
+        if registro and not forcar_atualizacao and registro[1] > agora:
+            _configurar_gemini(api_key)
+            return registro[0]
+
+        _configurar_gemini(api_key)
         # Lista modelos compatíveis com generateContent
         modelos_disponiveis = [
-            m.name for m in genai.list_models() 
+            m.name for m in _genai().list_models() 
             if "generateContent" in m.supported_generation_methods
         ]
         if not modelos_disponiveis:
-            return "[Gemini] Nenhum modelo disponível para generateContent."
-        
+            _gemini_modelos.pop(api_key, None)
+            return None
+
         model_name = modelos_disponiveis[0]  # usa o primeiro modelo válido
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt)
-        return response.text
+        model = _genai().GenerativeModel(model_name)
+        _gemini_modelos[api_key] = (model, agora + GEMINI_TTL_SEGUNDOS)
+        return model
+
+def nome_modelo_gemini(api_key):
+    """Nome do modelo resolvido para a chave, ou "" se não for possível descobrir."""
+    try:
+        model = obter_modelo_gemini(api_key)
+        return model.model_name if model is not None else ""
+    except Exception:
+        return ""
+
+def limpar_registro_gemini(api_key=None):
+    """Esquece o modelo de uma chave (ou de todas) para forçar nova descoberta."""
+    with _gemini_lock:
+        if api_key is None:
+            _gemini_modelos.clear()
+        else:
+            _gemini_modelos.pop(api_key, None)
+
+# =====================
+# CLASSIFICAÇÃO DOS ERROS
+# =====================
+# As chamadas internas (_gerar_*, _stream_*) levantam os erros tipados de
+# limites, para que o limitador repita só o que é temporário (429, 5xx,
+# timeout). As funções públicas gerar_resposta_* mantêm o contrato antigo
+# de devolver o erro como texto "[Provedor] ERRO: ...".
+def _erro_provedor(provedor, e):
+    if isinstance(e, ErroProvedor):
+        return e
+    resposta = getattr(e, "response", None)
+    status = getattr(e, "status_code", None) or getattr(resposta, "status_code", None)
+    if status is None and isinstance(getattr(e, "code", None), int):
+        status = e.code  # exceções de google.api_core (ResourceExhausted = 429 etc.)
+    if status is not None:
+        return erro_de_status(provedor, status, str(e), getattr(resposta, "headers", None))
+    # Uma exceção do openai só existe se o SDK já foi importado
+    openai = sys.modules.get("openai")
+    if isinstance(e, (requests.Timeout, requests.ConnectionError, TimeoutError, ConnectionError)) or (
+            openai is not None and isinstance(e, openai.APIConnectionError)):
+        return ErroTemporario(provedor, str(e))
+    return ErroPermanente(provedor, str(e))
+
+def _erro_http(provedor, response):
+    return erro_de_status(provedor, response.status_code, response.text, response.headers)
+
+def _como_texto(funcao, provedor):
+    """Envolve uma chamada interna no contrato antigo de erro como texto."""
+    def chamar(*args, **kwargs):
+        try:
+            return funcao(*args, **kwargs)
+        except Exception as e:
+            return str(_erro_provedor(provedor, e))
+    return chamar
+
+def _como_texto_stream(funcao, provedor):
+    def chamar(*args, **kwargs):
+        try:
+            yield from funcao(*args, **kwargs)
+        except Exception as e:
+            yield str(_erro_provedor(provedor, e))
+    return chamar
+
+async def _chamar_async(provedor, corrotina):
+    try:
+        return await corrotina
     except Exception as e:
-        return f"[Gemini] ERRO: {e}"
+        raise _erro_provedor(provedor, e) from e
+
+# =====================
+# GEMINI
+# =====================
+def _modelo_gemini(api_key):
+    try:
+        model = obter_modelo_gemini(api_key)
+    except Exception as e:
+        raise _erro_provedor("Gemini", e) from e
+    if model is None:
+        raise ErroPermanente("Gemini", "Nenhum modelo disponível para generateContent.")
+    return model
+
+def _gerar_gemini(prompt, api_key):
+    model = _modelo_gemini(api_key)
+    try:
+        return model.generate_content(prompt).text
+    except Exception as e:
+        raise _erro_provedor("Gemini", e) from e
+
+async def _agerar_gemini(prompt, api_key):
+    model = _modelo_gemini(api_key)
+    response = await _chamar_async("Gemini", model.generate_content_async(prompt))
+    return response.text
+
+def _stream_gemini(prompt, api_key):
+    model = _modelo_gemini(api_key)
+    try:
+        resposta = model.generate_content(prompt, stream=True)
+        with ao_cancelar(lambda: _interromper_gemini(resposta)):
+            for chunk in resposta:
+                if chunk.parts:
+                    yield chunk.text
+    except Exception as e:
+        raise _erro_provedor("Gemini", e) from e
+
+gerar_resposta_gemini = _como_texto(_gerar_gemini, "Gemini")
+gerar_resposta_gemini_stream = _como_texto_stream(_stream_gemini, "Gemini")
+
+async def agerar_resposta_gemini(prompt, api_key):
+    """Versão assíncrona de gerar_resposta_gemini."""
+    try:
+        return await _agerar_gemini(prompt, api_key)
+    except ErroProvedor as e:
+        return str(e)
+
+def saude_gemini(api_key):
+    try:
+        if obter_modelo_gemini(api_key) is None:
+            return False, "Nenhum modelo disponível para generateContent."
+        return True, nome_modelo_gemini(api_key)
+    except Exception as e:
+        return False, str(e)
 
 # =====================
 # CHATGPT
 # =====================
-def gerar_resposta_gpt(prompt, api_key, model="gpt-4o-mini"):
+# Um cliente OpenAI (sync e async) por chave, guardado para o processo todo:
+# o pool HTTP interno do SDK é reaproveitado entre chamadas e sessões.
+# max_retries=0: as novas tentativas ficam a cargo do limitador (limites).
+GPT_MODELO_PADRAO = "gpt-4o-mini"
+GPT_MAX_TOKENS_PADRAO = 800
+
+_clientes_openai = {}  # (api_key, assincrono) -> OpenAI / AsyncOpenAI
+_openai_lock = threading.Lock()
+
+def obter_cliente_openai(api_key, assincrono=False):
+    with _openai_lock:
+        cliente = _clientes_openai.get((api_key, assincrono))
+        if cliente is None:
+            openai = _openai()
+            classe = openai.AsyncOpenAI if assincrono else openai.OpenAI
+            cliente = classe(api_key=api_key, timeout=HTTP_TIMEOUT_LEITURA, max_retries=0)
+            _clientes_openai[(api_key, assincrono)] = cliente
+        return cliente
+
+def _parametros_gpt(prompt, model, max_tokens, timeout):
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "timeout": timeout if timeout is not None else _openai().NOT_GIVEN
+    }
+
+def _gerar_gpt(prompt, api_key, model=GPT_MODELO_PADRAO, max_tokens=GPT_MAX_TOKENS_PADRAO, timeout=None):
     try:
-        openai.api_key = api_key
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=800
-        )
-        return response["choices"][0]["message"]["content"].strip()
+        client = obter_cliente_openai(api_key)
+        response = client.chat.completions.create(**_parametros_gpt(prompt, model, max_tokens, timeout))
+        return (response.choices[0].message.content or "").strip()
+    except Exception as e:
+        raise _erro_provedor("ChatGPT", e) from e
+
+async def _agerar_gpt(prompt, api_key, model=GPT_MODELO_PADRAO, max_tokens=GPT_MAX_TOKENS_PADRAO, timeout=None):
+    client = obter_cliente_openai(api_key, assincrono=True)
+    response = await _chamar_async("ChatGPT", client.chat.completions.create(**_parametros_gpt(prompt, model, max_tokens, timeout)))
+    return (response.choices[0].message.content or "").strip()
+
+def _stream_gpt(prompt, api_key, model=GPT_MODELO_PADRAO, max_tokens=GPT_MAX_TOKENS_PADRAO, timeout=None):
+    try:
+        client = obter_cliente_openai(api_key)
+        stream = client.chat.completions.create(stream=True, **_parametros_gpt(prompt, model, max_tokens, timeout))
+        with ao_cancelar(lambda: _interromper_openai(stream)):
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except Exception as e:
+        raise _erro_provedor("ChatGPT", e) from e
+
+gerar_resposta_gpt = _como_texto(_gerar_gpt, "ChatGPT")
+gerar_resposta_gpt_stream = _como_texto_stream(_stream_gpt, "ChatGPT")
+
+async def agerar_resposta_gpt(prompt, api_key, **parametros):
+    """Versão assíncrona de gerar_resposta_gpt (usa AsyncOpenAI)."""
+    try:
+        return await _agerar_gpt(prompt, api_key, **parametros)
+    except ErroProvedor as e:
+        return str(e)
+
+def contar_tokens_gpt(texto, model=GPT_MODELO_PADRAO):
+    try:
+        import tiktoken
+        try:
+            codificacao = tiktoken.encoding_for_model(model)
+        except KeyError:
+            codificacao = tiktoken.get_encoding("o200k_base")
+        return len(codificacao.encode(texto))
+    except Exception:
+        return len(texto) // 4 + 1
+
+def saude_gpt(api_key):
+    try:
+        obter_cliente_openai(api_key).models.retrieve(GPT_MODELO_PADRAO, timeout=HTTP_TIMEOUT_CONEXAO)
+        return True, GPT_MODELO_PADRAO
     except Exception as e:
-        return f"[ChatGPT] ERRO: {e}"
+        return False, str(e)
 
 # =====================
 # COPILOT
 # =====================
-def gerar_resposta_copilot(prompt, api_key):
+def _gerar_copilot(prompt, api_key):
     try:
         headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
         data = {"input": prompt}
-        response = requests.post(
+        response = obter_sessao_http().post(
             "https://api.githubcopilot.com/v1/chat/completions",
             headers=headers,
-            json=data
+            json=data,
+            timeout=_timeout_http()
         )
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
-        else:
-            return f"[Copilot] ERRO: {response.text}"
+        if response.status_code != 200:
+            raise _erro_http("Copilot", response)
+        # Um corpo fora do formato esperado também vira ErroProvedor
+        return response.json()["choices"][0]["message"]["content"]
+    except Exception as e:
+        raise _erro_provedor("Copilot", e) from e
+
+def _stream_copilot(prompt, api_key):
+    """Mesma chamada de _gerar_copilot, lendo a resposta como SSE."""
+    try:
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+        data = {"input": prompt, "stream": True}
+        with obter_sessao_http().post(
+            "https://api.githubcopilot.com/v1/chat/completions",
+            headers=headers,
+            json=data,
+            stream=True,
+            timeout=_timeout_http()
+        ) as response, ao_cancelar(lambda: _interromper_requests(response)):
+            if response.status_code != 200:
+                raise _erro_http("Copilot", response)
+            
+            # Cada evento chega como "data: {json}" e o fim como "data: [DONE]"
+            for linha in response.iter_lines():
+                linha = linha.decode("utf-8") if isinstance(linha, bytes) else linha
+                if not linha.startswith("data:"):
+                    continue
+                dados = linha[len("data:"):].strip()
+                if dados == "[DONE]":
+                    break
+                escolhas = json.loads(dados).get("choices") or []
+                if escolhas:
+                    conteudo = (escolhas[0].get("delta") or {}).get("content")
+                    if conteudo:
+                        yield conteudo
     except Exception as e:
-        return f"[Copilot] ERRO: {e}"
+        raise _erro_provedor("Copilot", e) from e
+
+gerar_resposta_copilot = _como_texto(_gerar_copilot, "Copilot")
+gerar_resposta_copilot_stream = _como_texto_stream(_stream_copilot, "Copilot")
+
+# =====================
+# REGISTRO DOS PROVEDORES
+# =====================
+# Os provedores registrados usam as chamadas que levantam erros tipados:
+# ProvedorFuncoes aplica o limite de taxa e as novas tentativas por cima.
+# padrao=True: um provedor registrado antes com o mesmo nome (mock) é mantido.
+registrar_provedor(ProvedorFuncoes(
+    "Gemini", "gemini",
+    _gerar_gemini,
+    funcao_stream=_stream_gemini,
+    funcao_agerar=_agerar_gemini,
+    funcao_saude=saude_gemini,
+    modelo=nome_modelo_gemini
+), padrao=True)
+registrar_provedor(ProvedorFuncoes(
+    "ChatGPT", "chatgpt",
+    _gerar_gpt,
+    funcao_stream=_stream_gpt,
+    funcao_agerar=_agerar_gpt,
+    funcao_contar_tokens=contar_tokens_gpt,
+    funcao_saude=saude_gpt,
+    modelo=GPT_MODELO_PADRAO,
+    parametros={"max_tokens": GPT_MAX_TOKENS_PADRAO}
+), padrao=True)
+registrar_provedor(ProvedorFuncoes(
+    "Copilot", "copilot",
+    _gerar_copilot,
+    funcao_stream=_stream_copilot,
+    modelo="copilot"
+), padrao=True)
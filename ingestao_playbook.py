@@ -0,0 +1,127 @@
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cache_playbook import carregar_slides, hash_conteudo, salvar_slides
+from utils import EXTRATORES, extrair_trechos_documento
+
+# =====================
+# INGESTÃO DE VÁRIOS DOCUMENTOS DE PLAYBOOK
+# =====================
+# Cada arquivo é identificado pelo SHA-256 do conteúdo: o que já está no
+# cache é reaproveitado e só os arquivos novos/alterados são extraídos, em
+# paralelo num pool de processos (a extração é CPU-bound).
+def _dentro_de(caminho, raiz):
+    caminho, raiz = os.path.realpath(caminho), os.path.realpath(raiz)
+    return os.path.commonpath([caminho, raiz]) == raiz
+
+def resolver_pasta(pasta, raiz):
+    """
+    Caminho real de `pasta` (relativa à raiz ou absoluta) se ela estiver dentro
+    de `raiz`; levanta ValueError se sair dela (.., link simbólico) ou não existir.
+    """
+    if not raiz:
+        raise ValueError("Nenhuma pasta raiz de playbooks configurada (playbook_pasta_raiz).")
+    caminho = os.path.realpath(os.path.join(raiz, pasta))
+    if not _dentro_de(caminho, raiz):
+        raise ValueError(f"A pasta precisa estar dentro de {raiz}.")
+    if not os.path.isdir(caminho):
+        raise ValueError(f"Pasta não encontrada: {pasta}")
+    return caminho
+
+def listar_documentos(diretorio, raiz=None):
+    """
+    Caminhos de todos os PPTX/DOCX/PDF dentro do diretório (recursivo). Com
+    `raiz`, arquivos que apontam para fora dela (links simbólicos) são ignorados.
+    """
+    caminhos = []
+    for pasta, _, arquivos in os.walk(diretorio):
+        for nome in sorted(arquivos):
+            if os.path.splitext(nome)[1].lower() not in EXTRATORES or nome.startswith("~$"):
+                continue
+            caminho = os.path.join(pasta, nome)
+            if raiz is None or _dentro_de(caminho, raiz):
+                caminhos.append(caminho)
+    return sorted(caminhos)
+
+def _ler_documento(documento):
+    """Aceita caminho, UploadedFile do Streamlit ou tupla (nome, bytes)."""
+    if isinstance(documento, tuple):
+        return documento
+    if isinstance(documento, (str, os.PathLike)):
+        with open(documento, "rb") as f:
+            return os.path.basename(documento), f.read()
+    return documento.name, documento.getvalue()
+
+def _extrair(nome, dados):
+    # Executado nos processos do pool
+    return extrair_trechos_documento(io.BytesIO(dados), nome)
+
+def ingerir_documentos(documentos, max_workers=None, ao_progredir=None):
+    """
+    Extrai todos os documentos e devolve a lista, na ordem recebida, de
+    {"nome": ..., "versao": sha256, "trechos": [...], "reaproveitado": bool, "erro": str|None}.
+    ao_progredir(item, concluidos, total) é chamado a cada arquivo finalizado.
+    """
+    itens = []
+    for documento in documentos:
+        nome, dados = _ler_documento(documento)
+        itens.append({"nome": nome, "versao": hash_conteudo(dados), "dados": dados})
+    total = len(itens)
+    concluidos = 0
+
+    def finalizar(item, trechos=None, erro=None, reaproveitado=False):
+        nonlocal concluidos
+        item.pop("dados", None)
+        item.update({"trechos": trechos or [], "reaproveitado": reaproveitado, "erro": erro})
+        concluidos += 1
+        if ao_progredir:
+            ao_progredir(item, concluidos, total)
+
+    pendentes = []
+    for item in itens:
+        trechos = carregar_slides(item["versao"])
+        if trechos is not None:
+            finalizar(item, trechos, reaproveitado=True)
+        else:
+            pendentes.append(item)
+
+    if len(pendentes) == 1:
+        item = pendentes[0]
+        try:
+            trechos = _extrair(item["nome"], item["dados"])
+            salvar_slides(item["versao"], trechos, nome=item["nome"])
+            finalizar(item, trechos)
+        except Exception as e:
+            finalizar(item, erro=str(e))
+    elif pendentes:
+        # "spawn" evita herdar por fork as threads do servidor do Streamlit
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=contexto) as executor:
+            futuros = {executor.submit(_extrair, item["nome"], item["dados"]): item for item in pendentes}
+            for futuro in as_completed(futuros):
+                item = futuros[futuro]
+                try:
+                    trechos = futuro.result()
+                    salvar_slides(item["versao"], trechos, nome=item["nome"])
+                    finalizar(item, trechos)
+                except Exception as e:
+                    finalizar(item, erro=str(e))
+    return itens
+
+def mesclar_corpus(itens):
+    """
+    Junta os documentos em um único playbook. Retorna (versao, trechos),
+    onde versao identifica o conjunto (hash das versões de cada arquivo).
+    """
+    trechos = []
+    for item in itens:
+        if item.get("erro"):
+            continue
+        trechos.extend(f"[{item['nome']}] {trecho}" for trecho in item["trechos"])
+    versao = hashlib.sha256(
+        "\n".join(item["versao"] for item in itens if not item.get("erro")).encode("utf-8")
+    ).hexdigest()
+    return versao, trechos
@@ -0,0 +1,385 @@
+import asyncio
+import contextvars
+import email.utils
+import hashlib
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# =====================
+# ERROS TIPADOS DOS PROVEDORES
+# =====================
+# Limite de taxa (429) e falhas temporárias (timeout, 5xx) valem nova
+# tentativa; erros permanentes (chave inválida, requisição rejeitada) não.
+class ErroProvedor(Exception):
+    temporario = False
+
+    def __init__(self, provedor, mensagem, status=None):
+        super().__init__(f"[{provedor}] ERRO: {mensagem}")
+        self.provedor = provedor
+        self.status = status
+
+
+class LimiteTaxaExcedido(ErroProvedor):
+    temporario = True
+
+    def __init__(self, provedor, mensagem, status=429, retry_after=None):
+        super().__init__(provedor, mensagem, status)
+        self.retry_after = retry_after
+
+
+class ErroTemporario(ErroProvedor):
+    temporario = True
+
+
+class ErroPermanente(ErroProvedor):
+    pass
+
+
+class ChamadaCancelada(ErroProvedor):
+    """A chamada foi cancelada por quem a disparou (ex.: perdeu a corrida do hedging)."""
+
+
+def ler_retry_after(cabecalhos):
+    """Segundos pedidos pelo servidor em Retry-After (ou retry-after-ms), se houver."""
+    if not cabecalhos:
+        return None
+    valor_ms = cabecalhos.get("retry-after-ms") or cabecalhos.get("Retry-After-Ms")
+    if valor_ms:
+        try:
+            return float(valor_ms) / 1000
+        except ValueError:
+            pass
+    valor = cabecalhos.get("retry-after") or cabecalhos.get("Retry-After")
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        data = email.utils.parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None  # valor malformado (ex.: "soon"): vale o backoff padrão
+    return max(0.0, data.timestamp() - time.time())
+
+def erro_de_status(provedor, status, mensagem, cabecalhos=None):
+    if status == 429:
+        return LimiteTaxaExcedido(provedor, mensagem, status, ler_retry_after(cabecalhos))
+    if status in (408, 409) or status >= 500:
+        return ErroTemporario(provedor, mensagem, status)
+    return ErroPermanente(provedor, mensagem, status)
+
+# =====================
+# LIMITADOR POR PROVEDOR E CHAVE (TOKEN BUCKET)
+# =====================
+# Dois baldes por (provedor, chave de API): requisições por minuto e tokens
+# por minuto. Cada chamada reserva 1 requisição e a estimativa de tokens e
+# espera o tempo que faltar. A cada 429 a vazão cai pela metade e o balde
+# fica pausado pelo Retry-After; cada sucesso devolve 5% da vazão.
+LIMITES_PADRAO = {
+    "Gemini": {"rpm": 60, "tpm": 1000000},
+    "ChatGPT": {"rpm": 500, "tpm": 200000},
+    "Copilot": {"rpm": 60, "tpm": 100000}
+}
+LIMITE_GENERICO = {"rpm": 60, "tpm": 100000}
+TOKENS_SAIDA_ESTIMADOS = 500
+FATOR_MINIMO = 0.1
+RECUPERACAO_POR_SUCESSO = 0.05
+
+BACKOFF_TENTATIVAS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAXIMO = 60.0
+
+
+class BaldeTokens:
+    def __init__(self, capacidade, por_segundo):
+        self.capacidade = capacidade
+        self.por_segundo = por_segundo
+        self.disponivel = float(capacidade)
+        self.atualizado = time.monotonic()
+
+    def _repor(self, agora):
+        self.disponivel = min(self.capacidade, self.disponivel + (agora - self.atualizado) * self.por_segundo)
+        self.atualizado = agora
+
+    def reservar(self, quantidade, agora):
+        """Debita a quantidade (pode ficar negativo) e devolve quanto esperar até ela estar coberta."""
+        self._repor(agora)
+        self.disponivel -= min(quantidade, self.capacidade)
+        return max(0.0, -self.disponivel / self.por_segundo)
+
+    def devolver(self, quantidade, agora):
+        self._repor(agora)
+        self.disponivel = min(self.capacidade, self.disponivel + quantidade)
+
+
+class Limitador:
+    def __init__(self, provedor, chave, rpm, tpm):
+        self.provedor = provedor
+        self.chave = chave
+        self.rpm = rpm
+        self.tpm = tpm
+        self.fator = 1.0
+        self.pausado_ate = 0.0
+        self.requisicoes = BaldeTokens(rpm, rpm / 60)
+        self.tokens = BaldeTokens(tpm, tpm / 60)
+        self.contadores = {"chamadas": 0, "limitadas": 0, "espera_total": 0.0}
+        self._lock = threading.Lock()
+
+    def _aplicar_fator(self):
+        self.requisicoes.por_segundo = self.rpm * self.fator / 60
+        self.tokens.por_segundo = self.tpm * self.fator / 60
+
+    def configurar(self, rpm, tpm):
+        with self._lock:
+            self.rpm, self.tpm = rpm, tpm
+            self.requisicoes.capacidade, self.tokens.capacidade = rpm, tpm
+            self._aplicar_fator()
+
+    def reservar(self, tokens):
+        """Reserva a chamada e devolve os segundos de espera antes de fazê-la."""
+        with self._lock:
+            agora = time.monotonic()
+            espera = max(
+                self.requisicoes.reservar(1, agora),
+                self.tokens.reservar(tokens, agora),
+                self.pausado_ate - agora
+            )
+            self.contadores["chamadas"] += 1
+            self.contadores["espera_total"] += espera
+            return espera
+
+    def registrar_limite(self, retry_after=None):
+        with self._lock:
+            self.contadores["limitadas"] += 1
+            self.fator = max(FATOR_MINIMO, self.fator / 2)
+            self._aplicar_fator()
+            if retry_after:
+                self.pausado_ate = max(self.pausado_ate, time.monotonic() + retry_after)
+
+    def registrar_espera(self, segundos):
+        with self._lock:
+            self.contadores["espera_total"] += segundos
+
+    def registrar_sucesso(self, ajuste_tokens=0):
+        """ajuste_tokens = tokens reais - estimados (negativo devolve ao balde)."""
+        with self._lock:
+            if self.fator < 1.0:
+                self.fator = min(1.0, self.fator + RECUPERACAO_POR_SUCESSO)
+                self._aplicar_fator()
+            agora = time.monotonic()
+            if ajuste_tokens < 0:
+                self.tokens.devolver(-ajuste_tokens, agora)
+            elif ajuste_tokens > 0:
+                self.tokens.reservar(ajuste_tokens, agora)
+
+    def estado(self):
+        with self._lock:
+            agora = time.monotonic()
+            self.requisicoes._repor(agora)
+            self.tokens._repor(agora)
+            return {
+                "provedor": self.provedor,
+                "chave": self.chave,
+                "rpm": round(self.rpm * self.fator),
+                "tpm": round(self.tpm * self.fator),
+                "requisicoes_disponiveis": round(self.requisicoes.disponivel, 1),
+                "tokens_disponiveis": round(self.tokens.disponivel),
+                "fator": round(self.fator, 2),
+                "pausado_por": round(max(0.0, self.pausado_ate - agora), 1),
+                **{k: round(v, 1) for k, v in self.contadores.items()}
+            }
+
+
+_limites = {nome: dict(valores) for nome, valores in LIMITES_PADRAO.items()}
+_limitadores = {}  # (provedor, hash da chave) -> Limitador
+_limitadores_lock = threading.Lock()
+
+def _id_chave(api_key):
+    # A chave de API nunca fica guardada nem aparece no estado
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:8]
+
+def configurar_limites(limites):
+    """limites = {"Gemini": {"rpm": 60, "tpm": 1000000}, ...} (ex.: config["limites"])."""
+    with _limitadores_lock:
+        for nome, valores in (limites or {}).items():
+            _limites[nome] = {**_limites.get(nome, LIMITE_GENERICO), **valores}
+        for (nome, _), limitador in _limitadores.items():
+            if nome in (limites or {}):
+                limitador.configurar(_limites[nome]["rpm"], _limites[nome]["tpm"])
+
+def limites_atuais():
+    with _limitadores_lock:
+        return {nome: dict(valores) for nome, valores in _limites.items()}
+
+def obter_limitador(provedor, api_key):
+    chave = (provedor, _id_chave(api_key))
+    with _limitadores_lock:
+        limitador = _limitadores.get(chave)
+        if limitador is None:
+            limites = _limites.get(provedor, LIMITE_GENERICO)
+            limitador = Limitador(provedor, chave[1], limites["rpm"], limites["tpm"])
+            _limitadores[chave] = limitador
+        return limitador
+
+def estado_limitadores():
+    """Uma linha por (provedor, chave) em uso, para a UI e métricas."""
+    with _limitadores_lock:
+        limitadores = list(_limitadores.values())
+    return [limitador.estado() for limitador in limitadores]
+
+# =====================
+# CANCELAMENTO DE CHAMADAS EM ANDAMENTO
+# =====================
+# Quem dispara uma chamada que pode ser abandonada (provedor_reserva) a roda
+# dentro de `with cancelavel(cancelamento)`. As funções de stream de
+# ia_models, enquanto leem uma resposta HTTP, registram com ao_cancelar()
+# como interrompê-la; cancelamento.cancelar(), chamado de outra thread, fecha
+# a conexão e a leitura bloqueada termina na hora, sem esperar o próximo
+# pedaço. As esperas do limitador (cota e backoff) também acordam e não há
+# nova tentativa. Antes de a resposta existir (conexão e espera pelos
+# cabeçalhos, ou uma chamada sem stream) não há o que fechar: essa janela
+# só termina quando o SDK devolve a resposta ou estoura o timeout de leitura.
+class Cancelamento:
+    def __init__(self):
+        self.evento = threading.Event()
+        self._fechamentos = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelado(self):
+        return self.evento.is_set()
+
+    def cancelar(self):
+        # Sob o lock: quem está saindo do bloco ao_cancelar espera o fechamento
+        # terminar, então a conexão nunca é fechada depois de voltar ao pool
+        with self._lock:
+            if self.evento.is_set():
+                return
+            self.evento.set()
+            for fechar in self._fechamentos:
+                try:
+                    fechar()
+                except Exception:
+                    pass
+            self._fechamentos.clear()
+
+    def _registrar(self, fechar):
+        with self._lock:
+            if not self.evento.is_set():
+                self._fechamentos.append(fechar)
+                return
+        fechar()  # já cancelada: interrompe a resposta que acabou de abrir
+
+    def _remover(self, fechar):
+        with self._lock:
+            if fechar in self._fechamentos:
+                self._fechamentos.remove(fechar)
+
+
+_cancelamento_atual = contextvars.ContextVar("cancelamento_atual", default=None)
+
+@contextmanager
+def cancelavel(cancelamento):
+    token = _cancelamento_atual.set(cancelamento)
+    try:
+        yield cancelamento
+    finally:
+        _cancelamento_atual.reset(token)
+
+@contextmanager
+def ao_cancelar(fechar):
+    """Enquanto durar o bloco, cancelar a chamada atual executa fechar() (em outra thread)."""
+    cancelamento = _cancelamento_atual.get()
+    if cancelamento is None:
+        yield
+        return
+    cancelamento._registrar(fechar)
+    try:
+        yield
+    finally:
+        cancelamento._remover(fechar)
+
+def chamada_cancelada():
+    cancelamento = _cancelamento_atual.get()
+    return cancelamento is not None and cancelamento.cancelado
+
+def _esperar(limitador, segundos):
+    cancelamento = _cancelamento_atual.get()
+    if cancelamento is None:
+        time.sleep(segundos)
+        return
+    if cancelamento.evento.wait(segundos):
+        raise ChamadaCancelada(limitador.provedor, "chamada cancelada")
+
+# =====================
+# CHAMADAS COM LIMITE E NOVAS TENTATIVAS
+# =====================
+def espera_backoff(tentativa, retry_after=None):
+    """Exponencial com jitter completo; nunca menos que o Retry-After pedido."""
+    espera = random.uniform(0, min(BACKOFF_MAXIMO, BACKOFF_BASE * (2 ** tentativa)))
+    return max(espera, retry_after or 0.0)
+
+def _falhou(limitador, erro, tentativa, tentativas):
+    """Registra o erro e devolve a espera antes da próxima tentativa (ou relança)."""
+    if not erro.temporario or tentativa == tentativas - 1 or chamada_cancelada():
+        raise erro
+    retry_after = getattr(erro, "retry_after", None)
+    if isinstance(erro, LimiteTaxaExcedido):
+        limitador.registrar_limite(retry_after)
+    espera = espera_backoff(tentativa, retry_after)
+    limitador.registrar_espera(espera)
+    return espera
+
+def executar_com_limite(provedor, api_key, funcao, tokens, tokens_reais=None, tentativas=BACKOFF_TENTATIVAS):
+    """
+    Chama funcao() dentro do limite do provedor/chave, repetindo em 429 e
+    falhas temporárias. Outros erros (e o último temporário) são relançados.
+    tokens é a estimativa reservada; tokens_reais(resposta), se dada, acerta o balde.
+    """
+    limitador = obter_limitador(provedor, api_key)
+    for tentativa in range(tentativas):
+        _esperar(limitador, limitador.reservar(tokens))
+        try:
+            resposta = funcao()
+        except ErroProvedor as e:
+            _esperar(limitador, _falhou(limitador, e, tentativa, tentativas))
+            continue
+        limitador.registrar_sucesso((tokens_reais(resposta) - tokens) if tokens_reais else 0)
+        return resposta
+
+async def aexecutar_com_limite(provedor, api_key, funcao_async, tokens, tentativas=BACKOFF_TENTATIVAS):
+    """Versão assíncrona de executar_com_limite (funcao_async devolve uma corrotina)."""
+    limitador = obter_limitador(provedor, api_key)
+    for tentativa in range(tentativas):
+        await asyncio.sleep(limitador.reservar(tokens))
+        try:
+            resposta = await funcao_async()
+        except ErroProvedor as e:
+            await asyncio.sleep(_falhou(limitador, e, tentativa, tentativas))
+            continue
+        limitador.registrar_sucesso()
+        return resposta
+
+def stream_com_limite(provedor, api_key, funcao_stream, tokens, tentativas=BACKOFF_TENTATIVAS):
+    """
+    Versão de executar_com_limite para geradores de texto. Só repete se o
+    erro vier antes do primeiro pedaço; depois disso o erro é relançado.
+    """
+    limitador = obter_limitador(provedor, api_key)
+    for tentativa in range(tentativas):
+        _esperar(limitador, limitador.reservar(tokens))
+        recebeu = False
+        try:
+            for fragmento in funcao_stream():
+                recebeu = True
+                yield fragmento
+        except ErroProvedor as e:
+            if recebeu:
+                raise
+            _esperar(limitador, _falhou(limitador, e, tentativa, tentativas))
+            continue
+        limitador.registrar_sucesso()
+        return
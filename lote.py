@@ -0,0 +1,262 @@
+"""
+Geração de artefatos em lote, sem Streamlit.
+
+Lê os escopos (contexto e notas) de um CSV ou JSONL, gera os artefatos com a
+mesma montagem de prompt do app e grava um JSONL de resultados, uma linha
+por escopo, à medida que cada um termina. Rodar de novo com a mesma saída
+retoma de onde parou: escopos já concluídos sem erro são pulados.
+
+Uso:
+    python lote.py escopos.csv --saida resultados.jsonl --modelo Gemini --concorrencia 4
+    python lote.py escopos.jsonl --saida r.jsonl --excel r.xlsx --azure-csv r.csv
+    python lote.py escopos.csv --saida r.jsonl --offline --latencia-mock 0.05
+
+Colunas/chaves de cada escopo: "contexto" (obrigatória), "notas", "id"
+(padrão: número da linha) e "modelo" (padrão: --modelo).
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cache_respostas import gerar_com_cache, resposta_valida
+from configuracao import avisos_config, carregar_config
+from gerador import ARTEFATOS, gerar_artefatos_unico, montar_prompt, parametros_modo_unico, resposta_unica_valida
+from limites import configurar_limites, estado_limitadores
+from provedor_reserva import com_reserva
+from provedores import listar_provedores, obter_provedor
+
+# =====================
+# LEITURA DOS ESCOPOS E DOS RESULTADOS
+# =====================
+def ler_escopos(caminho):
+    """Gera {"id", "contexto", "notas", "modelo"} de um .csv ou .jsonl, sem carregar o arquivo inteiro."""
+    with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+        if caminho.lower().endswith((".jsonl", ".ndjson")):
+            linhas = (json.loads(linha) for linha in f if linha.strip())
+        else:
+            linhas = csv.DictReader(f)
+        for numero, linha in enumerate(linhas, start=1):
+            contexto = (linha.get("contexto") or "").strip()
+            if not contexto:
+                continue
+            yield {
+                "id": str(linha.get("id") or numero),
+                "contexto": contexto,
+                "notas": (linha.get("notas") or "").strip(),
+                "modelo": (linha.get("modelo") or "").strip() or None
+            }
+
+def ler_resultados(caminho):
+    """Gera os registros concluídos sem erro do JSONL de saída (um por id)."""
+    if not os.path.exists(caminho):
+        return
+    vistos = set()
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue  # última linha cortada por uma interrupção
+            if registro.get("erro") is None and registro["id"] not in vistos:
+                vistos.add(registro["id"])
+                yield registro
+
+# =====================
+# GERAÇÃO DE UM ESCOPO
+# =====================
+def gerar_escopo(config, escopo, provedor, api_key, modo_unico=False, usar_cache=True):
+    """Gera os quatro artefatos de um escopo e devolve o registro do JSONL."""
+    inicio = time.perf_counter()
+    modelo = provedor.nome_modelo(api_key)
+
+    def chamar(prompt, provedor_chamada, funcao_validacao=None):
+        funcao = lambda p: provedor_chamada.gerar(p, api_key)
+        if not usar_cache:
+            return funcao(prompt)
+        return gerar_com_cache(provedor.nome, modelo, prompt, funcao,
+                               parametros=provedor_chamada.parametros, funcao_validacao=funcao_validacao)
+
+    resultados, erros = {}, []
+    if modo_unico:
+        # Cada candidato (principal e reservas) ajusta os próprios padrões
+        provedor_unico = provedor.com_parametros(parametros_modo_unico)
+        resultados_unico, _ = gerar_artefatos_unico(
+            config, escopo["contexto"], escopo["notas"],
+            lambda prompt: chamar(prompt, provedor_unico, resposta_unica_valida)
+        )
+        resultados.update(resultados_unico or {})
+
+    for tipo in ARTEFATOS:
+        if tipo in resultados:
+            continue
+        try:
+            resposta = chamar(montar_prompt(config, tipo, escopo["contexto"], escopo["notas"]), provedor)
+        except Exception as e:
+            resposta = f"[{provedor.nome}] ERRO: {e}"
+        if not resposta_valida(resposta):
+            erros.append(f"{tipo}: {resposta}")
+        resultados[tipo] = (resposta or "").strip()
+
+    return {
+        "id": escopo["id"],
+        "modelo": provedor.nome,
+        "contexto": escopo["contexto"],
+        "notas": escopo["notas"],
+        "resultados": resultados,
+        "erro": "; ".join(erros) or None,
+        "duracao": round(time.perf_counter() - inicio, 3)
+    }
+
+# =====================
+# EXECUÇÃO DO LOTE
+# =====================
+def executar_lote(config, escopos, caminho_saida, modelo_padrao, concorrencia=4, modo_unico=False,
+                  usar_cache=True, ao_concluir=None, reserva=None):
+    """
+    Processa os escopos com até `concorrencia` escopos em andamento por
+    provedor, gravando cada registro no JSONL assim que fica pronto. Com
+    `reserva`, cada chamada lenta ou com falha vai também a esse provedor.
+    Retorna (gerados, pulados, com_erro).
+    """
+    concluidos = {registro["id"] for registro in ler_resultados(caminho_saida)}
+    executores, em_andamento = {}, {}
+    gerados = pulados = com_erro = 0
+
+    with open(caminho_saida, "a+", encoding="utf-8") as saida:
+        # Uma interrupção no meio da escrita deixa a última linha sem "\n"
+        if saida.tell() > 0:
+            saida.seek(saida.tell() - 1)
+            if saida.read(1) != "\n":
+                saida.write("\n")
+
+        def gravar(futuro):
+            nonlocal gerados, com_erro
+            registro = futuro.result()
+            saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            saida.flush()
+            gerados += 1
+            com_erro += registro["erro"] is not None
+            if ao_concluir:
+                ao_concluir(registro)
+
+        try:
+            for escopo in escopos:
+                if escopo["id"] in concluidos:
+                    pulados += 1
+                    continue
+                provedor = obter_provedor(escopo["modelo"] or modelo_padrao)
+                if reserva:
+                    provedor = com_reserva(provedor, [obter_provedor(reserva)], config["api_keys"])
+                api_key = config["api_keys"].get(provedor.chave_config, "")
+                if provedor.nome not in executores:
+                    executores[provedor.nome] = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix=f"lote-{provedor.nome}")
+                    em_andamento[provedor.nome] = set()
+
+                # Janela limitada por provedor: o arquivo de escopos é lido aos poucos
+                pendentes = em_andamento[provedor.nome]
+                while len(pendentes) >= concorrencia * 2:
+                    prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        pendentes.discard(futuro)
+                        gravar(futuro)
+                pendentes.add(executores[provedor.nome].submit(
+                    gerar_escopo, config, escopo, provedor, api_key, modo_unico, usar_cache
+                ))
+
+            for pendentes in em_andamento.values():
+                while pendentes:
+                    prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        pendentes.discard(futuro)
+                        gravar(futuro)
+        finally:
+            for executor in executores.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+    return gerados, pulados, com_erro
+
+# =====================
+# EXPORTAÇÕES
+# =====================
+def exportar(caminho_saida, config, excel=None, azure_csv=None, enviar_azure=False):
+    if excel:
+        from utils import exportar_excel_streaming
+        exportar_excel_streaming((r["resultados"] for r in ler_resultados(caminho_saida)), destino=excel, hierarquico=True)
+        print(f"Excel gravado em {excel}", file=sys.stderr)
+    if azure_csv:
+        from utils import baixar_csv_azure, exportar_azure_devops
+        with open(azure_csv, "wb") as f:
+            f.write(baixar_csv_azure(exportar_azure_devops(r["resultados"] for r in ler_resultados(caminho_saida))))
+        print(f"CSV do Azure Boards gravado em {azure_csv}", file=sys.stderr)
+    if enviar_azure:
+        from azure_devops import azure_configurado, enviar_work_items
+        config_azure = config.get("azure_devops", {})
+        if not azure_configurado(config_azure):
+            sys.exit("Azure DevOps não configurado (organizacao, projeto e pat em config.json).")
+        # A mesma saída gera sempre a mesma execução: reenviar não duplica work items
+        execucao = hashlib.sha256(os.path.abspath(caminho_saida).encode("utf-8")).hexdigest()
+        itens = enviar_work_items(config_azure, (r["resultados"] for r in ler_resultados(caminho_saida)), execucao=execucao)
+        erros = [item for item in itens if item["erro"]]
+        print(f"Azure DevOps: {len(itens) - len(erros)} work items criados, {len(erros)} com erro", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera artefatos ágeis em lote a partir de um CSV/JSONL de escopos.")
+    parser.add_argument("escopos", help="arquivo .csv ou .jsonl com a coluna 'contexto'")
+    parser.add_argument("--saida", required=True, help="JSONL de resultados (retomado se já existir)")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--modelo", default="Gemini", help="provedor padrão: " + ", ".join(listar_provedores()))
+    parser.add_argument("--concorrencia", type=int, default=4, help="escopos simultâneos por provedor")
+    parser.add_argument("--modo-unico", action="store_true", help="uma chamada por escopo para os quatro artefatos")
+    parser.add_argument("--reserva", help="provedor reserva para failover/hedging (ex.: ChatGPT)")
+    parser.add_argument("--sem-cache", action="store_true", help="não lê nem grava o cache de respostas")
+    parser.add_argument("--offline", action="store_true", help="usa os provedores simulados (provedores_mock)")
+    parser.add_argument("--latencia-mock", type=float, default=None, help="latência simulada por chamada no modo offline (s)")
+    parser.add_argument("--excel", help="grava também um .xlsx (com a aba de hierarquia)")
+    parser.add_argument("--azure-csv", help="grava também o CSV de importação do Azure Boards")
+    parser.add_argument("--enviar-azure", action="store_true", help="cria os work items no Azure DevOps (config.json)")
+    args = parser.parse_args(argv)
+
+    config = carregar_config(args.config)
+    for aviso in avisos_config(args.config):
+        print(aviso, file=sys.stderr)
+    if args.offline:
+        from provedores_mock import registrar_mocks
+        registrar_mocks(args.latencia_mock)
+        # Os mocks só exigem uma chave não vazia
+        config["api_keys"] = {chave: valor or "offline" for chave, valor in config.get("api_keys", {}).items()}
+    configurar_limites(config.get("limites", {}))
+
+    inicio = time.perf_counter()
+
+    def ao_concluir(registro):
+        if registro["erro"]:
+            print(f"[{registro['id']}] erro: {registro['erro']}", file=sys.stderr)
+
+    gerados, pulados, com_erro = executar_lote(
+        config, ler_escopos(args.escopos), args.saida, args.modelo,
+        concorrencia=args.concorrencia, modo_unico=args.modo_unico,
+        usar_cache=not (args.sem_cache or args.offline), ao_concluir=ao_concluir, reserva=args.reserva
+    )
+    duracao = time.perf_counter() - inicio
+    print(
+        f"{gerados} escopos gerados ({com_erro} com erro), {pulados} já concluídos pulados, "
+        f"{duracao:.1f}s ({gerados / duracao if duracao else 0:.1f} escopos/s)",
+        file=sys.stderr
+    )
+    for estado in estado_limitadores():
+        print(
+            f"Limite {estado['provedor']} (chave {estado['chave']}): {estado['chamadas']:.0f} chamadas, "
+            f"{estado['limitadas']:.0f} respostas 429, {estado['espera_total']:.1f}s de espera, fator {estado['fator']}",
+            file=sys.stderr
+        )
+    exportar(args.saida, config, excel=args.excel, azure_csv=args.azure_csv, enviar_azure=args.enviar_azure)
+    return 1 if com_erro else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import math
+import re
+import unicodedata
+import threading
+from collections import Counter, OrderedDict
+
+# =====================
+# BUSCA LOCAL NO PLAYBOOK (BM25)
+# =====================
+# Em vez de colar o playbook inteiro em todo prompt, o texto é dividido por
+# slide, indexado localmente (sem rede) e só os trechos mais relevantes para
+# o artefato e o contexto entram no prompt, dentro de um orçamento de tokens.
+BUSCA_PADRAO = {
+    "ativo": True,
+    "top_k": 5,
+    "orcamento_tokens": 1500
+}
+
+# Termos extras que puxam a busca para o tipo de artefato
+TERMOS_ARTEFATO = {
+    "epic": "épico epic visão objetivo estratégico impacto negócio valor iniciativa",
+    "feature": "feature funcionalidade solução benefício critérios aceitação valor negócio",
+    "user_story": "user story história usuário como quero para que critérios aceitação invest",
+    "task": "task tarefa técnica execução implementação estimativa definição pronto dod"
+}
+
+STOPWORDS = set("""
+a o e é de do da dos das em no na nos nas um uma uns umas para por com sem que se
+ao aos à às ou os as como mais mas seu sua seus suas ser ter foi são está isso este
+esta esse essa the of and to in for on with is be are
+""".split())
+
+CARACTERES_POR_TOKEN = 4
+
+def tokenizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in re.findall(r"\w+", texto) if len(t) > 1 and t not in STOPWORDS]
+
+def estimar_tokens(texto):
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+class IndiceBM25:
+    def __init__(self, documentos, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.tamanhos = []
+        self.postings = {}  # termo -> [(documento, frequência)]
+        for i, documento in enumerate(documentos):
+            frequencias = Counter(tokenizar(documento))
+            self.tamanhos.append(sum(frequencias.values()))
+            for termo, freq in frequencias.items():
+                self.postings.setdefault(termo, []).append((i, freq))
+        total = len(self.tamanhos)
+        self.media = (sum(self.tamanhos) / total) if total else 0
+        self.idf = {
+            termo: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for termo, docs in self.postings.items()
+        }
+
+    def buscar(self, consulta, k=5):
+        """Retorna [(índice do documento, pontuação)] em ordem de relevância."""
+        pontuacoes = Counter()
+        for termo in set(tokenizar(consulta)):
+            for doc, freq in self.postings.get(termo, ()):
+                norma = self.k1 * (1 - self.b + self.b * self.tamanhos[doc] / (self.media or 1))
+                pontuacoes[doc] += self.idf[termo] * freq * (self.k1 + 1) / (freq + norma)
+        return pontuacoes.most_common(k)
+
+# =====================
+# TRECHOS DO PLAYBOOK
+# =====================
+def dividir_texto(texto, tamanho=800):
+    """Divide um playbook sem informação de slide em blocos de parágrafos."""
+    trechos, atual = [], ""
+    for paragrafo in re.split(r"\n\s*\n|\n", texto):
+        paragrafo = paragrafo.strip()
+        if not paragrafo:
+            continue
+        if atual and len(atual) + len(paragrafo) > tamanho:
+            trechos.append(atual)
+            atual = ""
+        atual = f"{atual}\n{paragrafo}" if atual else paragrafo
+    if atual:
+        trechos.append(atual)
+    return trechos
+
+def trechos_do_playbook(config):
+    slides = config.get("playbook_slides")
+    if slides:
+        return tuple(s for s in slides if s.strip())
+    return tuple(dividir_texto(config.get("playbook_text", "")))
+
+_indices = OrderedDict()  # versão do playbook (ou os próprios trechos) -> IndiceBM25
+_indices_lock = threading.Lock()
+MAX_INDICES_EM_MEMORIA = 8
+
+def obter_indice(trechos, versao=None):
+    """
+    Índice dos trechos, guardado em memória e, quando a versão (SHA-256 do
+    arquivo) é conhecida, também no cache em disco do playbook.
+    """
+    chave = versao or trechos
+    with _indices_lock:
+        if chave in _indices:
+            _indices.move_to_end(chave)
+            return _indices[chave]
+
+    indice = None
+    if versao:
+        import cache_playbook
+        indice = cache_playbook.carregar_indice(versao)
+        if indice is None or len(indice.tamanhos) != len(trechos):
+            indice = IndiceBM25(trechos)
+            cache_playbook.salvar_indice(versao, indice)
+    else:
+        indice = IndiceBM25(trechos)
+
+    with _indices_lock:
+        _indices[chave] = indice
+        while len(_indices) > MAX_INDICES_EM_MEMORIA:
+            _indices.popitem(last=False)
+    return indice
+
+def selecionar_playbook(config, tipos, contexto, notas):
+    """
+    Monta o texto do playbook para o prompt de um ou mais tipos de artefato.
+    Com a busca desativada (ou playbook pequeno) devolve o texto completo.
+    """
+    busca = {**BUSCA_PADRAO, **config.get("playbook_busca", {})}
+    trechos = trechos_do_playbook(config)
+    if not busca["ativo"] or len(trechos) <= busca["top_k"]:
+        return config.get("playbook_text", "")
+
+    consulta = " ".join(
+        [TERMOS_ARTEFATO.get(tipo, tipo) for tipo in tipos]
+        + [config["prompts"].get(tipo, "") for tipo in tipos]
+        + [contexto, notas]
+    )
+    encontrados = [doc for doc, pontuacao in obter_indice(trechos, config.get("playbook_versao")).buscar(consulta, busca["top_k"]) if pontuacao > 0]
+    if not encontrados:
+        encontrados = list(range(busca["top_k"]))
+
+    # Respeita o orçamento pela ordem de relevância e devolve na ordem dos slides
+    escolhidos, usados = {}, 0
+    for doc in encontrados:
+        texto = trechos[doc]
+        custo = estimar_tokens(texto)
+        if usados + custo > busca["orcamento_tokens"]:
+            if escolhidos:
+                continue
+            # O trecho mais relevante sozinho já estoura o orçamento: entra cortado
+            texto = texto[:busca["orcamento_tokens"] * CARACTERES_POR_TOKEN]
+            custo = estimar_tokens(texto)
+        escolhidos[doc] = texto
+        usados += custo
+    return "\n---\n".join(escolhidos[doc] for doc in sorted(escolhidos))
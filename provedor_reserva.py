@@ -0,0 +1,396 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cache_respostas import resposta_valida
+from limites import Cancelamento, cancelavel
+
+# =====================
+# LATÊNCIA OBSERVADA POR PROVEDOR
+# =====================
+# Tempo até a resposta completa (gerar) ou até o primeiro pedaço (stream)
+# das últimas chamadas bem-sucedidas. O percentil escolhido define quanto
+# esperar pelo provedor principal antes de disparar a mesma chamada no de
+# reserva: com p95, só ~5% das chamadas geram uma requisição duplicada.
+HEDGE_PERCENTIL_PADRAO = 95
+HEDGE_ATRASO_PADRAO = 10.0  # segundos, enquanto não há amostras suficientes
+HEDGE_MIN_AMOSTRAS = 5
+HEDGE_AMOSTRAS = 200
+
+_latencias = {}  # (provedor, modo) -> deque de segundos
+_latencias_lock = threading.Lock()
+
+def registrar_latencia(provedor, modo, segundos):
+    with _latencias_lock:
+        _latencias.setdefault((provedor, modo), deque(maxlen=HEDGE_AMOSTRAS)).append(segundos)
+
+def atraso_hedge(provedor, modo, percentil=HEDGE_PERCENTIL_PADRAO):
+    with _latencias_lock:
+        amostras = sorted(_latencias.get((provedor, modo), ()))
+    if len(amostras) < HEDGE_MIN_AMOSTRAS:
+        return HEDGE_ATRASO_PADRAO
+    return amostras[min(len(amostras) - 1, int(len(amostras) * percentil / 100))]
+
+# =====================
+# DISJUNTOR (CIRCUIT BREAKER) POR PROVEDOR
+# =====================
+# Depois de DISJUNTOR_FALHAS falhas seguidas o provedor sai da rota por
+# DISJUNTOR_ABERTO_SEGUNDOS; passado esse tempo uma única chamada de teste
+# é liberada (meio aberto): se der certo o disjuntor fecha, se falhar abre de novo.
+DISJUNTOR_FALHAS = 5
+DISJUNTOR_ABERTO_SEGUNDOS = 30.0
+
+
+class Disjuntor:
+    def __init__(self, provedor):
+        self.provedor = provedor
+        self.estado = "fechado"
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self.testando = False
+        self._lock = threading.Lock()
+
+    def permite(self):
+        with self._lock:
+            if self.estado == "fechado":
+                return True
+            if self.estado == "aberto" and time.monotonic() >= self.aberto_ate:
+                self.estado = "meio_aberto"
+                self.testando = False
+            if self.estado == "meio_aberto" and not self.testando:
+                self.testando = True
+                return True
+            return False
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self.estado, self.falhas, self.testando = "fechado", 0, False
+
+    def liberar(self):
+        """A chamada de teste foi cancelada antes de ter resultado."""
+        with self._lock:
+            self.testando = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            self.testando = False
+            if self.estado == "meio_aberto" or self.falhas >= DISJUNTOR_FALHAS:
+                self.estado = "aberto"
+                self.aberto_ate = time.monotonic() + DISJUNTOR_ABERTO_SEGUNDOS
+
+    def situacao(self):
+        with self._lock:
+            return {
+                "provedor": self.provedor,
+                "estado": self.estado,
+                "falhas_seguidas": self.falhas,
+                "reabre_em": round(max(0.0, self.aberto_ate - time.monotonic()), 1) if self.estado == "aberto" else 0.0
+            }
+
+
+_disjuntores = {}
+_disjuntores_lock = threading.Lock()
+
+def obter_disjuntor(provedor):
+    with _disjuntores_lock:
+        return _disjuntores.setdefault(provedor, Disjuntor(provedor))
+
+def estado_disjuntores():
+    with _disjuntores_lock:
+        disjuntores = list(_disjuntores.values())
+    return [disjuntor.situacao() for disjuntor in disjuntores]
+
+# =====================
+# PROVEDOR COM RESERVA (HEDGING + FAILOVER)
+# =====================
+# Implementa o contrato Provedor por cima de um provedor principal e um ou
+# mais de reserva. A chamada vai ao principal; se ele falhar, ou não
+# responder dentro do percentil de latência, a mesma chamada vai à próxima
+# reserva e vale a primeira resposta boa. Provedores com disjuntor aberto são pulados.
+# A perdedora é cancelada por quem chamou (limites.Cancelamento): no stream a
+# conexão é fechada por baixo e a leitura termina na hora; no agerar a tarefa
+# é cancelada; no gerar as esperas do limitador acordam sem nova tentativa.
+# O que continua até o timeout de leitura do SDK (HTTP_TIMEOUT_LEITURA) é a
+# chamada ainda sem resposta: antes dos cabeçalhos/primeiro byte no stream e
+# a requisição inteira no gerar, já que o SDK só devolve a resposta pronta.
+#
+# Cada posição de candidato (principal, 1ª reserva...) tem o seu pool, para
+# que perdedoras presas nessa janela não ocupem as threads do principal.
+# HEDGE_THREADS_POR_CANDIDATO cobre o pior caso do app (TAREFAS_MAX_SIMULTANEAS
+# gerações × 4 artefatos ao mesmo tempo) com folga para as presas.
+HEDGE_THREADS_POR_CANDIDATO = 32
+
+_executores = {}  # posição do candidato -> ThreadPoolExecutor
+_executores_lock = threading.Lock()
+
+def _obter_executor(posicao):
+    with _executores_lock:
+        if posicao not in _executores:
+            _executores[posicao] = ThreadPoolExecutor(
+                max_workers=HEDGE_THREADS_POR_CANDIDATO, thread_name_prefix=f"reserva{posicao}"
+            )
+        return _executores[posicao]
+
+
+class ProvedorComReserva:
+    def __init__(self, principal, reservas, chaves, percentil=HEDGE_PERCENTIL_PADRAO):
+        """chaves = config["api_keys"], para as chaves dos provedores de reserva."""
+        self.principal = principal
+        self.reservas = list(reservas)
+        self.chaves = chaves
+        self.percentil = percentil
+        self.nome = "+".join(p.nome for p in [principal, *self.reservas])
+        self.chave_config = principal.chave_config
+        self.parametros = principal.parametros
+
+    def _candidatos(self, api_key, parametros):
+        """
+        Gera (provedor, chave, parametros) na ordem de preferência. O disjuntor
+        é consultado só na hora do disparo, para que a chamada de teste de um
+        disjuntor meio aberto não seja reservada por um candidato não usado.
+        `parametros` são só os sobrescritos por quem chamou: cada candidato
+        parte dos próprios padrões (já ajustados por com_parametros).
+        """
+        candidatos = [(self.principal, api_key, parametros)]
+        for reserva in self.reservas:
+            # Dos sobrescritos, só repassa os que a reserva conhece (ex.: max_tokens)
+            candidatos.append((reserva, self.chaves.get(reserva.chave_config, ""),
+                               {k: v for k, v in parametros.items() if k in reserva.parametros}))
+        liberou = False
+        for candidato in candidatos:
+            if obter_disjuntor(candidato[0].nome).permite():
+                liberou = True
+                yield candidato
+        if not liberou:
+            # Todos fora da rota: tenta o principal mesmo assim em vez de falhar sem chamar ninguém
+            yield candidatos[0]
+
+    def _chamar(self, candidato, prompt, cancelamento):
+        # O resultado vai para o disjuntor aqui, mesmo que a resposta chegue tarde e seja descartada
+        provedor, chave, parametros = candidato
+        disjuntor = obter_disjuntor(provedor.nome)
+        inicio = time.monotonic()
+        try:
+            with cancelavel(cancelamento):
+                resposta = provedor.gerar(prompt, chave, **parametros)
+            if not resposta_valida(resposta):
+                raise ValueError(f"Resposta inválida de {provedor.nome}: {(resposta or '')[:200]}")
+        except Exception:
+            if cancelamento.cancelado:
+                disjuntor.liberar()  # perdeu a corrida: não conta como falha do provedor
+            else:
+                disjuntor.registrar_falha()
+            raise
+        disjuntor.registrar_sucesso()
+        registrar_latencia(provedor.nome, "gerar", time.monotonic() - inicio)
+        return resposta
+
+    def gerar(self, prompt, api_key, **parametros):
+        candidatos = self._candidatos(api_key, parametros)
+        pendentes, cancelamentos, primeiro_erro = set(), [], None
+
+        def disparar():
+            candidato = next(candidatos, None)
+            if candidato is not None:
+                cancelamentos.append(Cancelamento())
+                executor = _obter_executor(len(cancelamentos) - 1)
+                pendentes.add(executor.submit(self._chamar, candidato, prompt, cancelamentos[-1]))
+            return candidato is not None
+
+        disparar()
+        restam = True
+        try:
+            while pendentes:
+                atraso = atraso_hedge(self.principal.nome, "gerar", self.percentil) if restam else None
+                prontos, _ = wait(pendentes, timeout=atraso, return_when=FIRST_COMPLETED)
+                if not prontos:
+                    restam = disparar()  # principal lento: dispara a reserva em paralelo
+                    continue
+                for futuro in prontos:
+                    pendentes.discard(futuro)
+                    try:
+                        return futuro.result()
+                    except Exception as e:
+                        primeiro_erro = primeiro_erro or e
+                if not pendentes:
+                    restam = disparar()  # todos os disparados falharam: failover imediato
+            raise primeiro_erro
+        finally:
+            for cancelamento in cancelamentos:
+                cancelamento.cancelar()
+
+    async def agerar(self, prompt, api_key, **parametros):
+        candidatos = self._candidatos(api_key, parametros)
+        pendentes, primeiro_erro = set(), None
+
+        async def chamar(candidato):
+            provedor, chave, parametros_candidato = candidato
+            disjuntor = obter_disjuntor(provedor.nome)
+            inicio = time.monotonic()
+            try:
+                resposta = await provedor.agerar(prompt, chave, **parametros_candidato)
+                if not resposta_valida(resposta):
+                    raise ValueError(f"Resposta inválida de {provedor.nome}: {(resposta or '')[:200]}")
+            except asyncio.CancelledError:
+                disjuntor.liberar()
+                raise
+            except Exception:
+                disjuntor.registrar_falha()
+                raise
+            disjuntor.registrar_sucesso()
+            registrar_latencia(provedor.nome, "gerar", time.monotonic() - inicio)
+            return resposta
+
+        def disparar():
+            candidato = next(candidatos, None)
+            if candidato is not None:
+                pendentes.add(asyncio.ensure_future(chamar(candidato)))
+            return candidato is not None
+
+        disparar()
+        restam = True
+        try:
+            while pendentes:
+                atraso = atraso_hedge(self.principal.nome, "gerar", self.percentil) if restam else None
+                prontos, _ = await asyncio.wait(pendentes, timeout=atraso, return_when=asyncio.FIRST_COMPLETED)
+                if not prontos:
+                    restam = disparar()
+                    continue
+                for tarefa in prontos:
+                    pendentes.discard(tarefa)
+                    if tarefa.exception() is None:
+                        return tarefa.result()
+                    primeiro_erro = primeiro_erro or tarefa.exception()
+                if not pendentes:
+                    restam = disparar()
+            raise primeiro_erro
+        finally:
+            # Cancela de fato a chamada perdedora (a requisição HTTP é abortada)
+            for tarefa in pendentes:
+                tarefa.cancel()
+
+    def stream(self, prompt, api_key, **parametros):
+        """
+        Vence quem entregar o primeiro pedaço; a partir daí só ele é lido e os
+        demais são fechados (a conexão deles é interrompida daqui, sem esperar
+        o próximo pedaço). Um erro depois do primeiro pedaço é relançado.
+        """
+        candidatos = self._candidatos(api_key, parametros)
+        fila = queue.Queue()
+        cancelamentos = {}
+
+        def consumir(indice, candidato):
+            provedor, chave, parametros_candidato = candidato
+            cancelamento = cancelamentos[indice]
+            disjuntor = obter_disjuntor(provedor.nome)
+            inicio = time.monotonic()
+            recebeu = False
+            with cancelavel(cancelamento):
+                gerador = provedor.stream(prompt, chave, **parametros_candidato)
+                try:
+                    for fragmento in gerador:
+                        if cancelamento.cancelado:
+                            break
+                        if not fragmento:
+                            continue
+                        if not recebeu:
+                            recebeu = True
+                            disjuntor.registrar_sucesso()
+                            registrar_latencia(provedor.nome, "stream", time.monotonic() - inicio)
+                        fila.put((indice, fragmento, None))
+                    if not recebeu and not cancelamento.cancelado:
+                        # Stream terminou sem texto: conta como falha e abre caminho para a próxima
+                        raise ValueError(f"Resposta vazia de {provedor.nome}")
+                    if not recebeu:
+                        disjuntor.liberar()
+                    fila.put((indice, None, None))
+                except Exception as e:
+                    if cancelamento.cancelado:
+                        # Interrompida por ter perdido a corrida: o erro da conexão fechada é esperado
+                        if not recebeu:
+                            disjuntor.liberar()
+                        fila.put((indice, None, None))
+                    else:
+                        if not recebeu:
+                            disjuntor.registrar_falha()
+                        fila.put((indice, None, e))
+                finally:
+                    gerador.close()
+
+        def disparar():
+            candidato = next(candidatos, None)
+            if candidato is not None:
+                indice = len(cancelamentos)
+                cancelamentos[indice] = Cancelamento()
+                _obter_executor(indice).submit(consumir, indice, candidato)
+            return candidato is not None
+
+        disparar()
+        restam, vencedor, em_andamento, primeiro_erro = True, None, 1, None
+        try:
+            while em_andamento:
+                espera = atraso_hedge(self.principal.nome, "stream", self.percentil) if restam and vencedor is None else None
+                try:
+                    indice, fragmento, erro = fila.get(timeout=espera)
+                except queue.Empty:
+                    if disparar():
+                        em_andamento += 1
+                    else:
+                        restam = False
+                    continue
+                if vencedor is not None and indice != vencedor:
+                    if fragmento is None:
+                        em_andamento -= 1
+                    continue
+                if fragmento is not None:
+                    if vencedor is None:
+                        vencedor = indice
+                        for outro, cancelamento in cancelamentos.items():
+                            if outro != vencedor:
+                                cancelamento.cancelar()
+                    yield fragmento
+                    continue
+                em_andamento -= 1
+                if erro is not None:
+                    if vencedor is not None:
+                        raise erro
+                    primeiro_erro = primeiro_erro or erro
+                    if not em_andamento and disparar():
+                        em_andamento += 1
+                elif indice == vencedor:
+                    return
+            if vencedor is None and primeiro_erro is not None:
+                raise primeiro_erro
+        finally:
+            for cancelamento in cancelamentos.values():
+                cancelamento.cancelar()
+
+    def contar_tokens(self, texto):
+        return self.principal.contar_tokens(texto)
+
+    def saude(self, api_key):
+        return self.principal.saude(api_key)
+
+    def com_parametros(self, ajuste):
+        # Ajusta os padrões de cada candidato, não os do principal repassados às reservas
+        return ProvedorComReserva(
+            self.principal.com_parametros(ajuste), [reserva.com_parametros(ajuste) for reserva in self.reservas],
+            self.chaves, self.percentil
+        )
+
+    def nome_modelo(self, api_key):
+        return "+".join(
+            [self.principal.nome_modelo(api_key)]
+            + [reserva.nome_modelo(self.chaves.get(reserva.chave_config, "")) for reserva in self.reservas]
+        )
+
+def com_reserva(principal, reservas, chaves, percentil=HEDGE_PERCENTIL_PADRAO):
+    """Devolve o principal sozinho quando não há reserva diferente dele."""
+    reservas = [r for r in reservas if r.nome != principal.nome]
+    if not reservas:
+        return principal
+    return ProvedorComReserva(principal, reservas, chaves, percentil)
@@ -0,0 +1,152 @@
+import asyncio
+import copy
+import importlib
+import threading
+from typing import Protocol
+
+from limites import TOKENS_SAIDA_ESTIMADOS, aexecutar_com_limite, executar_com_limite, stream_com_limite
+
+# =====================
+# CONTRATO DE PROVEDOR DE IA
+# =====================
+class Provedor(Protocol):
+    nome: str
+    chave_config: str  # chave usada em config["api_keys"]
+    parametros: dict   # parâmetros de geração padrão (entram na chave do cache)
+
+    def gerar(self, prompt, api_key, **parametros): ...
+    async def agerar(self, prompt, api_key, **parametros): ...
+    def stream(self, prompt, api_key, **parametros): ...
+    def contar_tokens(self, texto): ...
+    def saude(self, api_key): ...
+    def nome_modelo(self, api_key): ...
+    def com_parametros(self, ajuste): ...  # mesmo provedor com parametros = ajuste(parametros)
+
+
+class ProvedorFuncoes:
+    """
+    Implementa o contrato Provedor a partir de funções no formato de
+    ia_models (prompt, api_key, **parametros). Só funcao_gerar é
+    obrigatória; o restante tem um comportamento padrão.
+
+    Com limitar=True cada chamada passa pelo limitador de taxa do provedor
+    e da chave (limites) e é repetida com backoff em 429/falhas temporárias;
+    as funções devem levantar os erros tipados de limites para isso.
+    """
+
+    def __init__(self, nome, chave_config, funcao_gerar, funcao_stream=None, funcao_agerar=None,
+                 funcao_contar_tokens=None, funcao_saude=None, modelo=None, parametros=None, limitar=True):
+        self.nome = nome
+        self.chave_config = chave_config
+        self.parametros = parametros or {}
+        self._gerar = funcao_gerar
+        self._stream = funcao_stream
+        self._agerar = funcao_agerar
+        self._contar_tokens = funcao_contar_tokens
+        self._saude = funcao_saude
+        self._modelo = modelo
+        self.limitar = limitar
+
+    def _parametros(self, parametros):
+        return {**self.parametros, **parametros}
+
+    def _tokens_estimados(self, prompt, parametros):
+        # Entrada medida + teto da saída: o que a chamada pode consumir do TPM
+        return self.contar_tokens(prompt) + parametros.get("max_tokens", TOKENS_SAIDA_ESTIMADOS)
+
+    def gerar(self, prompt, api_key, **parametros):
+        parametros = self._parametros(parametros)
+        if not self.limitar:
+            return self._gerar(prompt, api_key, **parametros)
+        return executar_com_limite(
+            self.nome, api_key, lambda: self._gerar(prompt, api_key, **parametros),
+            self._tokens_estimados(prompt, parametros),
+            tokens_reais=lambda resposta: self.contar_tokens(prompt) + self.contar_tokens(resposta or "")
+        )
+
+    async def agerar(self, prompt, api_key, **parametros):
+        if self._agerar is None:
+            return await asyncio.to_thread(self.gerar, prompt, api_key, **parametros)
+        parametros = self._parametros(parametros)
+        if not self.limitar:
+            return await self._agerar(prompt, api_key, **parametros)
+        return await aexecutar_com_limite(
+            self.nome, api_key, lambda: self._agerar(prompt, api_key, **parametros),
+            self._tokens_estimados(prompt, parametros)
+        )
+
+    def stream(self, prompt, api_key, **parametros):
+        if self._stream is None:
+            yield self.gerar(prompt, api_key, **parametros)
+            return
+        parametros = self._parametros(parametros)
+        if not self.limitar:
+            yield from self._stream(prompt, api_key, **parametros)
+            return
+        yield from stream_com_limite(
+            self.nome, api_key, lambda: self._stream(prompt, api_key, **parametros),
+            self._tokens_estimados(prompt, parametros)
+        )
+
+    def contar_tokens(self, texto):
+        if self._contar_tokens is not None:
+            return self._contar_tokens(texto)
+        # Estimativa simples: ~4 caracteres por token
+        return len(texto) // 4 + 1
+
+    def saude(self, api_key):
+        """Retorna (ok, mensagem)."""
+        if self._saude is not None:
+            return self._saude(api_key)
+        if not api_key:
+            return False, f"Chave {self.nome} não configurada."
+        return True, "Chave configurada."
+
+    def nome_modelo(self, api_key):
+        if callable(self._modelo):
+            return self._modelo(api_key)
+        return self._modelo or self.nome
+
+    def com_parametros(self, ajuste):
+        """Cópia com os parâmetros padrão trocados por ajuste(parametros) (ex.: modo único)."""
+        copia = copy.copy(self)
+        copia.parametros = ajuste(dict(self.parametros))
+        return copia
+
+# =====================
+# REGISTRO DE PROVEDORES
+# =====================
+# Os provedores reais vivem em ia_models e se registram ao ser importados;
+# o import só acontece quando um deles é pedido pela primeira vez. Esse
+# registro padrão nunca substitui um provedor registrado explicitamente com o
+# mesmo nome (ex.: os mocks do modo offline), seja qual for a ordem dos imports.
+MODULOS_PADRAO = {
+    "Gemini": "ia_models",
+    "ChatGPT": "ia_models",
+    "Copilot": "ia_models"
+}
+
+_registro = {}
+_explicitos = set()  # nomes registrados fora do registro padrão
+_registro_lock = threading.Lock()
+
+def registrar_provedor(provedor, padrao=False):
+    """padrao=True é para os módulos de MODULOS_PADRAO (não sobrescreve um registro explícito)."""
+    with _registro_lock:
+        if padrao and provedor.nome in _explicitos:
+            return _registro[provedor.nome]
+        if not padrao:
+            _explicitos.add(provedor.nome)
+        _registro[provedor.nome] = provedor
+    return provedor
+
+def obter_provedor(nome):
+    if nome not in _registro and nome in MODULOS_PADRAO:
+        importlib.import_module(MODULOS_PADRAO[nome])
+    try:
+        return _registro[nome]
+    except KeyError:
+        raise KeyError(f"Provedor de IA desconhecido: {nome}") from None
+
+def listar_provedores():
+    return list(dict.fromkeys([*MODULOS_PADRAO, *_registro]))
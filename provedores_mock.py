@@ -0,0 +1,44 @@
+import time
+
+from provedores import ProvedorFuncoes, registrar_provedor
+
+# =====================
+# PROVEDORES SIMULADOS (OFFLINE)
+# =====================
+# Mesmas respostas fixas que o app_novo.py usava, agora num módulo próprio:
+# servem ao app de demonstração e como backend offline da geração em lote
+# (benchmarks sem rede e sem custo). MOCK_LATENCIA imita o tempo da API.
+MOCK_LATENCIA = 0.5
+
+def gerar_resposta_gemini(prompt, api_key):
+    """MOCK: Simula a geração de resposta do Gemini."""
+    if not api_key:
+        raise ValueError("Chave Gemini não configurada.")
+    time.sleep(MOCK_LATENCIA)
+    return f"**[GEMINI - EPIC]** Proposta de Épico Baseada em IA:\n\n*Tema:* {prompt[prompt.find('Contexto:')+10:prompt.find('Notas:')].strip()}\n\nO objetivo é focar em uma experiência de compra 'Premium' para o usuário."
+
+def gerar_resposta_gpt(prompt, api_key):
+    """MOCK: Simula a geração de resposta do ChatGPT."""
+    if not api_key:
+        raise ValueError("Chave ChatGPT não configurada.")
+    time.sleep(MOCK_LATENCIA)
+    return f"**[CHATGPT - FEATURE]** Proposta de Feature Baseada em IA:\n\n*Título:* Implementação de Pagamento Rápido via Pix.\n\nEsta feature reduzirá o atrito na etapa final do checkout."
+
+def gerar_resposta_copilot(prompt, api_key):
+    """MOCK: Simula a geração de resposta do Copilot."""
+    if not api_key:
+        raise ValueError("Chave Copilot não configurada.")
+    time.sleep(MOCK_LATENCIA)
+    return f"**[COPILOT - USER STORY]** Proposta de User Story Baseada em IA:\n\nComo um **usuário VIP**, eu quero **salvar meu endereço de entrega automaticamente**, para que **eu finalize compras com apenas um clique.**"
+
+def registrar_mocks(latencia=None):
+    """
+    Registra os mocks no lugar dos provedores reais (nenhum SDK é importado),
+    sem limite de taxa: não há cota a respeitar e os benchmarks ficam livres.
+    """
+    global MOCK_LATENCIA
+    if latencia is not None:
+        MOCK_LATENCIA = latencia
+    registrar_provedor(ProvedorFuncoes("Gemini", "gemini", gerar_resposta_gemini, modelo="mock-gemini", limitar=False))
+    registrar_provedor(ProvedorFuncoes("ChatGPT", "chatgpt", gerar_resposta_gpt, modelo="mock-chatgpt", limitar=False))
+    registrar_provedor(ProvedorFuncoes("Copilot", "copilot", gerar_resposta_copilot, modelo="mock-copilot", limitar=False))
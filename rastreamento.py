@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# =====================
+# RASTREAMENTO POR ETAPA (SPANS)
+# =====================
+# Um Rastro por execução (ex.: uma geração do app4) com um span por etapa:
+# montar_prompt, requisicao_provedor (com ttfb_ms, o tempo até o primeiro
+# pedaço) e interpretar_resposta, marcados com o artefato ("tipo") e o
+# provedor. O que acontece depois que a execução termina (ex.: a primeira
+# exibição do resultado na UI) vai num rastro próprio, para que todo span
+# fique dentro do intervalo do seu span raiz. Cada span terminado vira uma linha em
+# RASTROS_ARQUIVO com os campos do modelo de span do OpenTelemetry
+# (traceId, spanId, parentSpanId, startTimeUnixNano...), e o rastro guarda
+# os spans em memória para a UI mostrar o tempo de cada etapa.
+RASTROS_ARQUIVO = os.path.join(".cache", "rastros.jsonl")
+RASTROS_MAX_BYTES = 20 * 1024 * 1024  # acima disso o arquivo vira rastros.jsonl.1
+
+ETAPAS = ["montar_prompt", "requisicao_provedor", "interpretar_resposta"]
+
+_arquivo_lock = threading.Lock()
+
+
+def exportar_span(registro, arquivo=RASTROS_ARQUIVO):
+    linha = json.dumps(registro, ensure_ascii=False) + "\n"
+    with _arquivo_lock:
+        os.makedirs(os.path.dirname(arquivo) or ".", exist_ok=True)
+        try:
+            if os.path.getsize(arquivo) > RASTROS_MAX_BYTES:
+                os.replace(arquivo, arquivo + ".1")
+        except FileNotFoundError:
+            pass
+        with open(arquivo, "a", encoding="utf-8") as f:
+            f.write(linha)
+
+
+class Span:
+    def __init__(self, rastro, nome, pai, atributos):
+        self.rastro = rastro
+        self.nome = nome
+        self.id = uuid.uuid4().hex[:16]
+        self.pai = pai
+        self.atributos = atributos
+        self.inicio = time.time_ns()
+        self._inicio_monotonico = time.perf_counter()
+        self.duracao_ms = None
+        self.erro = None
+
+    def definir(self, **atributos):
+        self.atributos.update(atributos)
+
+    def marcar_primeiro_byte(self):
+        if "ttfb_ms" not in self.atributos:
+            self.atributos["ttfb_ms"] = round((time.perf_counter() - self._inicio_monotonico) * 1000, 1)
+
+    def terminar(self, erro=None):
+        self.duracao_ms = round((time.perf_counter() - self._inicio_monotonico) * 1000, 1)
+        self.erro = f"{type(erro).__name__}: {erro}" if erro else None
+        self.rastro._terminou(self)
+
+    def como_registro(self):
+        return {
+            "traceId": self.rastro.id,
+            "spanId": self.id,
+            "parentSpanId": self.pai,
+            "name": self.nome,
+            "startTimeUnixNano": self.inicio,
+            "endTimeUnixNano": self.inicio + int(self.duracao_ms * 1e6),
+            "attributes": {**self.rastro.comuns, **self.atributos, "duracao_ms": self.duracao_ms},
+            "status": {"code": "ERROR", "message": self.erro} if self.erro else {"code": "OK"}
+        }
+
+
+class _SpanNulo:
+    """Usado quando não há rastro: as etapas rodam igual, sem medir."""
+    def definir(self, **atributos):
+        pass
+
+    def marcar_primeiro_byte(self):
+        pass
+
+
+class Rastro:
+    """
+    Spans de uma execução. `comuns` (ex.: provedor, modelo) vão em todos os
+    spans; o span raiz (`nome`) cobre a execução até terminar() ser chamado.
+    """
+
+    def __init__(self, nome, arquivo=RASTROS_ARQUIVO, **comuns):
+        self.id = uuid.uuid4().hex
+        self.arquivo = arquivo
+        self.comuns = comuns
+        self.spans = []
+        self._lock = threading.Lock()
+        self.raiz = Span(self, nome, None, {})
+
+    def iniciar(self, nome, **atributos):
+        return Span(self, nome, self.raiz.id, atributos)
+
+    def terminar(self, erro=None):
+        self.raiz.terminar(erro)
+
+    def _terminou(self, span):
+        with self._lock:
+            self.spans.append(span)
+        if self.arquivo:
+            try:
+                exportar_span(span.como_registro(), self.arquivo)
+            except OSError:
+                pass  # o rastro em disco é diagnóstico: não derruba a geração
+
+    @property
+    def duracao_ms(self):
+        return self.raiz.duracao_ms
+
+    def tempos(self, tipo):
+        """{etapa: ms somados} dos spans do artefato, mais "primeiro_byte" se houver."""
+        with self._lock:
+            spans = [s for s in self.spans if s.atributos.get("tipo") == tipo]
+        tempos = {}
+        for s in spans:
+            tempos[s.nome] = round(tempos.get(s.nome, 0) + s.duracao_ms, 1)
+            if "ttfb_ms" in s.atributos:
+                tempos["primeiro_byte"] = s.atributos["ttfb_ms"]
+        return tempos
+
+    def detalhamento(self):
+        """Uma linha por artefato (na ordem em que aparecem) com o tempo de cada etapa."""
+        with self._lock:
+            tipos = list(dict.fromkeys(s.atributos["tipo"] for s in self.spans if "tipo" in s.atributos))
+        return [{"tipo": tipo, **self.tempos(tipo)} for tipo in tipos]
+
+
+@contextmanager
+def span(rastro, nome, **atributos):
+    """with span(rastro, "etapa", tipo=...) as s: ... (sem rastro, não mede)."""
+    if rastro is None:
+        yield _SpanNulo()
+        return
+    atual = rastro.iniciar(nome, **atributos)
+    erro = None
+    try:
+        yield atual
+    except GeneratorExit:
+        atual.definir(cancelado=True)
+        raise
+    except Exception as e:
+        erro = e
+        raise
+    finally:
+        atual.terminar(erro)
+
+def medir_stream(rastro, fragmentos, nome="requisicao_provedor", **atributos):
+    """Repassa os pedaços de um stream medindo o tempo até o primeiro e o total."""
+    with span(rastro, nome, **atributos) as atual:
+        for fragmento in fragmentos:
+            atual.marcar_primeiro_byte()
+            yield fragmento
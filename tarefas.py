@@ -0,0 +1,220 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_respostas import gerar_com_cache, stream_com_cache
+from gerador import ARTEFATOS, gerar_artefatos_streaming, gerar_artefatos_unico, montar_prompt, parametros_modo_unico, resposta_unica_valida
+from provedor_reserva import HEDGE_PERCENTIL_PADRAO, com_reserva
+from provedores import obter_provedor
+from rastreamento import Rastro, span
+
+# =====================
+# EXECUTOR DE TAREFAS EM SEGUNDO PLANO
+# =====================
+# Um executor por processo do servidor, compartilhado por todas as sessões.
+# A tarefa roda fora do script do Streamlit: um rerun (clique em qualquer
+# widget, troca de página na sidebar) não interrompe a geração. A sessão só
+# guarda o id da tarefa em st.session_state e lê o progresso a cada rerun.
+# Threads (e não processos) porque a geração espera rede e reaproveita os
+# clientes HTTP, o cache e os limitadores do processo.
+TAREFAS_MAX_SIMULTANEAS = 4
+TAREFAS_RETENCAO_SEGUNDOS = 3600  # tarefas terminadas ficam disponíveis por 1h
+
+_executor = None
+_tarefas = {}  # id -> Tarefa
+_tarefas_lock = threading.Lock()
+
+
+class Tarefa:
+    """
+    Estado de uma execução, escrito pela thread da tarefa e lido pela UI.
+    `partes` guarda o progresso de cada item (ex.: um artefato). `versao`
+    aumenta a cada mudança e `versoes` guarda a versão da última mudança de
+    cada parte, para a UI ler só o que mudou desde o último redesenho.
+    """
+
+    def __init__(self, descricao=""):
+        self.id = uuid.uuid4().hex
+        self.descricao = descricao
+        self.situacao = "pendente"  # pendente, executando, concluida, erro
+        self.fase = ""
+        self.partes = {}
+        self.avisos = []
+        self.resultado = None
+        self.erro = None
+        self.criada = time.time()
+        self.terminada = None
+        self.versao = 0
+        self.versoes = {}  # parte -> versão da sua última mudança
+        self._lock = threading.Lock()
+
+    @property
+    def em_andamento(self):
+        return self.situacao in ("pendente", "executando")
+
+    def atualizar(self, parte, **campos):
+        with self._lock:
+            self.partes.setdefault(parte, {}).update(campos)
+            self.versao += 1
+            self.versoes[parte] = self.versao
+
+    def definir_fase(self, fase):
+        with self._lock:
+            self.fase = fase
+            self.versao += 1
+
+    def avisar(self, mensagem):
+        with self._lock:
+            self.avisos.append(mensagem)
+            self.versao += 1
+
+    def _terminar(self, situacao, resultado=None, erro=None):
+        with self._lock:
+            self.situacao, self.resultado, self.erro = situacao, resultado, erro
+            self.fase = ""
+            self.terminada = time.time()
+            self.versao += 1
+
+    # Leituras para a UI: cópias feitas sob o lock, só do que mudou
+    def mudancas(self, desde):
+        """(versao atual, {parte: cópia}) das partes alteradas depois da versão `desde`."""
+        with self._lock:
+            return self.versao, {nome: dict(self.partes[nome]) for nome, versao in self.versoes.items() if versao > desde}
+
+    def resumo(self):
+        with self._lock:
+            return {
+                "situacao": self.situacao,
+                "fase": self.fase,
+                "avisos": list(self.avisos),
+                "erro": self.erro,
+                "versao": self.versao,
+                "duracao": (self.terminada or time.time()) - self.criada
+            }
+
+
+def _obter_executor():
+    global _executor
+    with _tarefas_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TAREFAS_MAX_SIMULTANEAS, thread_name_prefix="tarefa")
+        return _executor
+
+def _executar(tarefa, funcao, args, kwargs):
+    with tarefa._lock:
+        tarefa.situacao = "executando"
+        tarefa.versao += 1
+    try:
+        resultado = funcao(tarefa, *args, **kwargs)
+    except Exception as e:
+        tarefa._terminar("erro", erro=f"{type(e).__name__}: {e}")
+    else:
+        tarefa._terminar("concluida", resultado=resultado)
+
+def _limpar_antigas():
+    limite = time.time() - TAREFAS_RETENCAO_SEGUNDOS
+    with _tarefas_lock:
+        for id_tarefa in [i for i, t in _tarefas.items() if t.terminada and t.terminada < limite]:
+            del _tarefas[id_tarefa]
+
+def iniciar_tarefa(funcao, *args, descricao="", **kwargs):
+    """Agenda funcao(tarefa, *args, **kwargs) no executor e devolve o id da tarefa."""
+    _limpar_antigas()
+    tarefa = Tarefa(descricao)
+    with _tarefas_lock:
+        _tarefas[tarefa.id] = tarefa
+    _obter_executor().submit(_executar, tarefa, funcao, args, kwargs)
+    return tarefa.id
+
+def obter_tarefa(id_tarefa):
+    if not id_tarefa:
+        return None
+    with _tarefas_lock:
+        return _tarefas.get(id_tarefa)
+
+# =====================
+# GERAÇÃO DE ARTEFATOS EM SEGUNDO PLANO
+# =====================
+def gerar_artefatos_tarefa(tarefa, config, contexto, notas, modelo, modo_unico=False, ignorar_cache=False,
+                           reserva=None, percentil=HEDGE_PERCENTIL_PADRAO):
+    """
+    Geração do app4 (modo único opcional, depois streaming dos artefatos que
+    faltarem), publicando o progresso de cada artefato em tarefa.partes:
+    {"estado": pendente|processando|recebendo|concluido|erro, "texto", "erro",
+    "tempos"}. O rastro da execução (spans por etapa) volta em "rastro".
+    """
+    provedor = obter_provedor(modelo)
+    api_key = config["api_keys"][provedor.chave_config]
+    if reserva:
+        provedor = com_reserva(provedor, [obter_provedor(reserva)], config["api_keys"], percentil)
+    for tipo in ARTEFATOS:
+        tarefa.atualizar(tipo, estado="pendente", texto="", erro=None)
+
+    rastro = Rastro("geracao", provedor=provedor.nome, modo_unico=modo_unico)
+    try:
+        resultados = _gerar_com_rastro(tarefa, rastro, provedor, api_key, config, contexto, notas, modo_unico, ignorar_cache)
+    except Exception as e:
+        rastro.terminar(e)
+        raise
+    rastro.terminar()
+
+    return {
+        # Mantém a ordem do ciclo (epic → task) independente da ordem de chegada
+        "resultados": {tipo: resultados[tipo] for tipo in ARTEFATOS if tipo in resultados},
+        "geracao_info": {"modelo": provedor.nome, "playbook_versao": config.get("playbook_versao")},
+        "rastro": rastro
+    }
+
+def _gerar_com_rastro(tarefa, rastro, provedor, api_key, config, contexto, notas, modo_unico, ignorar_cache):
+    resultados = {}
+    # Modo único: uma só chamada devolve todos os artefatos em JSON
+    if modo_unico:
+        tarefa.definir_fase(f"🎯 Gerando todos os artefatos em uma única chamada ({provedor.nome})...")
+        # Cada candidato (principal e reservas) ajusta os próprios padrões
+        provedor_unico = provedor.com_parametros(parametros_modo_unico)
+        resultados_unico, erro_unico = gerar_artefatos_unico(
+            config, contexto, notas,
+            lambda prompt: gerar_com_cache(
+                provedor.nome, provedor.nome_modelo(api_key), prompt,
+                lambda p: provedor_unico.gerar(p, api_key),
+                parametros=provedor_unico.parametros, ignorar_cache=ignorar_cache,
+                funcao_validacao=resposta_unica_valida
+            ),
+            rastro=rastro
+        )
+        if resultados_unico is None:
+            tarefa.avisar(f"⚠️ Resposta única inválida ({erro_unico}). Gerando artefato por artefato...")
+        else:
+            faltando = [tipo.upper() for tipo in ARTEFATOS if tipo not in resultados_unico]
+            if faltando:
+                tarefa.avisar(f"⚠️ Resposta única sem {', '.join(faltando)}. Gerando só esses artefatos...")
+            resultados.update(resultados_unico)
+            for tipo, texto in resultados_unico.items():
+                tarefa.atualizar(tipo, estado="concluido", texto=texto, unico=True, tempos=rastro.tempos("unico"))
+
+    # Monta todos os prompts antes de enviar (nenhum depende da resposta anterior)
+    prompts = {}
+    for tipo in ARTEFATOS:
+        if tipo not in resultados:
+            with span(rastro, "montar_prompt", tipo=tipo):
+                prompts[tipo] = montar_prompt(config, tipo, contexto, notas)
+            tarefa.atualizar(tipo, estado="processando")
+    tarefa.definir_fase(f"Analisando **contexto** e **playbook** ({provedor.nome})...")
+
+    # Respostas já obtidas para o mesmo prompt/modelo vêm do cache em disco
+    funcao_stream = lambda prompt: stream_com_cache(
+        provedor.nome, provedor.nome_modelo(api_key), prompt,
+        lambda p: provedor.stream(p, api_key),
+        parametros=provedor.parametros, ignorar_cache=ignorar_cache
+    )
+    for tipo, texto, concluido, erro in gerar_artefatos_streaming(prompts, funcao_stream, rastro=rastro):
+        if not concluido:
+            tarefa.atualizar(tipo, estado="recebendo", texto=texto)
+        elif erro is None:
+            resultados[tipo] = texto.strip()
+            tarefa.atualizar(tipo, estado="concluido", texto=resultados[tipo], tempos=rastro.tempos(tipo))
+        else:
+            resultados[tipo] = f"Erro ao gerar {tipo.upper()}: {erro}"
+            tarefa.atualizar(tipo, estado="erro", texto=texto, erro=str(erro), tempos=rastro.tempos(tipo))
+    return resultados
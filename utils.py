@@ -1,6 +1,11 @@
-import pandas as pd
 import io
-from pptx import Presentation
+import os
+import posixpath
+import re
+import sys
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
 
 # =====================
 # EXPORTAÇÃO CSV/EXCEL
@@ -14,24 +19,351 @@ def exportar_artefatos(resultados):
         "task": "texto task"
     }
     """
+    import pandas as pd
+
     df = pd.DataFrame([resultados])
     return df
 
 def baixar_excel(df, filename="artefatos.xlsx"):
     buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False)
+    escrever_planilha(buffer, [str(c) for c in df.columns], df.itertuples(index=False, name=None))
     buffer.seek(0)
     return buffer
 
+# =====================
+# EXCEL EM STREAMING (MEMÓRIA CONSTANTE)
+# =====================
+# Para exportar milhares de artefatos (execuções em lote), as linhas vêm de
+# um gerador e o xlsxwriter em modo constant_memory grava cada linha em
+# disco assim que ela é escrita. Sem destino, o arquivo sai num
+# SpooledTemporaryFile: fica em memória enquanto é pequeno e vai para o
+# disco quando passa de EXCEL_SPOOL_MAX_BYTES.
+EXCEL_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+EXCEL_LIMITE_TEXTO = 32767  # limite de caracteres de uma célula
+
+# Ordem da hierarquia e nome do tipo no Azure DevOps
+TIPOS_WORK_ITEM = {
+    "epic": "Epic",
+    "feature": "Feature",
+    "user_story": "User Story",
+    "task": "Task"
+}
+COLUNAS_HIERARQUIA = ["ID", "Work Item Type", "Title", "Parent ID", "Description"]
+
+# Primeira linha útil do texto, sem a marcação markdown do início e do fim
+RE_TITULO = r"^[\s#*>\-]*([^\n]*?)[\s*]*(?:\n|$)"
+RE_NEGRITO = r"\*\*|__"
+LIMITE_TITULO = 255
+
+def titulo_artefato(texto, limite=LIMITE_TITULO):
+    """Title do Azure DevOps a partir do texto gerado."""
+    encontrado = re.match(RE_TITULO, texto)
+    return re.sub(RE_NEGRITO, "", encontrado.group(1)).strip()[:limite] if encontrado else ""
+
+def linhas_hierarquicas(lista_resultados, primeiro_id=1):
+    """
+    Gera [ID, Work Item Type, Title, Parent ID, Description] para cada
+    artefato de cada dict de resultados. Cada nível aponta para o item do
+    nível acima; se um nível faltar, aponta para o mais próximo que existe.
+    """
+    proximo_id = primeiro_id
+    for resultados in lista_resultados:
+        pai = None
+        for tipo, tipo_azure in TIPOS_WORK_ITEM.items():
+            texto = (resultados.get(tipo) or "").strip()
+            if not texto:
+                continue
+            yield [proximo_id, tipo_azure, titulo_artefato(texto), pai, texto]
+            pai = proximo_id
+            proximo_id += 1
+
+def _abrir_planilha(destino):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(destino, {"constant_memory": True})
+    # Formatos criados uma vez por arquivo e reaproveitados em todas as células
+    formatos = {
+        "cabecalho": workbook.add_format({"bold": True, "bg_color": "#D9D9D9", "border": 1}),
+        "texto": workbook.add_format({"text_wrap": True, "valign": "top"}),
+        "numero": workbook.add_format({"valign": "top"})
+    }
+    return workbook, formatos
+
+def _nova_aba(workbook, formatos, nome, colunas, larguras=None):
+    aba = workbook.add_worksheet(nome)
+    for coluna, largura in enumerate(larguras or [60] * len(colunas)):
+        aba.set_column(coluna, coluna, largura)
+    aba.write_row(0, 0, colunas, formatos["cabecalho"])
+    aba.freeze_panes(1, 0)
+    return aba
+
+def _ausente(valor):
+    if valor is None or isinstance(valor, str):
+        return valor is None
+    # NaN/NaT/NA só chegam de DataFrames, ou seja, com o pandas já importado
+    pd = sys.modules.get("pandas")
+    return pd is not None and pd.isna(valor)
+
+def _escrever_linha(aba, formatos, linha, valores):
+    for coluna, valor in enumerate(valores):
+        if _ausente(valor):
+            continue
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            aba.write_number(linha, coluna, valor, formatos["numero"])
+        else:
+            # write_string: texto gerado que comece com "=" não vira fórmula
+            aba.write_string(linha, coluna, str(valor)[:EXCEL_LIMITE_TEXTO], formatos["texto"])
+
+def _destino_excel(destino):
+    if destino is None:
+        return tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX_BYTES, suffix=".xlsx")
+    return destino
+
+def escrever_planilha(destino, colunas, linhas, nome_aba="Artefatos", larguras=None):
+    """
+    Grava uma aba com as linhas (iterável de listas/tuplas) em destino, que
+    pode ser um caminho ou um arquivo aberto em modo binário. As linhas são
+    consumidas uma a uma, sem montar a tabela em memória.
+    """
+    workbook, formatos = _abrir_planilha(destino)
+    aba = _nova_aba(workbook, formatos, nome_aba, colunas, larguras)
+    for linha, valores in enumerate(linhas, start=1):
+        _escrever_linha(aba, formatos, linha, valores)
+    workbook.close()
+    return destino
+
+def exportar_excel_streaming(lista_resultados, destino=None, hierarquico=False):
+    """
+    lista_resultados = iterável de dicts no formato de exportar_artefatos
+    (pode ser um gerador). Grava a aba "Artefatos" (uma linha por dict) e,
+    com hierarquico=True, a aba "Hierarquia" (uma linha por work item, com
+    Parent ID), tudo numa única passada. Sem destino, devolve um
+    SpooledTemporaryFile já posicionado no início.
+    """
+    saida = _destino_excel(destino)
+    workbook, formatos = _abrir_planilha(saida)
+    tipos = list(TIPOS_WORK_ITEM)
+    aba_artefatos = _nova_aba(workbook, formatos, "Artefatos", tipos)
+    aba_hierarquia = None
+    if hierarquico:
+        aba_hierarquia = _nova_aba(workbook, formatos, "Hierarquia", COLUNAS_HIERARQUIA, [8, 14, 50, 10, 80])
+
+    linha_hierarquia = 1
+    proximo_id = 1
+    for linha, resultados in enumerate(lista_resultados, start=1):
+        _escrever_linha(aba_artefatos, formatos, linha, [resultados.get(tipo) for tipo in tipos])
+        if aba_hierarquia is not None:
+            for valores in linhas_hierarquicas([resultados], primeiro_id=proximo_id):
+                _escrever_linha(aba_hierarquia, formatos, linha_hierarquia, valores)
+                linha_hierarquia += 1
+                proximo_id = valores[0] + 1
+    workbook.close()
+
+    if destino is None:
+        saida.seek(0)
+    return saida
+
+# =====================
+# IMPORTAÇÃO EM MASSA NO AZURE BOARDS (CSV)
+# =====================
+# Formato de árvore do importador CSV do Azure Boards: ID em branco (itens
+# novos) e o título na coluna "Title N" do nível do item. O importador liga
+# cada linha à última linha do nível de cima, então a ordem das linhas é a
+# própria relação pai/filho. Tudo é montado com operações vetorizadas do
+# pandas sobre a coluna inteira, sem laço por artefato.
+COLUNAS_AZURE = [
+    "ID", "Work Item Type", "Title 1", "Title 2", "Title 3", "Title 4",
+    "Description", "Acceptance Criteria"
+]
+# Tipos que têm o campo Acceptance Criteria no processo Agile
+TIPOS_COM_CRITERIOS = {"epic", "feature", "user_story"}
+RE_CRITERIOS = (
+    r"(?is)^(.*?)(?:^|\n)[ \t#*>\-]*"
+    r"(?:crit[ée]rios\s+de\s+aceita[çc][ãa]o|acceptance\s+criteria)[^\n]*\n?(.*)$"
+)
+
+def _html(coluna):
+    # Description e Acceptance Criteria são campos HTML no Azure DevOps
+    return (
+        coluna.str.replace("&", "&amp;", regex=False)
+        .str.replace("<", "&lt;", regex=False)
+        .str.replace(">", "&gt;", regex=False)
+        .str.strip()
+        .str.replace("\n", "<br>", regex=False)
+    )
+
+def exportar_azure_devops(lista_resultados):
+    """
+    Uma linha por work item, na ordem Epic > Feature > User Story > Task de
+    cada dict de resultados, no esquema de importação do Azure Boards. Níveis
+    ausentes são pulados e os de baixo sobem um nível.
+    """
+    import pandas as pd
+
+    tipos = list(TIPOS_WORK_ITEM)
+    largo = pd.DataFrame(list(lista_resultados), columns=tipos)
+    longo = largo.reset_index(names="grupo").melt(id_vars="grupo", var_name="tipo", value_name="texto")
+    longo["texto"] = longo["texto"].fillna("").astype(str).str.strip()
+    longo = longo[longo["texto"] != ""]
+    longo["ordem"] = longo["tipo"].map({tipo: i for i, tipo in enumerate(tipos)})
+    longo = longo.sort_values(["grupo", "ordem"], kind="stable").reset_index(drop=True)
+
+    nivel = longo.groupby("grupo").cumcount() + 1
+    titulo = (
+        longo["texto"].str.extract(RE_TITULO, expand=False).fillna("")
+        .str.replace(RE_NEGRITO, "", regex=True).str.strip().str.slice(0, LIMITE_TITULO)
+    )
+    partes = longo["texto"].str.extract(RE_CRITERIOS)
+    com_criterios = longo["tipo"].isin(TIPOS_COM_CRITERIOS) & partes[1].notna()
+
+    df = pd.DataFrame({"ID": "", "Work Item Type": longo["tipo"].map(TIPOS_WORK_ITEM)})
+    for n in range(1, len(tipos) + 1):
+        df[f"Title {n}"] = titulo.where(nivel == n, "")
+    df["Description"] = _html(longo["texto"].where(~com_criterios, partes[0]))
+    df["Acceptance Criteria"] = _html(partes[1].where(com_criterios, ""))
+    return df[COLUNAS_AZURE]
+
+def baixar_csv_azure(df):
+    # BOM para o Excel abrir os acentos corretamente; o Azure Boards também aceita
+    return df.to_csv(index=False).encode("utf-8-sig")
+
 # =====================
 # PROCESSAR PPT PARA INSTRUÇÃO DA IA
 # =====================
+# Lê o XML dos slides direto do zip (iterparse), sem montar o modelo de
+# objetos do python-pptx. Pega todo parágrafo <a:p>, então grupos, tabelas
+# e anotações do apresentador entram junto.
+NS_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+NS_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+NS_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+REL_NOTAS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+
+# Placeholders de número do slide, data, rodapé etc. não interessam à IA
+PLACEHOLDERS_IGNORADOS = {"sldNum", "dt", "ftr", "hdr", "sldImg"}
+
+def _ler_rels(zf, parte):
+    """{rId: (tipo, caminho no zip)} das relações de uma parte do pacote."""
+    pasta, nome = posixpath.split(parte)
+    caminho_rels = posixpath.join(pasta, "_rels", nome + ".rels")
+    try:
+        raiz = ET.fromstring(zf.read(caminho_rels))
+    except KeyError:
+        return {}
+    rels = {}
+    for rel in raiz.iter(f"{NS_REL}Relationship"):
+        alvo = rel.get("Target", "")
+        if rel.get("TargetMode") == "External":
+            continue
+        alvo = alvo.lstrip("/") if alvo.startswith("/") else posixpath.normpath(posixpath.join(pasta, alvo))
+        rels[rel.get("Id")] = (rel.get("Type"), alvo)
+    return rels
+
+def _paragrafos(arquivo):
+    paragrafos, partes = [], []
+    ignorar_forma = False
+    for _, elem in ET.iterparse(arquivo, events=("end",)):
+        tag = elem.tag
+        if tag == f"{NS_A}t":
+            partes.append(elem.text or "")
+        elif tag == f"{NS_A}br":
+            partes.append("\n")
+        elif tag == f"{NS_A}p":
+            texto = "".join(partes).strip()
+            if texto and not ignorar_forma:
+                paragrafos.append(texto)
+            partes = []
+            elem.clear()
+        elif tag == f"{NS_P}ph":
+            ignorar_forma = elem.get("type") in PLACEHOLDERS_IGNORADOS
+        elif tag == f"{NS_P}sp":
+            ignorar_forma = False
+            elem.clear()
+    return paragrafos
+
+def iterar_slides_ppt(file):
+    """
+    Gera um registro por slide, na ordem da apresentação:
+    {"numero": 1, "texto": "texto do slide", "notas": "anotações"}
+    """
+    with zipfile.ZipFile(file) as zf:
+        rels = _ler_rels(zf, "ppt/presentation.xml")
+        apresentacao = ET.fromstring(zf.read("ppt/presentation.xml"))
+        for numero, sld in enumerate(apresentacao.iter(f"{NS_P}sldId"), start=1):
+            _, parte_slide = rels[sld.get(f"{NS_R}id")]
+            with zf.open(parte_slide) as arquivo:
+                texto = _paragrafos(arquivo)
+
+            notas = []
+            for tipo, parte in _ler_rels(zf, parte_slide).values():
+                if tipo == REL_NOTAS:
+                    with zf.open(parte) as arquivo:
+                        notas = _paragrafos(arquivo)
+            yield {"numero": numero, "texto": "\n".join(texto), "notas": "\n".join(notas)}
+
+def extrair_slides_ppt(file):
+    """Texto de cada slide (com as anotações), um item por slide."""
+    slides = []
+    for registro in iterar_slides_ppt(file):
+        partes = [registro["texto"]]
+        if registro["notas"]:
+            partes.append(f"Notas: {registro['notas']}")
+        slides.append("\n".join(partes))
+    return slides
+
 def extrair_texto_ppt(file):
-    prs = Presentation(file)
-    texto = ""
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                texto += shape.text + "\n"
-    return texto
+    return "\n".join(extrair_slides_ppt(file)) + "\n"
+
+# =====================
+# PROCESSAR DOCX E PDF PARA INSTRUÇÃO DA IA
+# =====================
+NS_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def extrair_secoes_docx(file):
+    """Texto do documento Word dividido em seções (um item por título)."""
+    secoes, atual = [], []
+    with zipfile.ZipFile(file) as zf, zf.open("word/document.xml") as arquivo:
+        partes, titulo = [], False
+        for _, elem in ET.iterparse(arquivo, events=("end",)):
+            tag = elem.tag
+            if tag == f"{NS_W}t":
+                partes.append(elem.text or "")
+            elif tag == f"{NS_W}tab":
+                partes.append("\t")
+            elif tag in (f"{NS_W}br", f"{NS_W}cr"):
+                partes.append("\n")
+            elif tag == f"{NS_W}pStyle":
+                estilo = (elem.get(f"{NS_W}val") or "").lower()
+                titulo = estilo.startswith(("heading", "titulo", "ttulo", "title"))
+            elif tag == f"{NS_W}p":
+                texto = "".join(partes).strip()
+                if texto:
+                    if titulo and atual:
+                        secoes.append("\n".join(atual))
+                        atual = []
+                    atual.append(texto)
+                partes, titulo = [], False
+                elem.clear()
+    if atual:
+        secoes.append("\n".join(atual))
+    return secoes
+
+def extrair_paginas_pdf(file):
+    """Texto de cada página do PDF (requer o pacote pypdf)."""
+    from pypdf import PdfReader
+
+    leitor = PdfReader(file)
+    return [(pagina.extract_text() or "").strip() for pagina in leitor.pages]
+
+EXTRATORES = {
+    ".pptx": extrair_slides_ppt,
+    ".docx": extrair_secoes_docx,
+    ".pdf": extrair_paginas_pdf
+}
+
+def extrair_trechos_documento(file, nome):
+    """Trechos (slides, seções ou páginas) de qualquer formato suportado."""
+    extensao = os.path.splitext(nome)[1].lower()
+    if extensao not in EXTRATORES:
+        raise ValueError(f"Formato não suportado: {nome}")
+    return [t for t in EXTRATORES[extensao](file) if t.strip()]